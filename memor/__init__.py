@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 """Memor modules."""
-from .params import MEMOR_VERSION, RenderFormat, LLMModel
-from .tokens_estimator import TokensEstimator
+from .params import MEMOR_VERSION, RenderFormat, LLMModel, BudgetStrategy
+from .tokens_estimator import TokensEstimator, batch_estimate_tokens
+from .functions import set_json_codec
 from .template import PromptTemplate, PresetPromptTemplate
 from .prompt import Prompt, Role
 from .response import Response
-from .session import Session
+from .session import Session, async_save_sessions
+from .archive import save_archive, load_archive, SessionView
 from .errors import MemorRenderError, MemorValidationError
 
 __version__ = MEMOR_VERSION
@@ -0,0 +1,654 @@
+# -*- coding: utf-8 -*-
+"""Session archive functions."""
+from typing import List, Dict, Tuple, Any, Union, Optional, Generator
+from array import array
+import bisect
+import datetime
+import math
+import mmap
+import re
+import struct
+import sys
+from .params import MEMOR_VERSION
+from .params import ARCHIVE_MAGIC, DATA_SAVE_SUCCESS_MESSAGE, SESSION_SEPARATOR
+from .params import INVALID_ARCHIVE_STRUCTURE_MESSAGE, INVALID_RENDER_FORMAT_MESSAGE
+from .params import INVALID_INT_OR_STR_SLICE_MESSAGE, PROMPT_RENDER_ERROR_MESSAGE
+from .params import Role, RenderFormat
+from .errors import MemorValidationError, MemorRenderError
+from .functions import _validate_list_of, _validate_path, _validate_pos_int
+from .functions import _json_dumps, _json_loads
+from .functions import _EPOCH, _NAIVE_EPOCH, _timestamp_to_datetime
+from .template import PromptTemplate, _template_to_json, _template_from_json
+from .prompt import Prompt
+from .response import Response
+from .session import Session
+
+_HEADER_LENGTH_FORMAT = "<Q"
+_ALIGNMENT = 8
+_STRING_COLUMNS = ["id", "message"]
+_COLUMNS = [
+    ("type", "B"),
+    ("role", "B"),
+    ("status", "B"),
+    ("tokens", "q"),
+    ("date_created", "q"),
+    ("date_created_offset", "i"),
+    ("date_modified", "q"),
+    ("date_modified_offset", "i"),
+    ("score", "d"),
+    ("temperature", "d"),
+    ("top_k", "q"),
+    ("top_p", "d"),
+    ("inference_time", "d"),
+    ("model", "i"),
+    ("gpu", "i"),
+    ("responses_start", "q"),
+    ("responses_count", "q"),
+    ("selected_response_index", "q"),
+    ("template", "i"),
+]
+_ROLES = [role.value for role in Role]
+_PROMPT_COLUMN_FIELDS = frozenset(["type", "message", "id", "tokens", "role", "selected_response_index"])
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _datetime_to_epoch(date: datetime.datetime) -> Tuple[int, int]:
+    """
+    Convert an aware datetime to microseconds since the epoch and UTC offset in seconds.
+
+    :param date: date
+    """
+    return (date - _EPOCH) // _MICROSECOND, int(date.utcoffset().total_seconds())
+
+
+def _timestamp_to_epoch(timestamp: Union[float, datetime.timedelta], timezone: datetime.tzinfo) -> Tuple[int, int]:
+    """
+    Convert a local time POSIX timestamp and its timezone to microseconds since the epoch and UTC offset in seconds.
+
+    :param timestamp: POSIX timestamp (or timedelta since the epoch)
+    :param timezone: timezone
+    """
+    if not isinstance(timezone, datetime.timezone):
+        return _datetime_to_epoch(_timestamp_to_datetime(timestamp, timezone))
+    if not isinstance(timestamp, datetime.timedelta):
+        timestamp = datetime.timedelta(seconds=timestamp)
+    offset = timezone.utcoffset(None)
+    return (timestamp - offset) // _MICROSECOND, int(offset.total_seconds())
+
+
+def _epoch_to_datetime(epoch: int, offset: int) -> datetime.datetime:
+    """
+    Convert microseconds since the epoch and UTC offset in seconds to an aware datetime.
+
+    :param epoch: microseconds since the epoch
+    :param offset: UTC offset in seconds
+    """
+    timezone = datetime.timezone(datetime.timedelta(seconds=offset))
+    return (_NAIVE_EPOCH + datetime.timedelta(microseconds=epoch, seconds=offset)).replace(tzinfo=timezone)
+
+
+class _ArchiveWriter:
+    """Archive writer."""
+
+    def __init__(self) -> None:
+        """Archive writer initiator."""
+        self.dictionaries = {"model": {}, "gpu": {}, "template": {}}
+        self._templates = {}
+        self.tables = {}
+        for table in ["messages", "responses"]:
+            columns = {name: array(typecode) for name, typecode in _COLUMNS}
+            for name in _STRING_COLUMNS:
+                columns[name + ".offsets"] = array("q", [0])
+                columns[name + ".data"] = bytearray()
+            self.tables[table] = columns
+
+    def _encode(self, dictionary: str, value: Optional[str]) -> int:
+        """
+        Encode a value with a dictionary.
+
+        :param dictionary: dictionary name
+        :param value: value
+        """
+        if value is None:
+            return -1
+        return self.dictionaries[dictionary].setdefault(value, len(self.dictionaries[dictionary]))
+
+    def add_message(self, table: str, message: Any, status: bool = True) -> None:
+        """
+        Add a message to a table.
+
+        :param table: table name
+        :param message: message
+        :param status: message status
+        """
+        columns = self.tables[table]
+        if isinstance(message, Prompt):
+            responses_start = len(self.tables["responses"]["type"])
+            for response in message._responses:
+                self.add_message("responses", response)
+            columns["type"].append(0)
+            columns["responses_start"].append(responses_start)
+            columns["responses_count"].append(len(message._responses))
+            columns["selected_response_index"].append(message._selected_response_index)
+            template = message._template
+            if id(template) not in self._templates:
+                template_json = _json_dumps(_template_to_json(template)).decode("utf-8")
+                self._templates[id(template)] = (template, self._encode("template", template_json))
+            columns["template"].append(self._templates[id(template)][1])
+            for name in ["score", "temperature", "top_p", "inference_time"]:
+                columns[name].append(math.nan)
+            columns["top_k"].append(-1)
+            columns["model"].append(-1)
+            columns["gpu"].append(-1)
+        else:
+            columns["type"].append(1)
+            for name in ["score", "temperature", "top_p", "inference_time"]:
+                value = getattr(message, "_" + name)
+                columns[name].append(math.nan if value is None else value)
+            columns["top_k"].append(-1 if message._top_k is None else message._top_k)
+            columns["model"].append(self._encode("model", message._model))
+            columns["gpu"].append(self._encode("gpu", message._gpu))
+            columns["responses_start"].append(-1)
+            columns["responses_count"].append(0)
+            columns["selected_response_index"].append(-1)
+            columns["template"].append(-1)
+        columns["role"].append(_ROLES.index(message._role.value))
+        columns["status"].append(int(status))
+        columns["tokens"].append(-1 if message._tokens is None else message._tokens)
+        for name in ["date_created", "date_modified"]:
+            epoch, offset = _timestamp_to_epoch(getattr(message, "_" + name + "_timestamp"),
+                                                getattr(message, "_" + name + "_timezone"))
+            columns[name].append(epoch)
+            columns[name + "_offset"].append(offset)
+        for name in _STRING_COLUMNS:
+            columns[name + ".data"] += getattr(message, "_" + name).encode("utf-8", "surrogatepass")
+            columns[name + ".offsets"].append(len(columns[name + ".data"]))
+
+    def write(self, file_path: str, sessions_header: List[Dict[str, Any]]) -> None:
+        """
+        Write the archive file.
+
+        :param file_path: archive file path
+        :param sessions_header: sessions header
+        """
+        header = {
+            "memor_version": MEMOR_VERSION,
+            "byteorder": sys.byteorder,
+            "sessions": sessions_header,
+            "dictionaries": {name: list(dictionary) for name, dictionary in self.dictionaries.items()},
+            "tables": {},
+        }
+        chunks = []
+        offset = 0
+        for table, columns in self.tables.items():
+            header["tables"][table] = {"length": len(columns["type"]), "columns": {}}
+            for name, column in columns.items():
+                data = column.tobytes() if isinstance(column, array) else bytes(column)
+                typecode = column.typecode if isinstance(column, array) else "B"
+                header["tables"][table]["columns"][name] = [typecode, offset, len(data)]
+                padding = -len(data) % _ALIGNMENT
+                chunks.append(data + b"\0" * padding)
+                offset += len(data) + padding
+        header_bytes = _json_dumps(header)
+        header_bytes += b" " * (-(len(ARCHIVE_MAGIC) + 8 + len(header_bytes)) % _ALIGNMENT)
+        with open(file_path, "wb") as file:
+            file.write(ARCHIVE_MAGIC)
+            file.write(struct.pack(_HEADER_LENGTH_FORMAT, len(header_bytes)))
+            file.write(header_bytes)
+            for chunk in chunks:
+                file.write(chunk)
+
+
+class _ArchiveReader:
+    """Archive reader (columns are zero-copy views over the file when memory-mapped)."""
+
+    def __init__(self, file_path: str, use_mmap: bool = True) -> None:
+        """
+        Archive reader initiator.
+
+        :param file_path: archive file path
+        :param use_mmap: memory map flag
+        """
+        _validate_path(file_path)
+        self._mmap = None
+        self._views = []
+        try:
+            with open(file_path, "rb") as file:
+                if use_mmap:
+                    self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    buffer = self._mmap
+                else:
+                    buffer = file.read()
+            self._raw = buffer
+            self._buffer = self._view(memoryview(buffer))
+            if bytes(self._buffer[:len(ARCHIVE_MAGIC)]) != ARCHIVE_MAGIC:
+                raise ValueError(ARCHIVE_MAGIC)
+            header_start = len(ARCHIVE_MAGIC) + 8
+            header_length = struct.unpack(_HEADER_LENGTH_FORMAT, self._buffer[len(ARCHIVE_MAGIC):header_start])[0]
+            self.header = _json_loads(bytes(self._buffer[header_start:header_start + header_length]))
+            self._data_start = header_start + header_length
+            self.dictionaries = self.header["dictionaries"]
+            self.sessions = self.header["sessions"]
+            self.sessions_start = [0]
+            for session_header in self.sessions:
+                self.sessions_start.append(self.sessions_start[-1] + session_header["messages_count"])
+            self._columns = {}
+            self._templates = {}
+        except Exception:
+            self.close()
+            raise MemorValidationError(INVALID_ARCHIVE_STRUCTURE_MESSAGE)
+
+    def _view(self, view: memoryview) -> memoryview:
+        """
+        Track a memory view so it can be released on close.
+
+        :param view: memory view
+        """
+        self._views.append(view)
+        return view
+
+    def length(self, table: str) -> int:
+        """
+        Get the number of rows of a table.
+
+        :param table: table name
+        """
+        return self.header["tables"][table]["length"]
+
+    def column(self, table: str, name: str) -> Any:
+        """
+        Get a column of a table.
+
+        :param table: table name
+        :param name: column name
+        """
+        key = (table, name)
+        if key not in self._columns:
+            typecode, offset, size = self.header["tables"][table]["columns"][name]
+            start = self._data_start + offset
+            column = self._view(self._buffer[start:start + size])
+            if typecode != "B":
+                if self.header["byteorder"] == sys.byteorder:
+                    column = self._view(column.cast(typecode))
+                else:
+                    result = array(typecode)
+                    result.frombytes(column)
+                    result.byteswap()
+                    column = result
+            self._columns[key] = column
+        return self._columns[key]
+
+    def string(self, table: str, name: str, index: int) -> str:
+        """
+        Get a string value of a table.
+
+        :param table: table name
+        :param name: column name
+        :param index: row index
+        """
+        offsets = self.column(table, name + ".offsets")
+        return str(self.column(table, name + ".data")[offsets[index]:offsets[index + 1]], "utf-8", "surrogatepass")
+
+    def template(self, template_index: int) -> PromptTemplate:
+        """
+        Return the template at the given index (each template is loaded once).
+
+        :param template_index: template index
+        """
+        if template_index not in self._templates:
+            template_json = _json_loads(self.dictionaries["template"][template_index])
+            self._templates[template_index] = _template_from_json(template_json)
+        return self._templates[template_index]
+
+    def prompt_string(self, table: str, index: int) -> Optional[str]:
+        """
+        Render a prompt row as string without building the prompt, if its template only refers to the prompt columns.
+
+        :param table: table name
+        :param index: row index
+        """
+        template = self.template(self.column(table, "template")[index])
+        fields = template._fields
+        custom_map = template._custom_map or {}
+        if fields is None or any(field != "prompt" and field not in custom_map for field in fields):
+            return None
+        prompt_fields = fields.get("prompt", set())
+        if prompt_fields is None or not prompt_fields <= _PROMPT_COLUMN_FIELDS:
+            return None
+        tokens = self.column(table, "tokens")[index]
+        values = {
+            "type": lambda: "Prompt",
+            "message": lambda: self.string(table, "message", index),
+            "id": lambda: self.string(table, "id", index),
+            "tokens": lambda: None if tokens == -1 else tokens,
+            "role": lambda: _ROLES[self.column(table, "role")[index]],
+            "selected_response_index": lambda: self.column(table, "selected_response_index")[index],
+        }
+        format_kwargs = {"prompt": {field: values[field]() for field in prompt_fields}}
+        format_kwargs.update(custom_map)
+        try:
+            return template._content.format(**format_kwargs)
+        except Exception:
+            raise MemorRenderError(PROMPT_RENDER_ERROR_MESSAGE)
+
+    def find_string(self, table: str, name: str, value: str, start: int, end: int) -> Optional[int]:
+        """
+        Find the first row in a range whose string value is equal to the given value, without decoding the column.
+
+        :param table: table name
+        :param name: column name
+        :param value: value
+        :param start: range start row
+        :param end: range end row
+        """
+        offsets = self.column(table, name + ".offsets")
+        base = self._data_start + self.header["tables"][table]["columns"][name + ".data"][1]
+        encoded_value = value.encode("utf-8", "surrogatepass")
+        position = base + offsets[start]
+        while True:
+            position = self._raw.find(encoded_value, position, base + offsets[end])
+            if position == -1:
+                return None
+            index = bisect.bisect_left(offsets, position - base, start, end)
+            if index < end and offsets[index] == position - base and \
+                    offsets[index + 1] - offsets[index] == len(encoded_value):
+                return index
+            position += 1
+
+    def date(self, table: str, name: str, index: int) -> datetime.datetime:
+        """
+        Get a date value of a table.
+
+        :param table: table name
+        :param name: column name
+        :param index: row index
+        """
+        return _epoch_to_datetime(self.column(table, name)[index], self.column(table, name + "_offset")[index])
+
+    def message(self, table: str, index: int) -> Any:
+        """
+        Build a message from a table row.
+
+        :param table: table name
+        :param index: row index
+        """
+        column = self.column
+        role = Role(_ROLES[column(table, "role")[index]])
+        tokens = column(table, "tokens")[index]
+        tokens = None if tokens == -1 else tokens
+        if column(table, "type")[index] == 0:
+            responses_start = column(table, "responses_start")[index]
+            responses = [self.message("responses", response_index) for response_index in
+                         range(responses_start, responses_start + column(table, "responses_count")[index])]
+            template = self.template(column(table, "template")[index])
+            message = Prompt(
+                message=self.string(table, "message", index),
+                responses=responses,
+                role=role,
+                tokens=tokens,
+                template=template,
+                init_check=False)
+            message._selected_response_index = column(table, "selected_response_index")[index]
+        else:
+            values = {}
+            for name in ["score", "temperature", "top_p", "inference_time"]:
+                value = column(table, name)[index]
+                values[name] = None if math.isnan(value) else value
+            top_k = column(table, "top_k")[index]
+            message = Response(
+                message=self.string(table, "message", index),
+                role=role,
+                tokens=tokens,
+                top_k=None if top_k == -1 else top_k,
+                model=None,
+                **values)
+            for name in ["model", "gpu"]:
+                value = column(table, name)[index]
+                setattr(message, "_" + name, None if value == -1 else self.dictionaries[name][value])
+        message._id = self.string(table, "id", index)
+        message._set_date_created(self.date(table, "date_created", index))
+        message._set_date_modified(self.date(table, "date_modified", index))
+        return message
+
+    def messages_status(self, session_index: int) -> List[bool]:
+        """
+        Get the messages status of a session.
+
+        :param session_index: session index
+        """
+        status = self.column("messages", "status")
+        return [bool(status[index]) for index in range(*self.sessions_start[session_index:session_index + 2])]
+
+    def session(self, session_index: int) -> Session:
+        """
+        Build a session.
+
+        :param session_index: session index
+        """
+        session_header = self.sessions[session_index]
+        messages_range = range(*self.sessions_start[session_index:session_index + 2])
+        messages = [self.message("messages", index) for index in messages_range]
+        session = Session(title=session_header["title"], messages=messages, init_check=False)
+        session.update_messages_status(self.messages_status(session_index))
+        session._render_counter = session_header["render_counter"]
+        session._date_created = _epoch_to_datetime(*session_header["date_created"])
+        session._date_modified = _epoch_to_datetime(*session_header["date_modified"])
+        return session
+
+    def close(self) -> None:
+        """Release the memory views and close the memory map."""
+        self._columns = {}
+        self._raw = None
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def save_archive(sessions: List[Session], file_path: str) -> Dict[str, Any]:
+    """
+    Save sessions as a binary columnar archive.
+
+    :param sessions: sessions
+    :param file_path: archive file path
+    """
+    _validate_list_of(sessions, "sessions", Session, "`Session`")
+    result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
+    try:
+        writer = _ArchiveWriter()
+        sessions_header = []
+        for session in sessions:
+            messages = session.messages
+            for index, message in enumerate(messages):
+                writer.add_message("messages", message, session._messages_status[index])
+            sessions_header.append({
+                "title": session._title,
+                "render_counter": session._render_counter,
+                "messages_count": len(messages),
+                "date_created": _datetime_to_epoch(session._date_created),
+                "date_modified": _datetime_to_epoch(session._date_modified),
+            })
+        writer.write(file_path, sessions_header)
+    except Exception as e:
+        result["status"] = False
+        result["message"] = str(e)
+    return result
+
+
+def load_archive(file_path: str, use_mmap: bool = True) -> List[Session]:
+    """
+    Load sessions from a binary columnar archive.
+
+    :param file_path: archive file path
+    :param use_mmap: memory map flag
+    """
+    reader = _ArchiveReader(file_path, use_mmap=use_mmap)
+    try:
+        sessions = [reader.session(session_index) for session_index in range(len(reader.sessions))]
+    except MemorValidationError:
+        raise
+    except Exception:
+        raise MemorValidationError(INVALID_ARCHIVE_STRUCTURE_MESSAGE)
+    finally:
+        reader.close()
+    return sessions
+
+
+class SessionView:
+    """
+    Read-only view of a session in a binary columnar archive.
+
+    The archive is memory-mapped and messages are only decoded when they are accessed,
+    so several processes can share one page-cached copy of the archive.
+    """
+
+    def __init__(self, file_path: str, session_index: int = 0) -> None:
+        """
+        Initiate the SessionView object.
+
+        :param file_path: archive file path
+        :param session_index: index of the session in the archive
+        """
+        _validate_pos_int(session_index, "session_index")
+        self._reader = _ArchiveReader(file_path, use_mmap=True)
+        if session_index >= len(self._reader.sessions):
+            self._reader.close()
+            raise MemorValidationError(INVALID_ARCHIVE_STRUCTURE_MESSAGE)
+        self._session_index = session_index
+        self._header = self._reader.sessions[session_index]
+        self._start, self._end = self._reader.sessions_start[session_index:session_index + 2]
+
+    def __repr__(self) -> str:
+        """Return string representation of SessionView."""
+        return "SessionView(title={title})".format(title=self._header["title"])
+
+    def __len__(self) -> int:
+        """Return the length of the SessionView object."""
+        return self._end - self._start
+
+    def __iter__(self) -> Generator[Union[Prompt, Response], None, None]:
+        """Iterate through the SessionView object."""
+        for index in range(len(self)):
+            yield self._reader.message("messages", self._start + index)
+
+    def __getitem__(self, identifier: Union[int, slice, str]) -> Union[Prompt, Response, List[Union[Prompt, Response]]]:
+        """
+        Get a message from the session view.
+
+        :param identifier: message identifier (index/slice or id)
+        """
+        if isinstance(identifier, slice):
+            return [self[index] for index in range(*identifier.indices(len(self)))]
+        if isinstance(identifier, int):
+            index = identifier + len(self) if identifier < 0 else identifier
+            if not 0 <= index < len(self):
+                raise IndexError("SessionView index out of range")
+            return self._reader.message("messages", self._start + index)
+        if isinstance(identifier, str):
+            index = self._reader.find_string("messages", "id", identifier, self._start, self._end)
+            if index is not None:
+                return self._reader.message("messages", index)
+            return None
+        raise MemorValidationError(INVALID_INT_OR_STR_SLICE_MESSAGE.format(parameter_name="identifier"))
+
+    def __enter__(self) -> "SessionView":
+        """Enter the context."""
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Exit the context and close the view."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the view and release the memory map."""
+        self._reader.close()
+
+    def _render_message(self, index: int, render_format: RenderFormat) -> Union[str, Dict[str, Any]]:
+        """
+        Render a message, reading it directly from the archive columns when possible.
+
+        :param index: message index
+        :param render_format: render format
+        """
+        row = self._start + index
+        if self._reader.column("messages", "type")[row] == 0 and render_format == RenderFormat.STRING:
+            content = self._reader.prompt_string("messages", row)
+            if content is not None:
+                return content
+        if self._reader.column("messages", "type")[row] == 1:
+            if render_format == RenderFormat.STRING:
+                return self._reader.string("messages", "message", row)
+            if render_format == RenderFormat.OPENAI:
+                return {"role": _ROLES[self._reader.column("messages", "role")[row]],
+                        "content": self._reader.string("messages", "message", row)}
+        return self._reader.message("messages", row).render(render_format=render_format)
+
+    def search(self, query: str, use_regex: bool = False, case_sensitive: bool = False) -> List[int]:
+        """
+        Search messages for a keyword or regex pattern, returning indices.
+
+        :param query: input query
+        :param use_regex: regex flag
+        :param case_sensitive: case sensitivity flag
+        """
+        flags = 0 if case_sensitive else re.IGNORECASE
+        if not use_regex:
+            query = re.escape(query)
+        pattern = re.compile(query, flags)
+        result = []
+        for index in range(len(self)):
+            try:
+                if pattern.search(self._render_message(index, RenderFormat.STRING)):
+                    result.append(index)
+            except MemorRenderError:
+                continue
+        return result
+
+    def render(self, render_format: RenderFormat = RenderFormat.DEFAULT) -> Union[str,
+                                                                                  Dict[str, Any],
+                                                                                  List[Tuple[str, Any]]]:
+        """
+        Render method (the render counter of a read-only view is not updated).
+
+        :param render_format: render format
+        """
+        if not isinstance(render_format, RenderFormat):
+            raise MemorValidationError(INVALID_RENDER_FORMAT_MESSAGE)
+        status = self.messages_status
+        if render_format in [RenderFormat.OPENAI, RenderFormat.AI_STUDIO]:
+            return [self._render_message(index, render_format) for index in range(len(self)) if status[index]]
+        if render_format == RenderFormat.STRING:
+            return "".join(self._render_message(index, RenderFormat.STRING) + SESSION_SEPARATOR
+                           for index in range(len(self)) if status[index])
+        return self.to_session().render(render_format=render_format, enable_counter=False)
+
+    def to_session(self) -> Session:
+        """Convert the view to a Session object (all messages are decoded)."""
+        return self._reader.session(self._session_index)
+
+    @property
+    def title(self) -> str:
+        """Get the session title."""
+        return self._header["title"]
+
+    @property
+    def render_counter(self) -> int:
+        """Get the render counter."""
+        return self._header["render_counter"]
+
+    @property
+    def date_created(self) -> datetime.datetime:
+        """Get the session creation date."""
+        return _epoch_to_datetime(*self._header["date_created"])
+
+    @property
+    def date_modified(self) -> datetime.datetime:
+        """Get the session object modification date."""
+        return _epoch_to_datetime(*self._header["date_modified"])
+
+    @property
+    def messages_status(self) -> List[bool]:
+        """Get the session messages status."""
+        return self._reader.messages_status(self._session_index)
@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
 """Memor functions."""
-from typing import Any, Type
+from typing import Any, Type, Tuple, Dict, Set, FrozenSet, Union, Callable, Generator, IO, Optional
 import os
+import stat
+import contextlib
 import datetime
+import functools
+import hashlib
+import asyncio
+import json
+import re
 import uuid
+from .params import DATE_TIME_FORMAT, DATA_SAVE_SUCCESS_MESSAGE
 from .params import INVALID_DATETIME_MESSAGE
 from .params import INVALID_PATH_MESSAGE, INVALID_STR_VALUE_MESSAGE
 from .params import INVALID_PROB_VALUE_MESSAGE, INVALID_MESSAGE_STATUS_LEN_MESSAGE
@@ -12,9 +20,37 @@ from .params import INVALID_POSINT_VALUE_MESSAGE
 from .params import INVALID_CUSTOM_MAP_MESSAGE
 from .params import INVALID_BOOL_VALUE_MESSAGE
 from .params import INVALID_LIST_OF_X_MESSAGE
-from .params import INVALID_ID_MESSAGE
+from .params import INVALID_ID_MESSAGE, INVALID_JSON_CODEC_MESSAGE, INVALID_CHECKSUM_MESSAGE
 from .errors import MemorValidationError
 
+try:
+    from re import _parser as _sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+_NON_ASCII_PATTERN = re.compile(r"[^\x00-\x7f]+")
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+_MAX_EXACT_TIMESTAMP = 2 ** 32
+_TIMEZONES = {datetime.timezone.utc: datetime.timezone.utc}
+_DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}) ([+-]\d{2})(\d{2})")
+_OFFSET_TIMEZONES = {}
+_TIMEZONE_SUFFIXES = {}
+_CHECKSUM_PATTERN = re.compile(rb',"checksum":"([0-9a-f]{64})"\}\s*$')
+_CHECKSUM_TAIL_LENGTH = 128
+
 
 def generate_message_id() -> str:
     """Generate message ID."""
@@ -43,6 +79,86 @@ def get_time_utc() -> datetime.datetime:
     return datetime.datetime.now(datetime.timezone.utc)
 
 
+def _datetime_to_timestamp(date: datetime.datetime) -> Tuple[Union[float, datetime.timedelta], datetime.tzinfo]:
+    """
+    Convert an aware datetime to a POSIX timestamp of its local time and its (shared) timezone.
+
+    The local time can always be converted back, even near the limits of the datetime range.
+    Dates too far from the epoch for a float to keep their microseconds are kept as an exact timedelta.
+
+    :param date: date
+    """
+    timezone = _TIMEZONES.setdefault(date.tzinfo, date.tzinfo)
+    delta = date.replace(tzinfo=None) - _NAIVE_EPOCH
+    timestamp = delta.total_seconds()
+    if abs(timestamp) >= _MAX_EXACT_TIMESTAMP:
+        return delta, timezone
+    return timestamp, timezone
+
+
+def _timestamp_to_datetime(timestamp: Union[float, datetime.timedelta], timezone: datetime.tzinfo) -> datetime.datetime:
+    """
+    Convert a POSIX timestamp of a local time and its timezone to an aware datetime.
+
+    :param timestamp: POSIX timestamp (or timedelta since the epoch)
+    :param timezone: timezone
+    """
+    if not isinstance(timestamp, datetime.timedelta):
+        timestamp = datetime.timedelta(seconds=timestamp)
+    return (_NAIVE_EPOCH + timestamp).replace(tzinfo=timezone)
+
+
+def _format_date(date: datetime.datetime) -> str:
+    """
+    Format an aware datetime with DATE_TIME_FORMAT (same output as strftime, without its overhead).
+
+    :param date: date
+    """
+    timezone = date.tzinfo
+    suffix = _TIMEZONE_SUFFIXES.get(timezone)
+    if suffix is None:
+        offset = date.utcoffset()
+        if offset is None or offset.seconds % 60 or offset.microseconds or not isinstance(timezone, datetime.timezone):
+            return datetime.datetime.strftime(date, DATE_TIME_FORMAT)
+        offset_minutes = offset.days * 1440 + offset.seconds // 60
+        sign = "+" if offset_minutes >= 0 else "-"
+        offset_minutes = abs(offset_minutes)
+        suffix = " %s%02d%02d" % (sign, offset_minutes // 60, offset_minutes % 60)
+        _TIMEZONE_SUFFIXES[timezone] = suffix
+    if date.year < 1000:
+        return datetime.datetime.strftime(date, DATE_TIME_FORMAT)
+    date_time = "%04d-%02d-%02d %02d:%02d:%02d" % (date.year, date.month, date.day, date.hour, date.minute, date.second)
+    return date_time + suffix
+
+
+def _parse_date(value: Union[str, int, float]) -> datetime.datetime:
+    """
+    Parse a date saved with DATE_TIME_FORMAT, in ISO 8601 format or as a POSIX timestamp (UTC).
+
+    :param value: date string or POSIX timestamp
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _EPOCH + datetime.timedelta(seconds=value)
+    match = _DATE_PATTERN.fullmatch(value)
+    if match is None:
+        try:
+            date = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return datetime.datetime.strptime(value, DATE_TIME_FORMAT)
+        if date.tzinfo is None:
+            raise ValueError(value)
+        return date
+    year, month, day, hour, minute, second, offset_hours, offset_minutes = match.groups()
+    timezone = _OFFSET_TIMEZONES.get(offset_hours + offset_minutes)
+    if timezone is None:
+        sign = -1 if offset_hours[0] == "-" else 1
+        offset = sign * (abs(int(offset_hours)) * 60 + int(offset_minutes))
+        timezone = datetime.timezone(datetime.timedelta(minutes=offset))
+        timezone = _TIMEZONES.setdefault(timezone, timezone)
+        _OFFSET_TIMEZONES[offset_hours + offset_minutes] = timezone
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=timezone)
+
+
 def _validate_string(value: Any, parameter_name: str) -> bool:
     """
     Validate string.
@@ -180,3 +296,293 @@ def _validate_custom_map(custom_map: Any) -> bool:
     if not all(_can_convert_to_string(k) and _can_convert_to_string(v) for k, v in custom_map.items()):
         raise MemorValidationError(INVALID_CUSTOM_MAP_MESSAGE)
     return True
+
+
+def _copy_render(render: Any) -> Any:
+    """
+    Copy a rendered object so that cached renders are not modified by the caller.
+
+    :param render: rendered object
+    """
+    if isinstance(render, dict):
+        return {key: _copy_render(value) for key, value in render.items()}
+    if isinstance(render, list):
+        return [_copy_render(item) for item in render]
+    return render
+
+
+async def _run_in_executor(function: Callable, *args: Any) -> Any:
+    """
+    Run a blocking function in the default thread executor of the running event loop.
+
+    :param function: function
+    :param args: function arguments
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(function, *args))
+
+
+@contextlib.contextmanager
+def _open_file(file_path: str, atomic: bool = False, fsync: bool = False) -> Generator[IO[bytes], None, None]:
+    """
+    Open a file for binary writing.
+
+    In atomic mode the data is written to a temporary file in the same directory, which replaces the
+    target file only after it is completely written, so the target never holds a partial write.
+
+    :param file_path: file path
+    :param atomic: atomic write flag
+    :param fsync: flush the file (and in atomic mode its directory) to disk flag
+    """
+    if not atomic:
+        with open(file_path, "wb") as file:
+            yield file
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        return
+    temp_path = "{0}.{1}.tmp".format(file_path, uuid.uuid4().hex)
+    try:
+        with open(temp_path, "xb") as file:
+            yield file
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        if os.path.isfile(file_path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if fsync and hasattr(os, "O_DIRECTORY"):
+        directory = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+def _stdlib_json_dumps(data: Any) -> bytes:
+    """
+    Encode a JSON object with the standard library codec (strings with lone surrogates are kept as escapes).
+
+    :param data: JSON object
+    """
+    try:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    except UnicodeEncodeError:
+        return json.dumps(data, separators=(",", ":")).encode("ascii")
+
+
+def _orjson_dumps(data: Any) -> bytes:
+    """
+    Encode a JSON object with orjson (falls back to the standard library for big integers and lone surrogates).
+
+    :param data: JSON object
+    """
+    try:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return _stdlib_json_dumps(data)
+
+
+def _orjson_loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode a JSON document with orjson (falls back to the standard library for escaped lone surrogates).
+
+    :param data: JSON document
+    """
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _msgspec_json_dumps(data: Any) -> bytes:  # pragma: no cover
+    """
+    Encode a JSON object with msgspec (falls back to the standard library for lone surrogates).
+
+    :param data: JSON object
+    """
+    try:
+        return msgspec.json.encode(data)
+    except UnicodeEncodeError:
+        return _stdlib_json_dumps(data)
+
+
+def _msgspec_json_loads(data: Union[str, bytes]) -> Any:  # pragma: no cover
+    """
+    Decode a JSON document with msgspec (falls back to the standard library for escaped lone surrogates).
+
+    :param data: JSON document
+    """
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError:
+        return json.loads(data)
+
+
+def _ujson_dumps(data: Any) -> bytes:  # pragma: no cover
+    """
+    Encode a JSON object with ujson (falls back to the standard library for lone surrogates).
+
+    :param data: JSON object
+    """
+    try:
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+    except UnicodeEncodeError:
+        return _stdlib_json_dumps(data)
+
+
+_JSON_CODECS = {"json": (_stdlib_json_dumps, json.loads)}
+if ujson is not None:  # pragma: no cover
+    _JSON_CODECS["ujson"] = (_ujson_dumps, ujson.loads)
+if msgspec is not None:  # pragma: no cover
+    _JSON_CODECS["msgspec"] = (_msgspec_json_dumps, _msgspec_json_loads)
+if orjson is not None:
+    _JSON_CODECS["orjson"] = (_orjson_dumps, _orjson_loads)
+_JSON_CODEC = {}
+
+
+def set_json_codec(name: Optional[str] = None) -> str:
+    """
+    Select the JSON codec used for saving, loading and sizing, and return its name.
+
+    :param name: codec name (the fastest installed codec is selected if not given)
+    """
+    if name is None:
+        name = next(codec for codec in ["orjson", "msgspec", "ujson", "json"] if codec in _JSON_CODECS)
+    if name not in _JSON_CODECS:
+        raise MemorValidationError(INVALID_JSON_CODEC_MESSAGE.format(codecs=", ".join(sorted(_JSON_CODECS))))
+    _JSON_CODEC["name"] = name
+    _JSON_CODEC["dumps"], _JSON_CODEC["loads"] = _JSON_CODECS[name]
+    return name
+
+
+set_json_codec()
+
+
+def _get_json_codec() -> str:
+    """Get the name of the selected JSON codec."""
+    return _JSON_CODEC["name"]
+
+
+def _json_dumps(data: Any, checksum: bool = False) -> bytes:
+    """
+    Encode a JSON object as compact UTF-8 bytes with the selected codec.
+
+    The checksum is the SHA-256 digest of the encoded object, appended as its last key.
+
+    :param data: JSON object
+    :param checksum: checksum flag
+    """
+    result = _JSON_CODEC["dumps"](data)
+    if checksum:
+        result = result[:-1] + b',"checksum":"' + hashlib.sha256(result).hexdigest().encode("ascii") + b'"}'
+    return result
+
+
+def _verify_checksum(content: Union[str, bytes], required: bool = False) -> None:
+    """
+    Verify the checksum of an encoded JSON object, if it has one.
+
+    :param content: encoded JSON object
+    :param required: checksum required flag
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    match = _CHECKSUM_PATTERN.search(content, max(0, len(content) - _CHECKSUM_TAIL_LENGTH))
+    if match is None:
+        if required:
+            raise MemorValidationError(INVALID_CHECKSUM_MESSAGE)
+        return
+    if hashlib.sha256(content[:match.start()] + b"}").hexdigest() != match.group(1).decode("ascii"):
+        raise MemorValidationError(INVALID_CHECKSUM_MESSAGE)
+
+
+def _json_loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode a JSON document with the selected codec.
+
+    :param data: JSON document
+    """
+    return _JSON_CODEC["loads"](data)
+
+
+def _save_json(file_path: str, data: Any, atomic: bool = False, fsync: bool = False,
+               checksum: bool = False) -> Dict[str, Any]:
+    """
+    Encode and write a JSON object to a file.
+
+    :param file_path: file path
+    :param data: JSON object
+    :param atomic: atomic write flag
+    :param fsync: flush to disk flag
+    :param checksum: checksum flag
+    """
+    result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
+    try:
+        with _open_file(file_path, atomic=atomic, fsync=fsync) as file:
+            file.write(_json_dumps(data, checksum=checksum))
+    except Exception as e:
+        result["status"] = False
+        result["message"] = str(e)
+    return result
+
+
+def _read_json(file_path: str, trusted: bool = False) -> Union[bytes, Any]:
+    """
+    Read, verify and decode a JSON file (the raw content is returned if it can not be decoded).
+
+    :param file_path: file path
+    :param trusted: trusted file flag (a valid checksum is required)
+    """
+    _validate_path(file_path)
+    with open(file_path, "rb") as file:
+        content = file.read()
+    _verify_checksum(content, required=trusted)
+    try:
+        return _json_loads(content)
+    except ValueError:
+        return content
+
+
+def _get_trigrams(text: str) -> Optional[FrozenSet[str]]:
+    """
+    Get the lowercase trigrams of a text (None for a non-ASCII text, which trigrams can not rule out).
+
+    :param text: input text
+    """
+    if not text.isascii():
+        return None
+    text = text.lower()
+    return frozenset(map("".join, zip(text, text[1:], text[2:])))
+
+
+def _get_query_trigrams(query: str, use_regex: bool = False) -> Set[str]:
+    """
+    Get the lowercase trigrams that every text matching a query contains.
+
+    Only the runs of literals at the top level of a regex pattern are used, so the result never rules out a match.
+
+    :param query: input query
+    :param use_regex: regex flag
+    """
+    literals = [query]
+    if use_regex:
+        literals = [""]
+        try:
+            parsed_pattern = _sre_parse.parse(query)
+        except Exception:  # pragma: no cover
+            parsed_pattern = []
+        for operator, value in parsed_pattern:
+            if operator == _sre_parse.LITERAL:
+                literals[-1] += chr(value)
+            else:
+                literals.append("")
+    result = set()
+    for literal in literals:
+        for part in _NON_ASCII_PATTERN.split(literal.lower()):
+            result.update(part[index:index + 3] for index in range(len(part) - 2))
+    return result
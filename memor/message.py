@@ -1,36 +1,132 @@
 # -*- coding: utf-8 -*-
 """Message class."""
 from abc import ABC, abstractmethod
-from typing import List, Dict, Union, Tuple, Any
+from typing import List, Dict, Set, Union, Tuple, Any, Optional, Callable
 import datetime
-import json
+import time
+import weakref
 from .params import MEMOR_VERSION
 from .params import RenderFormat
 from .params import Role
 from .tokens_estimator import TokensEstimator
 from .params import INVALID_ROLE_MESSAGE
 from .errors import MemorValidationError
-from .functions import get_time_utc, generate_message_id
+from .functions import generate_message_id, _format_date
+from .functions import _json_dumps, _get_json_codec
+from .functions import _datetime_to_timestamp, _timestamp_to_datetime
 from .functions import _validate_string, _validate_pos_int
 from .functions import _validate_path
+from .functions import _run_in_executor, _save_json, _read_json
 
 
 class Message(ABC):
     """Message class."""
 
+    _json_fields = frozenset()
+
+    __slots__ = (
+        "_message",
+        "_tokens",
+        "_role",
+        "_revision",
+        "_tokens_cache",
+        "_size_cache",
+        "_date_created_timestamp",
+        "_date_created_timezone",
+        "_date_modified_timestamp",
+        "_date_modified_timezone",
+        "_memor_version",
+        "_id",
+        "_owners",
+        "__weakref__")
+
     def __init__(self) -> None:
         """Message initiator."""
         self._message = ""
         self._tokens = None
         self._role = Role.DEFAULT
-        self._date_created = get_time_utc()
+        self._revision = 0
+        self._owners = None
+        self._tokens_cache = None
+        self._size_cache = None
+        self._date_created_timestamp = time.time()
+        self._date_created_timezone = datetime.timezone.utc
         self._mark_modified()
         self._memor_version = MEMOR_VERSION
         self._id = None
 
     def _mark_modified(self) -> None:
         """Mark modification."""
-        self._date_modified = get_time_utc()
+        self._date_modified_timestamp = time.time()
+        self._date_modified_timezone = datetime.timezone.utc
+        self._bump_revision()
+
+    def _bump_revision(self) -> None:
+        """Bump the revision and notify the owners of the message."""
+        self._revision += 1
+        if self._owners is not None:
+            self._notify_owners()
+
+    def _set_id(self, message_id: str) -> None:
+        """
+        Set the message id and notify the owners of the message.
+
+        :param message_id: message id
+        """
+        old_id = self._id
+        self._id = message_id
+        if self._owners is not None and old_id != message_id:
+            self._notify_owners(old_id)
+
+    def _add_owner(self, owner: Any) -> None:
+        """
+        Register an owner (a session) to be notified of the changes of the message.
+
+        Owners are weakly referenced, so a message never keeps a session alive.
+
+        :param owner: owner
+        """
+        if self._owners is None:
+            self._owners = [weakref.ref(owner)]
+            return
+        owners = [reference for reference in self._owners if reference() is not None]
+        if not any(reference() is owner for reference in owners):
+            owners.append(weakref.ref(owner))
+        self._owners = owners
+
+    def _notify_owners(self, old_id: Optional[str] = None) -> None:
+        """
+        Notify the owners of the message that it has changed.
+
+        :param old_id: old message id (if the id has changed)
+        """
+        owners = []
+        for reference in self._owners:
+            owner = reference()
+            if owner is not None:
+                owners.append(reference)
+                owner._message_changed(self, old_id)
+        self._owners = owners or None
+
+    def _set_date_created(self, date: datetime.datetime) -> None:
+        """
+        Set the creation date.
+
+        :param date: date
+        """
+        self._date_created_timestamp, self._date_created_timezone = _datetime_to_timestamp(date)
+
+    def _set_date_modified(self, date: datetime.datetime) -> None:
+        """
+        Set the modification date.
+
+        :param date: date
+        """
+        self._date_modified_timestamp, self._date_modified_timezone = _datetime_to_timestamp(date)
+
+    def _render_key(self) -> Any:
+        """Return a key that changes whenever the rendered output of the message may change."""
+        return self._revision
 
     def __str__(self) -> str:
         """Return string representation of Message."""
@@ -39,10 +135,27 @@ class Message(ABC):
     def __len__(self) -> int:
         """Return the length of the Message."""
         try:
-            return len(self.render(render_format=RenderFormat.STRING))
+            return self._get_cached_size(RenderFormat.STRING,
+                                         lambda: len(self.render(render_format=RenderFormat.STRING)))
         except Exception:
             return 0
 
+    def _get_cached_size(self, key: Any, function: Callable[[], int]) -> int:
+        """
+        Get a size of the message, computing it only if the message has changed since it was cached.
+
+        :param key: size key (JSON codec name or render format)
+        :param function: size function
+        """
+        render_key = self._render_key()
+        if self._size_cache is None:
+            self._size_cache = {}
+        cached = self._size_cache.get(key)
+        if cached is None or cached[0] != render_key:
+            cached = (render_key, function())
+            self._size_cache[key] = cached
+        return cached[1]
+
     def __copy__(self) -> "Message":
         """
         Return a copy of the Message.
@@ -51,10 +164,34 @@ class Message(ABC):
         """
         _class = self.__class__
         result = _class.__new__(_class)
-        result.__dict__.update(self.__dict__)
+        result.__setstate__(self.__getstate__())
+        if hasattr(self, "__dict__"):
+            result.__dict__.update(self.__dict__)
+        result._tokens_cache = None
+        result._size_cache = None
+        result._id = None
         result.regenerate_id()
         return result
 
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the state of the Message, without its owners."""
+        state = {}
+        for class_ in self.__class__.__mro__:
+            for slot in getattr(class_, "__slots__", ()):
+                if slot not in ["_owners", "__weakref__"] and hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """
+        Restore the state of the Message.
+
+        :param state: state
+        """
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._owners = None
+
     def copy(self) -> "Message":
         """
         Return a copy of the Message.
@@ -95,40 +232,72 @@ class Message(ABC):
         self._mark_modified()
 
     @abstractmethod
-    def save(self, file_path: str) -> Dict[str, Any]:
+    def save(self, file_path: str, atomic: bool = False, fsync: bool = False,
+             checksum: bool = False) -> Dict[str, Any]:
         """
         Save method.
 
         :param file_path: message file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
         """
         pass  # pragma: no cover
 
-    def load(self, file_path: str) -> None:
+    def load(self, file_path: str, trusted: bool = False) -> None:
         """
         Load method.
 
         :param file_path: message file path
+        :param trusted: trusted file flag (skip the validation of files saved with a valid checksum)
         """
         _validate_path(file_path)
-        with open(file_path, "r") as file:
-            self.from_json(file.read())
+        with open(file_path, "rb") as file:
+            self.from_json(file.read(), trusted=trusted)
+
+    async def async_save(self, file_path: str, atomic: bool = False, fsync: bool = False,
+                         checksum: bool = False) -> Dict[str, Any]:
+        """
+        Save method that encodes and writes the file in a thread executor.
+
+        :param file_path: message file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
+        """
+        try:
+            data = self.to_json()
+        except Exception as e:
+            return {"status": False, "message": str(e)}
+        return await _run_in_executor(_save_json, file_path, data, atomic, fsync, checksum)
+
+    async def async_load(self, file_path: str, trusted: bool = False) -> None:
+        """
+        Load method that reads and decodes the file in a thread executor.
+
+        :param file_path: message file path
+        :param trusted: trusted file flag (skip the validation of files saved with a valid checksum)
+        """
+        self.from_json(await _run_in_executor(_read_json, file_path, trusted), trusted=trusted)
 
     @staticmethod
     @abstractmethod
-    def _validate_extract_json(json_object: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _validate_extract_json(json_object: Union[str, bytes, Dict[str, Any]], trusted: bool = False) -> Dict[str, Any]:
         """
         Validate and extract JSON object.
 
         :param json_object: JSON object
+        :param trusted: trusted JSON object flag
         """
         pass  # pragma: no cover
 
     @abstractmethod
-    def from_json(self, json_object: Union[str, Dict[str, Any]]) -> None:
+    def from_json(self, json_object: Union[str, bytes, Dict[str, Any]], trusted: bool = False) -> None:
         """
         Load attributes from the JSON object.
 
         :param json_object: JSON object
+        :param trusted: trusted JSON object flag
         """
         pass  # pragma: no cover
 
@@ -142,17 +311,43 @@ class Message(ABC):
         """Convert the message to a dictionary."""
         pass  # pragma: no cover
 
+    def _to_json_fields(self, fields: Optional[Set[str]]) -> Dict[str, Any]:
+        """
+        Convert the given fields of the message to a dictionary of JSON values.
+
+        :param fields: fields (all fields if None)
+        """
+        if fields is None:
+            return self.to_json()
+        return {field: self._get_json_field(field) for field in fields if field in self._json_fields}
+
+    def _get_json_field(self, field: str) -> Any:
+        """
+        Get a field of the message as a JSON value.
+
+        :param field: field name
+        """
+        if field == "role":
+            return self._role.value
+        if field == "date_created":
+            return _format_date(self.date_created)
+        if field == "date_modified":
+            return _format_date(self.date_modified)
+        if field == "memor_version":
+            return MEMOR_VERSION
+        return getattr(self, "_" + field)
+
     def get_size(self) -> int:
         """Get the size of the message in bytes."""
-        json_str = json.dumps(self.to_json())
-        return len(json_str.encode())
+        return self._get_cached_size(_get_json_codec(), lambda: len(_json_dumps(self.to_json())))
 
     def regenerate_id(self) -> None:
         """Regenerate ID."""
         new_id = self._id
         while new_id == self.id:
             new_id = generate_message_id()
-        self._id = new_id
+        self._set_id(new_id)
+        self._bump_revision()
 
     @property
     def message(self) -> str:
@@ -172,12 +367,12 @@ class Message(ABC):
     @property
     def date_created(self) -> datetime.datetime:
         """Get the creation date."""
-        return self._date_created
+        return _timestamp_to_datetime(self._date_created_timestamp, self._date_created_timezone)
 
     @property
     def date_modified(self) -> datetime.datetime:
         """Get the message object modification date."""
-        return self._date_modified
+        return _timestamp_to_datetime(self._date_modified_timestamp, self._date_modified_timezone)
 
     @property
     def id(self) -> str:
@@ -214,4 +409,11 @@ class Message(ABC):
 
         :param method: token estimator method
         """
-        return method(self.render(render_format=RenderFormat.STRING))
+        render_key = self._render_key()
+        if self._tokens_cache is None:
+            self._tokens_cache = {}
+        cached = self._tokens_cache.get(method)
+        if cached is None or cached[0] != render_key:
+            cached = (render_key, method(self.render(render_format=RenderFormat.STRING)))
+            self._tokens_cache[method] = cached
+        return cached[1]
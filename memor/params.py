@@ -4,6 +4,13 @@ from enum import Enum
 MEMOR_VERSION = "0.8"
 
 DATE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+PROMPT_FIELDS = frozenset(["type", "message", "responses", "selected_response_index", "tokens", "role", "id",
+                           "template", "memor_version", "date_created", "date_modified"])
+RESPONSE_FIELDS = frozenset(["type", "message", "score", "temperature", "top_k", "tokens", "inference_time", "top_p",
+                             "role", "model", "gpu", "id", "memor_version", "date_created", "date_modified"])
+SESSION_SEPARATOR = "\n"
+SESSION_LOG_COMPACTION_FACTOR = 2
+ARCHIVE_MAGIC = b"MEMORARC"
 
 INVALID_PATH_MESSAGE = "Invalid path: must be a string and refer to an existing location. Given path: {path}"
 INVALID_STR_VALUE_MESSAGE = "Invalid value. `{parameter_name}` must be a string."
@@ -19,6 +26,7 @@ INVALID_TEMPLATE_MESSAGE = "Invalid template. It must be an instance of `PromptT
 INVALID_RESPONSE_MESSAGE = "Invalid response. It must be an instance of `Response`."
 INVALID_MESSAGE = "Invalid message. It must be an instance of `Prompt` or `Response`."
 INVALID_MESSAGE_STATUS_LEN_MESSAGE = "Invalid message status length. It must be equal to the number of messages."
+INVALID_FILE_PATHS_LEN_MESSAGE = "Invalid file paths length. It must be equal to the number of sessions."
 INVALID_CUSTOM_MAP_MESSAGE = "Invalid custom map: it must be a dictionary with keys and values that can be converted to strings."
 INVALID_ROLE_MESSAGE = "Invalid role. It must be an instance of Role enum."
 INVALID_ID_MESSAGE = "Invalid message ID. It must be a valid UUIDv4."
@@ -27,7 +35,14 @@ INVALID_TEMPLATE_STRUCTURE_MESSAGE = "Invalid template structure. It should be a
 INVALID_PROMPT_STRUCTURE_MESSAGE = "Invalid prompt structure. It should be a JSON object with proper fields."
 INVALID_RESPONSE_STRUCTURE_MESSAGE = "Invalid response structure. It should be a JSON object with proper fields."
 INVALID_SESSION_STRUCTURE_MESSAGE = "Invalid session structure. It should be a JSON object with proper fields."
+INVALID_SESSION_LOG_STRUCTURE_MESSAGE = ("Invalid session log structure. "
+                                         "It should be a JSON Lines file with proper records.")
+INVALID_ARCHIVE_STRUCTURE_MESSAGE = "Invalid archive structure. It should be a Memor binary archive file."
 INVALID_RENDER_FORMAT_MESSAGE = "Invalid render format. It must be an instance of RenderFormat enum."
+INVALID_CHECKSUM_MESSAGE = "Invalid checksum. The file is corrupted or it was not saved with a checksum."
+INVALID_JSON_CODEC_MESSAGE = "Invalid JSON codec. It must be one of the installed codecs: {codecs}."
+SHARED_TEMPLATE_UPDATE_MESSAGE = "Shared templates (presets and loaded templates) are read-only. Use a copy instead."
+INVALID_BUDGET_STRATEGY_MESSAGE = "Invalid budget strategy. It must be an instance of BudgetStrategy enum."
 PROMPT_RENDER_ERROR_MESSAGE = "Prompt template and properties are incompatible."
 UNSUPPORTED_OPERAND_ERROR_MESSAGE = "Unsupported operand type(s) for {operator}: `{operand1}` and `{operand2}`"
 AI_STUDIO_SYSTEM_WARNING = "Google AI Studio models may not support content with a system role."
@@ -54,6 +69,15 @@ class RenderFormat(Enum):
     DEFAULT = STRING
 
 
+class BudgetStrategy(Enum):
+    """Token budget strategy."""
+
+    KEEP_NEWEST = "KEEP NEWEST"
+    KEEP_SYSTEM_AND_NEWEST = "KEEP SYSTEM AND NEWEST"
+    PIN_FIRST_N = "PIN FIRST N"
+    DEFAULT = KEEP_NEWEST
+
+
 class LLMModel(Enum):
     """LLM model enum."""
 
@@ -1,12 +1,10 @@
 # -*- coding: utf-8 -*-
 """Prompt class."""
-from typing import List, Dict, Union, Tuple, Any, Optional
-import datetime
-import json
+from typing import List, Dict, Set, Union, Tuple, Any, Optional
 import warnings
 from .message import Message
 from .params import MEMOR_VERSION
-from .params import DATE_TIME_FORMAT
+from .params import PROMPT_FIELDS
 from .params import RenderFormat, DATA_SAVE_SUCCESS_MESSAGE
 from .params import Role
 from .tokens_estimator import TokensEstimator
@@ -17,9 +15,13 @@ from .params import INVALID_RENDER_FORMAT_MESSAGE
 from .params import AI_STUDIO_SYSTEM_WARNING
 from .errors import MemorValidationError, MemorRenderError
 from .functions import get_time_utc, generate_message_id
+from .functions import _format_date, _parse_date
+from .functions import _json_dumps, _json_loads, _verify_checksum
 from .functions import _validate_string, _validate_pos_int, _validate_list_of
 from .functions import _validate_path, _validate_message_id
+from .functions import _run_in_executor, _save_json, _open_file
 from .template import PromptTemplate, PresetPromptTemplate
+from .template import _template_to_json, _template_from_json
 from .template import _BasicPresetPromptTemplate, _Instruction1PresetPromptTemplate, _Instruction2PresetPromptTemplate, _Instruction3PresetPromptTemplate
 from .response import Response
 
@@ -37,6 +39,9 @@ class Prompt(Message):
     'I am not fine.'
     """
 
+    __slots__ = ("_responses", "_template", "_selected_response_index")
+    _json_fields = PROMPT_FIELDS - {"template"}
+
     def __init__(
             self,
             message: str = "",
@@ -78,7 +83,18 @@ class Prompt(Message):
             self._id = generate_message_id()
         _validate_message_id(self._id)
         if init_check:
+            self._check_render()
+
+    def _check_render(self) -> None:
+        """Check that the prompt can be rendered, without rendering it if the template can be checked statically."""
+        requirements = self._template._get_render_requirements()
+        if requirements is None:
             _ = self.render()
+            return
+        renderable, needs_response, responses_count = requirements
+        if not renderable or (needs_response and self.selected_response is None) or \
+                len(self._responses) < responses_count:
+            raise MemorRenderError(PROMPT_RENDER_ERROR_MESSAGE)
 
     def __eq__(self, other_prompt: "Prompt") -> bool:
         """
@@ -96,6 +112,11 @@ class Prompt(Message):
         """Return string representation of Prompt."""
         return "Prompt(message={message})".format(message=self._message)
 
+    def _render_key(self) -> Any:
+        """Return a key that changes whenever the rendered output of the prompt may change."""
+        return (self._revision, id(self._template), self._template._render_key(),
+                tuple((id(response), response._revision) for response in self._responses))
+
     def add_response(self, response: Response, index: int = None) -> None:
         """
         Add a response to the prompt object.
@@ -167,56 +188,83 @@ class Prompt(Message):
             self._template = template.value
         self._mark_modified()
 
-    def save(self, file_path: str, save_template: bool = True) -> Dict[str, Any]:
+    def save(self, file_path: str, save_template: bool = True, atomic: bool = False,
+             fsync: bool = False, checksum: bool = False) -> Dict[str, Any]:
         """
         Save method.
 
         :param file_path: prompt file path
         :param save_template: save template flag
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
         """
         result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
         try:
-            with open(file_path, "w") as file:
+            with _open_file(file_path, atomic=atomic, fsync=fsync) as file:
                 data = self.to_json(save_template=save_template)
-                json.dump(data, file)
+                file.write(_json_dumps(data, checksum=checksum))
         except Exception as e:
             result["status"] = False
             result["message"] = str(e)
         return result
 
+    async def async_save(self, file_path: str, save_template: bool = True, atomic: bool = False,
+                         fsync: bool = False, checksum: bool = False) -> Dict[str, Any]:
+        """
+        Save method that encodes and writes the file in a thread executor.
+
+        :param file_path: prompt file path
+        :param save_template: save template flag
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
+        """
+        try:
+            data = self.to_json(save_template=save_template)
+        except Exception as e:
+            return {"status": False, "message": str(e)}
+        return await _run_in_executor(_save_json, file_path, data, atomic, fsync, checksum)
+
     @staticmethod
-    def _validate_extract_json(json_object: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _validate_extract_json(json_object: Union[str, bytes, Dict[str, Any]], trusted: bool = False) -> Dict[str, Any]:
         """
         Validate and extract JSON object.
 
         :param json_object: JSON object
+        :param trusted: trusted JSON object flag (encoded input needs a valid checksum, field validation is skipped)
         """
+        if isinstance(json_object, (str, bytes)):
+            _verify_checksum(json_object, required=trusted)
         try:
             result = dict()
-            if isinstance(json_object, str):
-                loaded_obj = json.loads(json_object)
+            if isinstance(json_object, (str, bytes)):
+                loaded_obj = _json_loads(json_object)
+            elif trusted:
+                loaded_obj = json_object
             else:
                 loaded_obj = json_object.copy()
             result["message"] = loaded_obj["message"]
             result["tokens"] = loaded_obj.get("tokens", None)
-            result["id"] = loaded_obj.get("id", generate_message_id())
+            result["id"] = loaded_obj["id"] if "id" in loaded_obj else generate_message_id()
             result["responses"] = []
             for response in loaded_obj["responses"]:
                 response_obj = Response()
-                response_obj.from_json(response)
+                response_obj._id = None
+                response_obj.from_json(response, trusted=trusted)
                 result["responses"].append(response_obj)
             result["role"] = Role(loaded_obj["role"])
             result["template"] = PresetPromptTemplate.DEFAULT.value
             if "template" in loaded_obj:
-                template = PromptTemplate()
-                template.from_json(loaded_obj["template"])
-                result["template"] = template
+                result["template"] = _template_from_json(loaded_obj["template"])
             result["memor_version"] = loaded_obj["memor_version"]
-            result["date_created"] = datetime.datetime.strptime(loaded_obj["date_created"], DATE_TIME_FORMAT)
-            result["date_modified"] = datetime.datetime.strptime(loaded_obj["date_modified"], DATE_TIME_FORMAT)
+            result["date_created"] = _parse_date(loaded_obj["date_created"])
+            result["date_modified"] = _parse_date(loaded_obj["date_modified"])
             result["selected_response_index"] = loaded_obj["selected_response_index"]
         except Exception:
             raise MemorValidationError(INVALID_PROMPT_STRUCTURE_MESSAGE)
+        if trusted:
+            return result
         _validate_string(result["message"], "message")
         if result["tokens"] is not None:
             _validate_pos_int(result["tokens"], "tokens")
@@ -225,22 +273,23 @@ class Prompt(Message):
         _validate_pos_int(result["selected_response_index"], "selected_response_index")
         return result
 
-    def from_json(self, json_object: Union[str, Dict[str, Any]]) -> None:
+    def from_json(self, json_object: Union[str, bytes, Dict[str, Any]], trusted: bool = False) -> None:
         """
         Load attributes from the JSON object.
 
         :param json_object: JSON object
+        :param trusted: trusted JSON object flag (encoded input needs a valid checksum, field validation is skipped)
         """
-        data = self._validate_extract_json(json_object)
+        data = self._validate_extract_json(json_object, trusted=trusted)
         self._message = data["message"]
         self._tokens = data["tokens"]
-        self._id = data["id"]
+        self._set_id(data["id"])
         self._responses = data["responses"]
         self._role = data["role"]
         self._template = data["template"]
         self._memor_version = data["memor_version"]
-        self._date_created = data["date_created"]
-        self._date_modified = data["date_modified"]
+        self._set_date_created(data["date_created"])
+        self._set_date_modified(data["date_modified"])
         self.select_response(data["selected_response_index"])
 
     def to_json(self, save_template: bool = True) -> Dict[str, Any]:
@@ -249,14 +298,14 @@ class Prompt(Message):
 
         :param save_template: save template flag
         """
-        data = self.to_dict(save_template=save_template).copy()
+        data = self.to_dict(save_template=save_template)
         for index, response in enumerate(data["responses"]):
             data["responses"][index] = response.to_json()
         if "template" in data:
-            data["template"] = data["template"].to_json()
+            data["template"] = _template_to_json(data["template"])
         data["role"] = data["role"].value
-        data["date_created"] = datetime.datetime.strftime(data["date_created"], DATE_TIME_FORMAT)
-        data["date_modified"] = datetime.datetime.strftime(data["date_modified"], DATE_TIME_FORMAT)
+        data["date_created"] = _format_date(data["date_created"])
+        data["date_modified"] = _format_date(data["date_modified"])
         return data
 
     def to_dict(self, save_template: bool = True) -> Dict[str, Any]:
@@ -275,13 +324,35 @@ class Prompt(Message):
             "id": self._id,
             "template": self._template,
             "memor_version": MEMOR_VERSION,
-            "date_created": self._date_created,
-            "date_modified": self._date_modified,
+            "date_created": self.date_created,
+            "date_modified": self.date_modified,
         }
         if not save_template:
             del data["template"]
         return data
 
+    def _to_json_fields(self, fields: Optional[Set[str]]) -> Dict[str, Any]:
+        """
+        Convert the given fields of the prompt (without template) to a dictionary of JSON values.
+
+        :param fields: fields (all fields if None)
+        """
+        if fields is None:
+            return self.to_json(save_template=False)
+        return super()._to_json_fields(fields)
+
+    def _get_json_field(self, field: str) -> Any:
+        """
+        Get a field of the prompt as a JSON value.
+
+        :param field: field name
+        """
+        if field == "type":
+            return "Prompt"
+        if field == "responses":
+            return [response.to_json() for response in self._responses]
+        return super()._get_json_field(field)
+
     @property
     def responses(self) -> List[Response]:
         """Get the prompt responses."""
@@ -310,19 +381,27 @@ class Prompt(Message):
         if not isinstance(render_format, RenderFormat):
             raise MemorValidationError(INVALID_RENDER_FORMAT_MESSAGE)
         try:
-            format_kwargs = {"prompt": self.to_json(save_template=False)}
-            if isinstance(self.selected_response, Response):
-                format_kwargs.update({"response": self.selected_response.to_json()})
-            responses_dicts = []
-            for _, response in enumerate(self._responses):
-                responses_dicts.append(response.to_json())
-            format_kwargs.update({"responses": responses_dicts})
+            fields = self._template._fields
             custom_map = self._template._custom_map
-            if custom_map is not None:
-                format_kwargs.update(custom_map)
+            if self._template._is_message_only():
+                format_kwargs = {"prompt": {"message": self._message}}
+                if custom_map is not None:
+                    format_kwargs.update(custom_map)
+            else:
+                format_kwargs = {}
+                if fields is None or "prompt" in fields:
+                    format_kwargs["prompt"] = self._to_json_fields(None if fields is None else fields["prompt"])
+                selected_response = self.selected_response
+                if isinstance(selected_response, Response) and (fields is None or "response" in fields):
+                    format_kwargs["response"] = selected_response._to_json_fields(
+                        None if fields is None else fields["response"])
+                if fields is None or "responses" in fields:
+                    responses_fields = None if fields is None else fields["responses"]
+                    format_kwargs["responses"] = [response._to_json_fields(responses_fields)
+                                                  for response in self._responses]
+                if custom_map is not None:
+                    format_kwargs.update(custom_map)
             content = self._template._content.format(**format_kwargs)
-            prompt_dict = self.to_dict()
-            prompt_dict["content"] = content
             if render_format == RenderFormat.OPENAI:
                 return {"role": self._role.value, "content": content}
             if render_format == RenderFormat.AI_STUDIO:
@@ -334,6 +413,8 @@ class Prompt(Message):
                 return {"role": role_str, "parts": [{"text": content}]}
             if render_format == RenderFormat.STRING:
                 return content
+            prompt_dict = self.to_dict()
+            prompt_dict["content"] = content
             if render_format == RenderFormat.DICTIONARY:
                 return prompt_dict
             if render_format == RenderFormat.ITEMS:
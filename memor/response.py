@@ -2,20 +2,22 @@
 """Response class."""
 from typing import List, Dict, Union, Tuple, Any
 import datetime
-import json
 import warnings
 from .message import Message
 from .params import MEMOR_VERSION
-from .params import DATE_TIME_FORMAT
 from .params import DATA_SAVE_SUCCESS_MESSAGE
 from .params import INVALID_RESPONSE_STRUCTURE_MESSAGE
 from .params import INVALID_RENDER_FORMAT_MESSAGE, INVALID_MODEL_MESSAGE
 from .params import AI_STUDIO_SYSTEM_WARNING
 from .params import Role, RenderFormat, LLMModel
+from .params import RESPONSE_FIELDS
 from .errors import MemorValidationError
 from .functions import get_time_utc, generate_message_id
+from .functions import _format_date, _parse_date
+from .functions import _json_dumps, _json_loads, _verify_checksum
 from .functions import _validate_string, _validate_pos_float, _validate_pos_int, _validate_message_id
 from .functions import _validate_date_time, _validate_probability
+from .functions import _open_file
 
 
 class Response(Message):
@@ -28,6 +30,9 @@ class Response(Message):
     'Hello!'
     """
 
+    __slots__ = ("_score", "_temperature", "_top_k", "_top_p", "_inference_time", "_model", "_gpu")
+    _json_fields = RESPONSE_FIELDS
+
     def __init__(
             self,
             message: str = "",
@@ -92,7 +97,7 @@ class Response(Message):
                 self.update_inference_time(inference_time)
             if date:
                 _validate_date_time(date, "date")
-                self._date_created = date
+                self._set_date_created(date)
             self._id = generate_message_id()
         _validate_message_id(self._id)
 
@@ -187,32 +192,41 @@ class Response(Message):
         self._gpu = gpu
         self._mark_modified()
 
-    def save(self, file_path: str) -> Dict[str, Any]:
+    def save(self, file_path: str, atomic: bool = False, fsync: bool = False,
+             checksum: bool = False) -> Dict[str, Any]:
         """
         Save method.
 
         :param file_path: response file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
         """
         result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
         try:
-            with open(file_path, "w") as file:
-                json.dump(self.to_json(), file)
+            with _open_file(file_path, atomic=atomic, fsync=fsync) as file:
+                file.write(_json_dumps(self.to_json(), checksum=checksum))
         except Exception as e:
             result["status"] = False
             result["message"] = str(e)
         return result
 
     @staticmethod
-    def _validate_extract_json(json_object: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _validate_extract_json(json_object: Union[str, bytes, Dict[str, Any]], trusted: bool = False) -> Dict[str, Any]:
         """
         Validate and extract JSON object.
 
         :param json_object: JSON object
+        :param trusted: trusted JSON object flag (encoded input needs a valid checksum, field validation is skipped)
         """
+        if isinstance(json_object, (str, bytes)):
+            _verify_checksum(json_object, required=trusted)
         try:
             result = dict()
-            if isinstance(json_object, str):
-                loaded_obj = json.loads(json_object)
+            if isinstance(json_object, (str, bytes)):
+                loaded_obj = _json_loads(json_object)
+            elif trusted:
+                loaded_obj = json_object
             else:
                 loaded_obj = json_object.copy()
             result["message"] = loaded_obj["message"]
@@ -226,11 +240,13 @@ class Response(Message):
             result["gpu"] = loaded_obj.get("gpu", None)
             result["role"] = Role(loaded_obj["role"])
             result["memor_version"] = loaded_obj["memor_version"]
-            result["id"] = loaded_obj.get("id", generate_message_id())
-            result["date_created"] = datetime.datetime.strptime(loaded_obj["date_created"], DATE_TIME_FORMAT)
-            result["date_modified"] = datetime.datetime.strptime(loaded_obj["date_modified"], DATE_TIME_FORMAT)
+            result["id"] = loaded_obj["id"] if "id" in loaded_obj else generate_message_id()
+            result["date_created"] = _parse_date(loaded_obj["date_created"])
+            result["date_modified"] = _parse_date(loaded_obj["date_modified"])
         except Exception:
             raise MemorValidationError(INVALID_RESPONSE_STRUCTURE_MESSAGE)
+        if trusted:
+            return result
         _validate_string(result["message"], "message")
         if result["score"] is not None:
             _validate_probability(result["score"], "score")
@@ -251,13 +267,14 @@ class Response(Message):
         _validate_string(result["memor_version"], "memor_version")
         return result
 
-    def from_json(self, json_object: Union[str, Dict[str, Any]]) -> None:
+    def from_json(self, json_object: Union[str, bytes, Dict[str, Any]], trusted: bool = False) -> None:
         """
         Load attributes from the JSON object.
 
         :param json_object: JSON object
+        :param trusted: trusted JSON object flag (encoded input needs a valid checksum, field validation is skipped)
         """
-        data = self._validate_extract_json(json_object)
+        data = self._validate_extract_json(json_object, trusted=trusted)
         self._message = data["message"]
         self._score = data["score"]
         self._temperature = data["temperature"]
@@ -269,18 +286,29 @@ class Response(Message):
         self._gpu = data["gpu"]
         self._role = data["role"]
         self._memor_version = data["memor_version"]
-        self._id = data["id"]
-        self._date_created = data["date_created"]
-        self._date_modified = data["date_modified"]
+        self._set_id(data["id"])
+        self._set_date_created(data["date_created"])
+        self._set_date_modified(data["date_modified"])
+        self._bump_revision()
 
     def to_json(self) -> Dict[str, Any]:
         """Convert the response to a JSON object."""
         data = self.to_dict().copy()
-        data["date_created"] = datetime.datetime.strftime(data["date_created"], DATE_TIME_FORMAT)
-        data["date_modified"] = datetime.datetime.strftime(data["date_modified"], DATE_TIME_FORMAT)
+        data["date_created"] = _format_date(data["date_created"])
+        data["date_modified"] = _format_date(data["date_modified"])
         data["role"] = data["role"].value
         return data
 
+    def _get_json_field(self, field: str) -> Any:
+        """
+        Get a field of the response as a JSON value.
+
+        :param field: field name
+        """
+        if field == "type":
+            return "Response"
+        return super()._get_json_field(field)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert the response to a dictionary."""
         return {
@@ -297,8 +325,8 @@ class Response(Message):
             "gpu": self._gpu,
             "id": self._id,
             "memor_version": MEMOR_VERSION,
-            "date_created": self._date_created,
-            "date_modified": self._date_modified,
+            "date_created": self.date_created,
+            "date_modified": self.date_modified,
         }
 
     def render(self,
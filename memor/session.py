@@ -1,24 +1,70 @@
 # -*- coding: utf-8 -*-
 """Session class."""
-from typing import List, Dict, Tuple, Any, Union, Generator
+from typing import List, Dict, Set, Tuple, Any, Union, Generator, Optional
+import os
 import datetime
-import json
 import re
+import asyncio
+import warnings
 from .params import MEMOR_VERSION
-from .params import DATE_TIME_FORMAT, DATA_SAVE_SUCCESS_MESSAGE
-from .params import INVALID_MESSAGE
+from .params import DATA_SAVE_SUCCESS_MESSAGE, SESSION_SEPARATOR
+from .params import SESSION_LOG_COMPACTION_FACTOR, INVALID_SESSION_LOG_STRUCTURE_MESSAGE
+from .params import INVALID_CHECKSUM_MESSAGE, AI_STUDIO_SYSTEM_WARNING
+from .params import INVALID_MESSAGE, INVALID_FILE_PATHS_LEN_MESSAGE, INVALID_POSINT_VALUE_MESSAGE
 from .params import INVALID_SESSION_STRUCTURE_MESSAGE, INVALID_RENDER_FORMAT_MESSAGE
 from .params import INVALID_INT_OR_STR_MESSAGE, INVALID_INT_OR_STR_SLICE_MESSAGE
-from .params import UNSUPPORTED_OPERAND_ERROR_MESSAGE
-from .params import RenderFormat
+from .params import UNSUPPORTED_OPERAND_ERROR_MESSAGE, INVALID_BUDGET_STRATEGY_MESSAGE
+from .params import RenderFormat, BudgetStrategy, Role
 from .tokens_estimator import TokensEstimator
 from .prompt import Prompt
 from .response import Response
 from .errors import MemorValidationError, MemorRenderError
-from .functions import get_time_utc
+from .functions import get_time_utc, _copy_render
+from .functions import _format_date, _parse_date
+from .functions import _json_dumps, _json_loads, _verify_checksum
 from .functions import _validate_bool, _validate_path
 from .functions import _validate_list_of, _validate_string
 from .functions import _validate_status, _validate_pos_int
+from .functions import _run_in_executor, _save_json, _open_file
+from .functions import _get_trigrams, _get_query_trigrams
+
+
+class _MessageList(list):
+    """Session messages list that counts its changes, so the session indexes can detect direct changes."""
+
+    __slots__ = ("_version",)
+
+    def __init__(self, *args: Any) -> None:
+        """
+        Session messages list object initiator.
+
+        :param args: list arguments
+        """
+        super().__init__(*args)
+        self._version = 0
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Return the pickle state of the list, which starts counting from zero again."""
+        return _MessageList, (list(self),)
+
+
+def _counted(method: Any) -> Any:
+    """
+    Wrap a list method to count the changes it makes.
+
+    :param method: list method
+    """
+    def wrapper(self: _MessageList, *args: Any, **kwargs: Any) -> Any:
+        self._version += 1
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _method_name in ["__setitem__", "__delitem__", "__iadd__", "__imul__", "append", "extend", "insert", "pop",
+                     "remove", "clear", "sort", "reverse"]:
+    setattr(_MessageList, _method_name, _counted(getattr(list, _method_name)))
 
 
 class Session:
@@ -27,7 +73,7 @@ class Session:
     def __init__(
             self,
             title: str = None,
-            messages: List[Union[Prompt, Response]] = [],
+            messages: List[Union[Prompt, Response]] = None,
             file_path: str = None,
             init_check: bool = True) -> None:
         """
@@ -40,8 +86,14 @@ class Session:
         """
         self._title = None
         self._render_counter = 0
-        self._messages = []
+        self._messages = _MessageList()
         self._messages_status = []
+        self._render_cache = []
+        self._messages_index = None
+        self._search_index = None
+        self._hydrated = True
+        self._trusted = False
+        self._log_state = None
         self._date_created = get_time_utc()
         self._mark_modified()
         self._memor_version = MEMOR_VERSION
@@ -53,7 +105,9 @@ class Session:
             if messages is not None:
                 self.update_messages(messages)
         if init_check:
-            _ = self.render(enable_counter=False)
+            for message in self._messages:
+                if isinstance(message, Prompt):
+                    message._check_render()
 
     def _mark_modified(self) -> None:
         """Mark modification."""
@@ -66,7 +120,7 @@ class Session:
         :param other_session: other session
         """
         if isinstance(other_session, Session):
-            return self._title == other_session._title and self._messages == other_session._messages
+            return self._title == other_session._title and self.messages == other_session.messages
         return False
 
     def __str__(self) -> str:
@@ -83,7 +137,8 @@ class Session:
 
     def __iter__(self) -> Generator[Union[Prompt, Response], None, None]:
         """Iterate through the Session object."""
-        yield from self._messages
+        for index in range(len(self._messages)):
+            yield self._get_message(index)
 
     def __add__(self, other_object: Union["Session", Response, Prompt]) -> "Session":
         """
@@ -92,11 +147,17 @@ class Session:
         :param other_object: other object
         """
         if isinstance(other_object, (Response, Prompt)):
-            new_messages = self._messages + [other_object]
-            return Session(title=self.title, messages=new_messages)
+            if isinstance(other_object, Prompt):
+                other_object._check_render()
+            result = Session(title=self._title, init_check=False)
+            result._extend(self)
+            result._extend(other_object)
+            return result
         if isinstance(other_object, Session):
-            new_messages = self._messages + other_object._messages
-            return Session(messages=new_messages)
+            result = Session(init_check=False)
+            result._extend(self)
+            result._extend(other_object)
+            return result
         raise TypeError(
             UNSUPPORTED_OPERAND_ERROR_MESSAGE.format(
                 operator="+",
@@ -110,21 +171,70 @@ class Session:
         :param other_object: other object
         """
         if isinstance(other_object, (Response, Prompt)):
-            new_messages = [other_object] + self._messages
-            return Session(title=self.title, messages=new_messages)
+            if isinstance(other_object, Prompt):
+                other_object._check_render()
+            result = Session(title=self._title, init_check=False)
+            result._extend(other_object)
+            result._extend(self)
+            return result
         raise TypeError(
             UNSUPPORTED_OPERAND_ERROR_MESSAGE.format(
                 operator="+",
                 operand1="Session",
                 operand2=type(other_object).__name__))
 
-    def __contains__(self, message: Union[Prompt, Response]) -> bool:
+    def __iadd__(self, other_object: Union["Session", Response, Prompt]) -> "Session":
+        """
+        In-place addition method.
+
+        :param other_object: other object
+        """
+        if isinstance(other_object, (Response, Prompt, Session)):
+            if isinstance(other_object, Prompt):
+                other_object._check_render()
+            self._extend(other_object)
+            return self
+        raise TypeError(
+            UNSUPPORTED_OPERAND_ERROR_MESSAGE.format(
+                operator="+=",
+                operand1="Session",
+                operand2=type(other_object).__name__))
+
+    def _extend(self, other_object: Union["Session", Response, Prompt]) -> None:
+        """
+        Append a message or the messages of a session, keeping their statuses and render caches.
+
+        :param other_object: other object
+        """
+        if not isinstance(other_object, Session):
+            self.add_message(other_object)
+            return
+        if not other_object._hydrated:
+            if self._hydrated:
+                self._trusted = other_object._trusted
+            elif self._trusted != other_object._trusted:
+                other_object._hydrate_messages()
+        count = len(other_object._messages)
+        if len(other_object._render_cache) != count:
+            other_object._render_cache = count * [None]
+        version = self._messages._version
+        self._messages.extend(other_object._messages[:count])
+        self._messages_status.extend(other_object._messages_status[:count])
+        self._render_cache.extend(other_object._render_cache[:count])
+        self._hydrated = self._hydrated and other_object._hydrated
+        self._add_to_messages_index(version, len(self._messages) - count, count)
+        self._add_to_search_index(version, len(self._messages) - count, count)
+        self._mark_modified()
+
+    def __contains__(self, message: Union[Prompt, Response, str]) -> bool:
         """
         Check if the Session contains the given message.
 
-        :param message: message
+        :param message: message or message id
         """
-        return message in self._messages
+        if isinstance(message, str):
+            return self._find_message_index(message) is not None
+        return message in self.messages
 
     def __getitem__(self, identifier: Union[int, slice, str]) -> Union[Prompt, Response]:
         """
@@ -139,8 +249,21 @@ class Session:
         _class = self.__class__
         result = _class.__new__(_class)
         result.__dict__.update(self.__dict__)
+        result._log_state = None
+        result._render_cache = len(self._messages) * [None]
+        result._messages_index = None
+        if self._search_index is not None:
+            result._search_index = self._new_search_index()
         return result
 
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the state of the Session, without its indexes."""
+        state = self.__dict__.copy()
+        state["_messages_index"] = None
+        if self._search_index is not None:
+            state["_search_index"] = self._new_search_index()
+        return state
+
     def copy(self) -> "Session":
         """Return a copy of the Session object."""
         return self.__copy__()
@@ -154,20 +277,425 @@ class Session:
         :param case_sensitive: case sensitivity flag
         """
         flags = 0 if case_sensitive else re.IGNORECASE
-        if not use_regex:
-            query = re.escape(query)
-        pattern = re.compile(query, flags)
+        pattern = re.compile(query if use_regex else re.escape(query), flags)
+        indices = range(len(self._messages))
+        if self._search_index is not None:
+            trigrams = _get_query_trigrams(query, use_regex)
+            if trigrams:
+                indices = self._get_search_candidates(trigrams)
         result = []
-        for index, message in enumerate(self.messages):
-            if isinstance(message, (Prompt, Response)):
-                try:
-                    searchable_str = message.render(render_format=RenderFormat.STRING)
-                    if pattern.search(searchable_str):
-                        result.append(index)
-                except MemorRenderError:
-                    continue
+        for index in indices:
+            try:
+                searchable_str = self._render_message(index, RenderFormat.STRING)
+                if pattern.search(searchable_str):
+                    result.append(index)
+            except MemorRenderError:
+                continue
         return result
 
+    def enable_search_index(self) -> None:
+        """Enable the search index, which limits searches to the messages that may match the query."""
+        if self._search_index is None:
+            self._search_index = self._new_search_index()
+            self._sync_search_index()
+
+    def disable_search_index(self) -> None:
+        """Disable the search index."""
+        self._search_index = None
+
+    @staticmethod
+    def _new_search_index() -> Dict[str, Any]:
+        """Return an empty search index, which is synced with the messages on the next search."""
+        return {"messages": {}, "trigrams": {}, "unindexed": set(), "positions": {}, "templates": {},
+                "responses": {}, "dirty": set(), "version": None}
+
+    def _message_changed(self, message: Union[Prompt, Response], old_id: Optional[str] = None) -> None:
+        """
+        Update the session indexes after a change to a message owned by the session (called by the message).
+
+        :param message: changed message
+        :param old_id: old message id (if the id has changed)
+        """
+        if self._search_index is not None:
+            message_key = id(message)
+            if message_key in self._search_index["messages"]:
+                self._search_index["dirty"].add(message_key)
+            self._search_index["dirty"].update(self._search_index["responses"].get(message_key, ()))
+        if old_id is not None:
+            self._rename_in_messages_index(message, old_id)
+
+    def _fill_search_entry(self, entry: List[Any], index: int) -> None:
+        """
+        Fill a search index entry with the trigrams of the message render.
+
+        :param entry: search index entry
+        :param index: index of an occurrence of the message
+        """
+        message = entry[0]
+        message_key = id(message)
+        entry[1] = message._render_key()
+        try:
+            trigrams = _get_trigrams(self._render_message(index, RenderFormat.STRING))
+        except MemorRenderError:
+            trigrams = frozenset()
+        entry[2] = trigrams
+        if trigrams is None:
+            self._search_index["unindexed"].add(message_key)
+        else:
+            postings = self._search_index["trigrams"]
+            for trigram in trigrams:
+                postings.setdefault(trigram, set()).add(message_key)
+        if isinstance(message, Prompt):
+            template = message._template
+            templates = self._search_index["templates"]
+            if id(template) not in templates:
+                templates[id(template)] = [template, template._render_key(), set()]
+            templates[id(template)][2].add(message_key)
+            entry[4] = template
+            entry[5] = tuple(message._responses)
+            for response in entry[5]:
+                self._search_index["responses"].setdefault(id(response), set()).add(message_key)
+                response._add_owner(self)
+
+    def _clear_search_entry(self, entry: List[Any]) -> None:
+        """
+        Drop the trigrams, the template and the responses of a search index entry from the search index.
+
+        :param entry: search index entry
+        """
+        message_key = id(entry[0])
+        if entry[2] is None:
+            self._search_index["unindexed"].discard(message_key)
+        else:
+            postings = self._search_index["trigrams"]
+            for trigram in entry[2]:
+                postings[trigram].discard(message_key)
+                if not postings[trigram]:
+                    del postings[trigram]
+        if entry[4] is not None:
+            templates = self._search_index["templates"]
+            templates[id(entry[4])][2].discard(message_key)
+            if not templates[id(entry[4])][2]:
+                del templates[id(entry[4])]
+            responses = self._search_index["responses"]
+            for response in entry[5]:
+                prompts = responses.get(id(response), set())
+                prompts.discard(message_key)
+                if not prompts:
+                    responses.pop(id(response), None)
+        entry[4] = None
+        entry[5] = ()
+
+    def _index_message(self, index: int) -> None:
+        """
+        Add the message at the given index to the search index.
+
+        :param index: message index
+        """
+        message = self._get_message(index)
+        entry = self._search_index["messages"].get(id(message))
+        if entry is None:
+            entry = [message, None, None, 0, None, ()]
+            self._search_index["messages"][id(message)] = entry
+            self._fill_search_entry(entry, index)
+            message._add_owner(self)
+        entry[3] += 1
+        if self._search_index["positions"] is not None:
+            self._search_index["positions"].setdefault(id(message), []).append(index)
+
+    def _unindex_message(self, message: Union[Prompt, Response]) -> None:
+        """
+        Remove one occurrence of a message from the search index.
+
+        :param message: message
+        """
+        entry = self._search_index["messages"].get(id(message))
+        if entry is None:
+            return
+        entry[3] -= 1
+        if entry[3] > 0:
+            return
+        self._clear_search_entry(entry)
+        del self._search_index["messages"][id(message)]
+        self._search_index["dirty"].discard(id(message))
+
+    def _add_to_search_index(self, version: int, index: int, count: int = 1) -> None:
+        """
+        Index the messages added to the session at the given index.
+
+        :param version: messages list version before the change
+        :param index: index of the first added message
+        :param count: number of added messages
+        """
+        if self._search_index is None or self._search_index["version"] != version:
+            return
+        if index + count < len(self._messages):
+            self._search_index["positions"] = None
+        for message_index in range(index, index + count):
+            self._index_message(message_index)
+        self._search_index["version"] = self._messages._version
+
+    def _remove_from_search_index(self, version: int, message: Union[Prompt, Response], index: int) -> None:
+        """
+        Drop a message removed from the session at the given index from the search index.
+
+        :param version: messages list version before the change
+        :param message: removed message
+        :param index: message index before the removal
+        """
+        if self._search_index is None or self._search_index["version"] != version:
+            return
+        positions = self._search_index["positions"]
+        if positions is not None and index == len(self._messages):
+            positions[id(message)].pop()
+            if not positions[id(message)]:
+                del positions[id(message)]
+        else:
+            self._search_index["positions"] = None
+        self._unindex_message(message)
+        self._search_index["version"] = self._messages._version
+
+    def _reset_search_index(self) -> None:
+        """Mark the search index for a full sync after the messages have been replaced."""
+        if self._search_index is not None:
+            self._search_index["version"] = None
+
+    def _check_search_templates(self) -> None:
+        """Mark the prompts of the templates changed since they were indexed (custom maps can be edited in place)."""
+        for template_entry in self._search_index["templates"].values():
+            render_key = template_entry[0]._render_key()
+            if render_key != template_entry[1]:
+                template_entry[1] = render_key
+                self._search_index["dirty"].update(template_entry[2])
+
+    def _sync_search_index(self) -> None:
+        """
+        Re-index all the changed messages and drop the removed ones.
+
+        It only runs after the messages list has been replaced or changed without the session methods.
+        """
+        self._hydrate_messages()
+        self._check_search_templates()
+        entries = self._search_index["messages"]
+        self._search_index["positions"] = {}
+        self._search_index["dirty"] = set()
+        for entry in entries.values():
+            entry[3] = 0
+        for index in range(len(self._messages)):
+            self._index_message(index)
+        for message_key, entry in list(entries.items()):
+            if entry[3] == 0:
+                self._clear_search_entry(entry)
+                del entries[message_key]
+            elif entry[1] != entry[0]._render_key():
+                self._clear_search_entry(entry)
+                self._fill_search_entry(entry, self._get_search_positions()[message_key][0])
+        self._search_index["version"] = self._messages._version
+
+    def _refresh_search_index(self) -> None:
+        """Re-index the messages changed since the last search, or sync the search index if the list has changed."""
+        if self._search_index["version"] != self._messages._version:
+            self._sync_search_index()
+            return
+        self._check_search_templates()
+        entries = self._search_index["messages"]
+        dirty = self._search_index["dirty"]
+        while dirty:
+            message_key = dirty.pop()
+            entry = entries.get(message_key)
+            if entry is not None and entry[1] != entry[0]._render_key():
+                self._clear_search_entry(entry)
+                self._fill_search_entry(entry, self._get_search_positions()[message_key][0])
+
+    def _get_search_positions(self) -> Dict[int, List[int]]:
+        """Get the indices of the indexed messages, rebuilding them after a message was inserted or removed."""
+        positions = self._search_index["positions"]
+        if positions is None:
+            positions = {}
+            for index, message in enumerate(self._messages):
+                positions.setdefault(id(message), []).append(index)
+            self._search_index["positions"] = positions
+        return positions
+
+    def _get_search_candidates(self, trigrams: Set[str]) -> List[int]:
+        """
+        Get the indices of the messages that the search index can not rule out for the query trigrams.
+
+        :param trigrams: query trigrams
+        """
+        self._refresh_search_index()
+        postings = self._search_index["trigrams"]
+        candidates = None
+        for trigram in sorted(trigrams, key=lambda trigram: len(postings.get(trigram, ()))):
+            trigram_postings = postings.get(trigram, set())
+            candidates = trigram_postings if candidates is None else candidates & trigram_postings
+            if not candidates:
+                break
+        candidates = candidates | self._search_index["unindexed"]
+        positions = self._get_search_positions()
+        return sorted(index for message_key in candidates for index in positions[message_key])
+
+    @staticmethod
+    def _message_from_json(json_object: Dict[str, Any], trusted: bool = False) -> Union[Prompt, Response]:
+        """
+        Create a message from the JSON object.
+
+        :param json_object: message JSON object
+        :param trusted: trusted JSON object flag
+        """
+        if json_object["type"] == "Prompt":
+            message = Prompt(init_check=False)
+        elif json_object["type"] == "Response":
+            message = Response()
+        message._id = None
+        message.from_json(json_object, trusted=trusted)
+        return message
+
+    def _get_message(self, index: int) -> Union[Prompt, Response]:
+        """
+        Get a message by index, hydrating it if it is still a raw JSON object (lazy load).
+
+        :param index: message index
+        """
+        message = self._messages[index]
+        if isinstance(message, dict):
+            raw_message = message
+            message = self._message_from_json(raw_message, trusted=self._trusted)
+            list.__setitem__(self._messages, index, message)
+            if self._messages_index is not None:
+                message._add_owner(self)
+            if self._log_state is not None:
+                log_entry = self._log_state["raw_entries"].pop(id(raw_message), None)
+                if log_entry is not None:
+                    log_entry[0] = message
+                    log_entry[1] = message._render_key()
+        return message
+
+    def _hydrate_messages(self) -> None:
+        """Hydrate all raw JSON messages (lazy load)."""
+        if not self._hydrated:
+            for index in range(len(self._messages)):
+                self._get_message(index)
+            self._hydrated = True
+
+    def _get_message_id(self, index: int) -> str:
+        """
+        Get the id of a message by index, without hydrating it if possible.
+
+        :param index: message index
+        """
+        message = self._messages[index]
+        if isinstance(message, dict) and "id" in message:
+            return message["id"]
+        return self._get_message(index).id
+
+    def _build_messages_index(self) -> None:
+        """Build the message id to index mapping, registering the session as the owner of its messages."""
+        ids = {}
+        duplicates = set()
+        for index in range(len(self._messages)):
+            message_id = self._get_message_id(index)
+            if message_id in ids:
+                duplicates.add(message_id)
+            else:
+                ids[message_id] = index
+            if not isinstance(self._messages[index], dict):
+                self._messages[index]._add_owner(self)
+        self._messages_index = {"ids": ids, "duplicates": duplicates, "version": self._messages._version}
+
+    def _find_message_index(self, message_id: str) -> Optional[int]:
+        """
+        Find the index of the first message with the given id.
+
+        The mapping is kept up to date by the session methods and the message id changes, and it is only rebuilt
+        after the messages list has been replaced or changed directly.
+
+        :param message_id: message id
+        """
+        if self._messages_index is None or self._messages_index["version"] != self._messages._version:
+            self._build_messages_index()
+        return self._messages_index["ids"].get(message_id)
+
+    def _add_to_messages_index(self, version: int, index: int, count: int = 1) -> None:
+        """
+        Add the messages added to the session at the given index to the message id to index mapping.
+
+        :param version: messages list version before the change
+        :param index: index of the first added message
+        :param count: number of added messages
+        """
+        messages_index = self._messages_index
+        if messages_index is None or messages_index["version"] != version:
+            self._messages_index = None
+            return
+        ids = messages_index["ids"]
+        if index + count < len(self._messages):
+            for message_id, message_index in ids.items():
+                if message_index >= index:
+                    ids[message_id] = message_index + count
+        for message_index in range(index, index + count):
+            message_id = self._get_message_id(message_index)
+            if message_id in ids:
+                messages_index["duplicates"].add(message_id)
+                ids[message_id] = min(ids[message_id], message_index)
+            else:
+                ids[message_id] = message_index
+            if not isinstance(self._messages[message_index], dict):
+                self._messages[message_index]._add_owner(self)
+        messages_index["version"] = self._messages._version
+
+    def _remove_from_messages_index(self, version: int, message_id: str, index: int) -> None:
+        """
+        Drop a message removed from the session at the given index from the message id to index mapping.
+
+        :param version: messages list version before the change
+        :param message_id: removed message id
+        :param index: message index before the removal
+        """
+        messages_index = self._messages_index
+        if messages_index is None or messages_index["version"] != version:
+            self._messages_index = None
+            return
+        ids = messages_index["ids"]
+        if index < len(self._messages):
+            for other_id, message_index in ids.items():
+                if message_index > index:
+                    ids[other_id] = message_index - 1
+        if ids.get(message_id) == index:
+            del ids[message_id]
+            if message_id in messages_index["duplicates"]:
+                next_index = next((message_index for message_index in range(index, len(self._messages))
+                                   if self._get_message_id(message_index) == message_id), None)
+                if next_index is None:
+                    messages_index["duplicates"].discard(message_id)
+                else:
+                    ids[message_id] = next_index
+        messages_index["version"] = self._messages._version
+
+    def _rename_in_messages_index(self, message: Union[Prompt, Response], old_id: str) -> None:
+        """
+        Update the message id to index mapping after the id of a message has changed.
+
+        :param message: message
+        :param old_id: old message id
+        """
+        messages_index = self._messages_index
+        if messages_index is None or messages_index["version"] != self._messages._version:
+            return
+        if old_id in messages_index["duplicates"]:
+            self._messages_index = None
+            return
+        ids = messages_index["ids"]
+        index = ids.get(old_id)
+        if index is None or self._messages[index] is not message:
+            return
+        del ids[old_id]
+        if message.id in ids:
+            messages_index["duplicates"].add(message.id)
+            ids[message.id] = min(ids[message.id], index)
+        else:
+            ids[message.id] = index
+
     def add_message(self,
                     message: Union[Prompt, Response],
                     status: bool = True,
@@ -182,12 +710,19 @@ class Session:
         if not isinstance(message, (Prompt, Response)):
             raise MemorValidationError(INVALID_MESSAGE)
         _validate_bool(status, "status")
+        version = self._messages._version
         if index is None:
+            position = len(self._messages)
             self._messages.append(message)
             self._messages_status.append(status)
+            self._render_cache.append(None)
         else:
+            position = min(index, len(self._messages)) if index >= 0 else max(len(self._messages) + index, 0)
             self._messages.insert(index, message)
             self._messages_status.insert(index, status)
+            self._render_cache.insert(index, None)
+        self._add_to_messages_index(version, position)
+        self._add_to_search_index(version, position)
         self._mark_modified()
 
     def get_message_by_index(self, index: Union[int, slice]) -> Union[Prompt, Response]:
@@ -196,6 +731,11 @@ class Session:
 
         :param index: index
         """
+        if isinstance(index, slice):
+            for message_index in range(*index.indices(len(self._messages))):
+                self._get_message(message_index)
+        else:
+            self._get_message(index)
         return self._messages[index]
 
     def get_message_by_id(self, message_id: str) -> Union[Prompt, Response]:
@@ -204,9 +744,9 @@ class Session:
 
         :param message_id: message id
         """
-        for index, message in enumerate(self._messages):
-            if message.id == message_id:
-                return self.get_message_by_index(index=index)
+        index = self._find_message_index(message_id)
+        if index is not None:
+            return self.get_message_by_index(index=index)
 
     def get_message(self, identifier: Union[int, slice, str]) -> Union[Prompt, Response]:
         """
@@ -227,8 +767,14 @@ class Session:
 
         :param index: index
         """
+        message = self._get_message(index)
+        position = index if index >= 0 else len(self._messages) + index
+        version = self._messages._version
         self._messages.pop(index)
         self._messages_status.pop(index)
+        self._render_cache.pop(index)
+        self._remove_from_messages_index(version, message.id, position)
+        self._remove_from_search_index(version, message, position)
         self._mark_modified()
 
     def remove_message_by_id(self, message_id: str) -> None:
@@ -237,10 +783,9 @@ class Session:
 
         :param message_id: message id
         """
-        for index, message in enumerate(self._messages):
-            if message.id == message_id:
-                self.remove_message_by_index(index=index)
-                break
+        index = self._find_message_index(message_id)
+        if index is not None:
+            self.remove_message_by_index(index=index)
 
     def remove_message(self, identifier: Union[int, str]) -> None:
         """
@@ -257,8 +802,12 @@ class Session:
 
     def clear_messages(self) -> None:
         """Remove all messages."""
-        self._messages = []
+        self._messages = _MessageList()
         self._messages_status = []
+        self._render_cache = []
+        self._messages_index = None
+        self._hydrated = True
+        self._reset_search_index()
         self._mark_modified()
 
     def enable_message(self, index: int) -> None:
@@ -316,8 +865,13 @@ class Session:
         if not status:
             status = len(messages) * [True]
         _validate_status(status, messages)
+        if messages is not self._messages:
+            self._messages = _MessageList(messages)
+            self._render_cache = len(messages) * [None]
+            self._messages_index = None
+            self._hydrated = True
+            self._reset_search_index()
         self._messages_status = status
-        self._messages = messages
         self._mark_modified()
 
     def update_messages_status(self, status: List[bool]) -> None:
@@ -326,45 +880,301 @@ class Session:
 
         :param status: status
         """
-        self.update_messages(messages=self._messages, status=status)
+        if not status:
+            status = len(self._messages) * [True]
+        _validate_status(status, self._messages)
+        self._messages_status = status
+        self._mark_modified()
 
-    def save(self, file_path: str) -> Dict[str, Any]:
+    def save(self, file_path: str, atomic: bool = False, fsync: bool = False,
+             checksum: bool = False) -> Dict[str, Any]:
         """
         Save method.
 
         :param file_path: session file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
         """
         result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
         try:
-            with open(file_path, "w") as file:
+            self._log_state = None
+            with _open_file(file_path, atomic=atomic, fsync=fsync) as file:
                 data = self.to_json()
-                json.dump(data, file)
+                file.write(_json_dumps(data, checksum=checksum))
+        except Exception as e:
+            result["status"] = False
+            result["message"] = str(e)
+        return result
+
+    async def async_save(self, file_path: str, atomic: bool = False, fsync: bool = False,
+                         checksum: bool = False) -> Dict[str, Any]:
+        """
+        Save method that encodes and writes the file in a thread executor.
+
+        :param file_path: session file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        :param checksum: checksum flag (append a SHA-256 checksum of the content, required by trusted loads)
+        """
+        try:
+            self._log_state = None
+            data = self.to_json()
+        except Exception as e:
+            return {"status": False, "message": str(e)}
+        return await _run_in_executor(_save_json, file_path, data, atomic, fsync, checksum)
+
+    def _log_header(self) -> Dict[str, Any]:
+        """Return the session log header record."""
+        return {
+            "type": "SessionLog",
+            "title": self._title,
+            "render_counter": self._render_counter,
+            "memor_version": MEMOR_VERSION,
+            "date_created": _format_date(self._date_created),
+            "date_modified": _format_date(self._date_modified),
+        }
+
+    def _log_message(self, index: int) -> Dict[str, Any]:
+        """
+        Return the JSON object of a message for the session log, without hydrating it.
+
+        :param index: message index
+        """
+        message = self._messages[index]
+        if isinstance(message, dict):
+            return message
+        return message.to_json()
+
+    def _log_records(self) -> List[Dict[str, Any]]:
+        """Return the session log records of the changes since the last append save."""
+        log_entries = self._log_state["entries"]
+        saved_status = self._log_state["messages_status"]
+        old_length = len(log_entries)
+        new_length = len(self._messages)
+        prefix = 0
+        while prefix < min(old_length, new_length) and log_entries[prefix][0] is self._messages[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < min(old_length, new_length) - prefix and \
+                log_entries[old_length - 1 - suffix][0] is self._messages[new_length - 1 - suffix]:
+            suffix += 1
+        records = []
+        if old_length - prefix - suffix > 0:
+            records.append({"op": "remove", "index": prefix, "count": old_length - prefix - suffix})
+        for index in range(prefix, new_length - suffix):
+            records.append({"op": "add", "index": index, "message": self._log_message(index),
+                            "status": self._messages_status[index]})
+        matched = [(index, index) for index in range(prefix)]
+        matched.extend((old_length - 1 - offset, new_length - 1 - offset) for offset in range(suffix))
+        for old_index, new_index in matched:
+            message, render_key = log_entries[old_index]
+            if not isinstance(message, dict) and message._render_key() != render_key:
+                records.append({"op": "update", "index": new_index, "message": message.to_json()})
+            if saved_status[old_index] != self._messages_status[new_index]:
+                records.append({"op": "status", "index": new_index, "status": self._messages_status[new_index]})
+        header = self._log_header()
+        if any(header[key] != self._log_state["header"][key] for key in ["title", "render_counter", "date_modified"]):
+            records.append({"op": "session", "title": header["title"], "render_counter": header["render_counter"],
+                            "date_modified": header["date_modified"]})
+        return records
+
+    def _update_log_state(self, file_path: str, records_count: int) -> None:
+        """
+        Take a snapshot of the session after an append save.
+
+        :param file_path: session log file path
+        :param records_count: number of change records in the session log
+        """
+        log_entries = [[message, None if isinstance(message, dict) else message._render_key()]
+                       for message in self._messages]
+        self._log_state = {
+            "file_path": os.path.abspath(file_path),
+            "file_size": os.path.getsize(file_path),
+            "records_count": records_count,
+            "header": self._log_header(),
+            "entries": log_entries,
+            "raw_entries": {id(log_entry[0]): log_entry for log_entry in log_entries if isinstance(log_entry[0], dict)},
+            "messages_status": self._messages_status.copy(),
+        }
+
+    def append_save(self, file_path: str, compact: bool = False) -> Dict[str, Any]:
+        """
+        Save the session as an append-only JSON Lines log, writing only the changes since the last append save.
+
+        The log is rewritten from scratch (compacted) on the first save, when forced, when the file was changed
+        by someone else or when the change records outgrow the session.
+
+        :param file_path: session log file path
+        :param compact: compaction flag
+        """
+        result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
+        try:
+            log_state = self._log_state
+            if not compact and log_state is not None and log_state["file_path"] == os.path.abspath(file_path) and \
+                    os.path.isfile(file_path) and os.path.getsize(file_path) == log_state["file_size"]:
+                records = self._log_records()
+                records_count = log_state["records_count"] + len(records)
+                if records_count <= SESSION_LOG_COMPACTION_FACTOR * (len(self._messages) + 1):
+                    with open(file_path, "ab") as file:
+                        for record in records:
+                            file.write(_json_dumps(record) + b"\n")
+                    self._update_log_state(file_path, records_count)
+                    return result
+            with open(file_path, "wb") as file:
+                file.write(_json_dumps(self._log_header()) + b"\n")
+                for index in range(len(self._messages)):
+                    record = {"op": "add", "index": index, "message": self._log_message(index),
+                              "status": self._messages_status[index]}
+                    file.write(_json_dumps(record) + b"\n")
+            self._update_log_state(file_path, len(self._messages))
         except Exception as e:
+            self._log_state = None
             result["status"] = False
             result["message"] = str(e)
         return result
 
-    def load(self, file_path: str) -> None:
+    @staticmethod
+    def _replay_log(header: Dict[str, Any], lines: List[bytes]) -> Dict[str, Any]:
+        """
+        Replay the session log records and return the session JSON object.
+
+        A torn last record (an interrupted append) is ignored.
+
+        :param header: session log header record
+        :param lines: session log record lines
         """
-        Load method.
+        try:
+            session_json = {
+                "type": "Session",
+                "title": header["title"],
+                "render_counter": header["render_counter"],
+                "memor_version": header["memor_version"],
+                "date_created": header["date_created"],
+                "date_modified": header["date_modified"],
+            }
+            messages = []
+            messages_status = []
+            for line_index, line in enumerate(lines):
+                if not line.strip():
+                    continue
+                try:
+                    record = _json_loads(line)
+                except ValueError:
+                    if line_index == len(lines) - 1:
+                        break
+                    raise
+                if record["op"] == "add":
+                    messages.insert(record["index"], record["message"])
+                    messages_status.insert(record["index"], record["status"])
+                elif record["op"] == "remove":
+                    del messages[record["index"]:record["index"] + record["count"]]
+                    del messages_status[record["index"]:record["index"] + record["count"]]
+                elif record["op"] == "update":
+                    messages[record["index"]] = record["message"]
+                elif record["op"] == "status":
+                    messages_status[record["index"]] = record["status"]
+                elif record["op"] == "session":
+                    session_json["title"] = record["title"]
+                    session_json["render_counter"] = record["render_counter"]
+                    session_json["date_modified"] = record["date_modified"]
+                else:
+                    raise ValueError(record["op"])
+        except Exception:
+            raise MemorValidationError(INVALID_SESSION_LOG_STRUCTURE_MESSAGE)
+        session_json["messages"] = messages
+        session_json["messages_status"] = messages_status
+        return session_json
+
+    @staticmethod
+    def _read_file(file_path: str, trusted: bool = False) -> Tuple[Union[bytes, Dict[str, Any]], Optional[int]]:
+        """
+        Read, verify and decode a session file and return the session JSON object and the number of log records.
+
+        The number of log records is None for JSON files and torn session logs.
+        Session logs have no checksum, so they can not be loaded as trusted files.
 
         :param file_path: session file path
+        :param trusted: trusted file flag (a valid checksum is required)
         """
         _validate_path(file_path)
-        with open(file_path, "r") as file:
-            self.from_json(file.read())
+        with open(file_path, "rb") as file:
+            first_line = file.readline()
+            rest = file.read()
+        try:
+            json_object = _json_loads(first_line)
+        except ValueError:
+            json_object = None
+        if isinstance(json_object, dict) and json_object.get("type") == "SessionLog":
+            if trusted:
+                raise MemorValidationError(INVALID_CHECKSUM_MESSAGE)
+            records_count = rest.count(b"\n") if rest.endswith(b"\n") or not rest else None
+            return Session._replay_log(json_object, rest.split(b"\n")), records_count
+        content = first_line + rest
+        _verify_checksum(content, required=trusted)
+        if json_object is None or rest.strip():
+            try:
+                json_object = _json_loads(content)
+            except ValueError:
+                json_object = content
+        return json_object, None
+
+    def _load_json(self, file_path: str, json_object: Union[bytes, Dict[str, Any]],
+                   records_count: Optional[int], lazy: bool, trusted: bool) -> None:
+        """
+        Load attributes from a session file JSON object.
+
+        :param file_path: session file path
+        :param json_object: session JSON object
+        :param records_count: number of change records in the session log
+        :param lazy: lazy load flag
+        :param trusted: trusted file flag
+        """
+        self.from_json(json_object, lazy=lazy, trusted=trusted)
+        self._log_state = None
+        if records_count is not None:
+            self._update_log_state(file_path, records_count)
+
+    def load(self, file_path: str, lazy: bool = False, trusted: bool = False) -> None:
+        """
+        Load method (both JSON and append-only JSON Lines log files are supported).
+
+        :param file_path: session file path
+        :param lazy: lazy load flag (messages are created on first access)
+        :param trusted: trusted file flag (skip the validation of files saved with a valid checksum)
+        """
+        json_object, records_count = self._read_file(file_path, trusted)
+        self._load_json(file_path, json_object, records_count, lazy, trusted)
+
+    async def async_load(self, file_path: str, lazy: bool = False, trusted: bool = False) -> None:
+        """
+        Load method that reads and decodes the file in a thread executor.
+
+        :param file_path: session file path
+        :param lazy: lazy load flag (messages are created on first access)
+        :param trusted: trusted file flag (skip the validation of files saved with a valid checksum)
+        """
+        json_object, records_count = await _run_in_executor(self._read_file, file_path, trusted)
+        self._load_json(file_path, json_object, records_count, lazy, trusted)
 
     @staticmethod
-    def _validate_extract_json(json_object: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _validate_extract_json(json_object: Union[str, bytes, Dict[str, Any]], lazy: bool = False,
+                               trusted: bool = False) -> Dict[str, Any]:
         """
         Validate and extract JSON object.
 
         :param json_object: JSON object
+        :param lazy: lazy load flag (messages are kept as raw JSON objects)
+        :param trusted: trusted JSON object flag (encoded input needs a valid checksum, field validation is skipped)
         """
+        if isinstance(json_object, (str, bytes)):
+            _verify_checksum(json_object, required=trusted)
         try:
             result = dict()
-            if isinstance(json_object, str):
-                loaded_obj = json.loads(json_object)
+            if isinstance(json_object, (str, bytes)):
+                loaded_obj = _json_loads(json_object)
+            elif trusted:
+                loaded_obj = json_object
             else:
                 loaded_obj = json_object.copy()
             result["title"] = loaded_obj["title"]
@@ -372,17 +1182,19 @@ class Session:
             result["messages_status"] = loaded_obj["messages_status"]
             result["messages"] = []
             for message in loaded_obj["messages"]:
-                if message["type"] == "Prompt":
-                    message_obj = Prompt()
-                elif message["type"] == "Response":
-                    message_obj = Response()
-                message_obj.from_json(message)
-                result["messages"].append(message_obj)
+                if lazy:
+                    if message["type"] not in ["Prompt", "Response"]:
+                        raise MemorValidationError(INVALID_SESSION_STRUCTURE_MESSAGE)
+                    result["messages"].append(message)
+                else:
+                    result["messages"].append(Session._message_from_json(message, trusted=trusted))
             result["memor_version"] = loaded_obj["memor_version"]
-            result["date_created"] = datetime.datetime.strptime(loaded_obj["date_created"], DATE_TIME_FORMAT)
-            result["date_modified"] = datetime.datetime.strptime(loaded_obj["date_modified"], DATE_TIME_FORMAT)
+            result["date_created"] = _parse_date(loaded_obj["date_created"])
+            result["date_modified"] = _parse_date(loaded_obj["date_modified"])
         except Exception:
             raise MemorValidationError(INVALID_SESSION_STRUCTURE_MESSAGE)
+        if trusted:
+            return result
         if result["title"] is not None:
             _validate_string(result["title"], "title")
         _validate_pos_int(result["render_counter"], "render_counter")
@@ -390,17 +1202,25 @@ class Session:
         _validate_string(result["memor_version"], "memor_version")
         return result
 
-    def from_json(self, json_object: Union[str, Dict[str, Any]]) -> None:
+    def from_json(self, json_object: Union[str, bytes, Dict[str, Any]], lazy: bool = False,
+                  trusted: bool = False) -> None:
         """
         Load attributes from the JSON object.
 
         :param json_object: JSON object
+        :param lazy: lazy load flag (messages are created on first access)
+        :param trusted: trusted JSON object flag (encoded input needs a valid checksum, field validation is skipped)
         """
-        data = self._validate_extract_json(json_object=json_object)
+        data = self._validate_extract_json(json_object=json_object, lazy=lazy, trusted=trusted)
         self._title = data["title"]
         self._render_counter = data["render_counter"]
-        self._messages = data["messages"]
+        self._messages = _MessageList(data["messages"])
         self._messages_status = data["messages_status"]
+        self._render_cache = len(self._messages) * [None]
+        self._messages_index = None
+        self._hydrated = not lazy
+        self._trusted = trusted
+        self._reset_search_index()
         self._memor_version = data["memor_version"]
         self._date_created = data["date_created"]
         self._date_modified = data["date_modified"]
@@ -410,8 +1230,8 @@ class Session:
         data = self.to_dict().copy()
         for index, message in enumerate(data["messages"]):
             data["messages"][index] = message.to_json()
-        data["date_created"] = datetime.datetime.strftime(data["date_created"], DATE_TIME_FORMAT)
-        data["date_modified"] = datetime.datetime.strftime(data["date_modified"], DATE_TIME_FORMAT)
+        data["date_created"] = _format_date(data["date_created"])
+        data["date_modified"] = _format_date(data["date_modified"])
         return data
 
     def to_dict(self) -> Dict[str, Any]:
@@ -424,7 +1244,7 @@ class Session:
             "type": "Session",
             "title": self._title,
             "render_counter": self._render_counter,
-            "messages": self._messages.copy(),
+            "messages": self.messages.copy(),
             "messages_status": self._messages_status.copy(),
             "memor_version": MEMOR_VERSION,
             "date_created": self._date_created,
@@ -433,9 +1253,96 @@ class Session:
         return data
 
     def get_size(self) -> int:
-        """Get the size of the session in bytes."""
-        json_str = json.dumps(self.to_json())
-        return len(json_str.encode())
+        """
+        Get the size of the session in bytes.
+
+        The session fields are encoded without the messages, and the cached encoded sizes of the messages and
+        their statuses are added to it, so the session JSON is never built as a whole.
+        """
+        messages = self.messages
+        data = self.to_dict()
+        data["messages"] = []
+        data["messages_status"] = []
+        data["date_created"] = _format_date(data["date_created"])
+        data["date_modified"] = _format_date(data["date_modified"])
+        size = len(_json_dumps(data))
+        if messages:
+            enabled_count = sum(self._messages_status)
+            size += sum(message.get_size() for message in messages) + len(messages) - 1
+            size += 4 * enabled_count + 5 * (len(messages) - enabled_count) + len(messages) - 1
+        return size
+
+    def _get_cache_entry(self, index: int) -> Dict[Any, Any]:
+        """
+        Get the render cache entry of a message, discarding it if the message has changed since it was filled.
+
+        :param index: message index
+        """
+        message = self._get_message(index)
+        if len(self._render_cache) != len(self._messages):
+            self._render_cache = len(self._messages) * [None]
+        render_key = message._render_key()
+        entry = self._render_cache[index]
+        if entry is None or entry[0] is not message or entry[1] != render_key:
+            entry = (message, render_key, {})
+            self._render_cache[index] = entry
+        return entry[2]
+
+    def _render_message(self, index: int, render_format: RenderFormat) -> Union[str, Dict[str, Any]]:
+        """
+        Render a message, reusing its cached render if the message has not changed since the last render.
+
+        :param index: message index
+        :param render_format: render format
+        """
+        cache_entry = self._get_cache_entry(index)
+        if render_format not in cache_entry:
+            cache_entry[render_format] = self._get_message(index).render(render_format=render_format)
+        elif render_format == RenderFormat.AI_STUDIO and self._get_message(index)._role == Role.SYSTEM:
+            warnings.warn(AI_STUDIO_SYSTEM_WARNING, UserWarning)
+        return _copy_render(cache_entry[render_format])
+
+    def _iter_render(self, render_format: RenderFormat,
+                     max_tokens: int, method: TokensEstimator) -> Generator[Any, None, None]:
+        """
+        Yield the enabled messages rendered one at a time.
+
+        :param render_format: render format
+        :param max_tokens: maximum number of tokens
+        :param method: token estimator method
+        """
+        tokens = 0
+        if max_tokens is not None:
+            separator_tokens = self._estimate_separator_tokens(method)
+        for index in range(len(self._messages)):
+            if self._messages_status[index]:
+                if max_tokens is not None:
+                    tokens += self._get_message(index).estimate_tokens(method) + separator_tokens
+                    if tokens > max_tokens:
+                        return
+                yield self._render_message(index, render_format)
+
+    def iter_render(self, render_format: RenderFormat = RenderFormat.DEFAULT,
+                    max_tokens: int = None,
+                    method: TokensEstimator = TokensEstimator.DEFAULT) -> Generator[Any, None, None]:
+        """
+        Iterate through the enabled messages rendered one at a time.
+
+        :param render_format: render format
+        :param max_tokens: maximum number of tokens (iteration stops before the message that exceeds it)
+        :param method: token estimator method
+        """
+        if not isinstance(render_format, RenderFormat):
+            raise MemorValidationError(INVALID_RENDER_FORMAT_MESSAGE)
+        if max_tokens is not None:
+            _validate_pos_int(max_tokens, "max_tokens")
+        return self._iter_render(render_format=render_format, max_tokens=max_tokens, method=method)
+
+    def render_segments(self) -> Generator[str, None, None]:
+        """Yield the string render of the session as segments (enabled message renders and separators)."""
+        for content in self.iter_render(render_format=RenderFormat.STRING):
+            yield content
+            yield SESSION_SEPARATOR
 
     def render(self, render_format: RenderFormat = RenderFormat.DEFAULT,
                enable_counter: bool = True) -> Union[str, Dict[str, Any], List[Tuple[str, Any]]]:
@@ -449,31 +1356,68 @@ class Session:
             raise MemorValidationError(INVALID_RENDER_FORMAT_MESSAGE)
         result = None
         if render_format in [RenderFormat.OPENAI, RenderFormat.AI_STUDIO]:
-            result = []
-            for index, message in enumerate(self._messages):
-                if self.messages_status[index]:
-                    if isinstance(message, Session):
-                        result.extend(message.render(render_format=render_format))
-                    else:
-                        result.append(message.render(render_format=render_format))
+            result = list(self.iter_render(render_format=render_format))
         else:
-            content = ""
-            session_dict = self.to_dict()
-            for index, message in enumerate(self._messages):
-                if self.messages_status[index]:
-                    content += message.render(render_format=RenderFormat.STRING) + "\n"
-            session_dict["content"] = content
+            content = "".join(self.render_segments())
             if render_format == RenderFormat.STRING:
                 result = content
-            if render_format == RenderFormat.DICTIONARY:
-                result = session_dict
-            if render_format == RenderFormat.ITEMS:
-                result = list(session_dict.items())
+            else:
+                session_dict = self.to_dict()
+                session_dict["content"] = content
+                if render_format == RenderFormat.DICTIONARY:
+                    result = session_dict
+                if render_format == RenderFormat.ITEMS:
+                    result = list(session_dict.items())
         if enable_counter:
             self._render_counter += 1
             self._mark_modified()
         return result
 
+    def fit_to_budget(self,
+                      max_tokens: int,
+                      method: TokensEstimator = TokensEstimator.DEFAULT,
+                      strategy: BudgetStrategy = BudgetStrategy.DEFAULT,
+                      pinned_count: int = 0) -> List[int]:
+        """
+        Select the enabled messages that fit in the token budget and disable the others.
+
+        :param max_tokens: maximum number of tokens
+        :param method: token estimator method
+        :param strategy: budget strategy
+        :param pinned_count: number of leading messages to keep (only used by `BudgetStrategy.PIN_FIRST_N`)
+        :return: indices of the selected messages
+        """
+        _validate_pos_int(max_tokens, "max_tokens")
+        _validate_pos_int(pinned_count, "pinned_count")
+        if not isinstance(strategy, BudgetStrategy):
+            raise MemorValidationError(INVALID_BUDGET_STRATEGY_MESSAGE)
+        candidates = [index for index, status in enumerate(self._messages_status) if status]
+        pinned = []
+        if strategy == BudgetStrategy.KEEP_SYSTEM_AND_NEWEST:
+            pinned = [index for index in candidates if self._get_message(index).role == Role.SYSTEM]
+        elif strategy == BudgetStrategy.PIN_FIRST_N:
+            pinned = candidates[:pinned_count]
+        selected = set()
+        tokens = 0
+        separator_tokens = self._estimate_separator_tokens(method)
+        for index in pinned:
+            message_tokens = self._get_message(index).estimate_tokens(method) + separator_tokens
+            if tokens + message_tokens <= max_tokens:
+                tokens += message_tokens
+                selected.add(index)
+        for index in reversed(candidates):
+            if index in selected:
+                continue
+            message_tokens = self._get_message(index).estimate_tokens(method) + separator_tokens
+            if tokens + message_tokens > max_tokens:
+                break
+            tokens += message_tokens
+            selected.add(index)
+        for index in candidates:
+            if index not in selected:
+                self.disable_message(index)
+        return sorted(selected)
+
     def check_render(self) -> bool:
         """Check render."""
         try:
@@ -488,7 +1432,22 @@ class Session:
 
         :param method: token estimator method
         """
-        return method(self.render(render_format=RenderFormat.STRING, enable_counter=False))
+        enabled_count = 0
+        tokens = 0
+        for index in range(len(self._messages)):
+            if self._messages_status[index]:
+                enabled_count += 1
+                tokens += self._get_message(index).estimate_tokens(method)
+        return tokens + enabled_count * self._estimate_separator_tokens(method)
+
+    @staticmethod
+    def _estimate_separator_tokens(method: TokensEstimator) -> int:
+        """
+        Estimate the number of tokens added by the separator of one rendered message.
+
+        :param method: token estimator method
+        """
+        return method(SESSION_SEPARATOR)
 
     @property
     def date_created(self) -> datetime.datetime:
@@ -513,6 +1472,7 @@ class Session:
     @property
     def messages(self) -> List[Union[Prompt, Response]]:
         """Get the session messages."""
+        self._hydrate_messages()
         return self._messages
 
     @property
@@ -529,3 +1489,26 @@ class Session:
     def size(self) -> int:
         """Get the session size in bytes."""
         return self.get_size()
+
+
+async def async_save_sessions(sessions: List[Session], file_paths: List[str],
+                              max_concurrency: int = 8) -> List[Dict[str, Any]]:
+    """
+    Save sessions concurrently, with at most `max_concurrency` files being written at once.
+
+    :param sessions: sessions
+    :param file_paths: session file paths
+    :param max_concurrency: maximum number of concurrent saves
+    """
+    _validate_list_of(sessions, "sessions", Session, "`Session`")
+    _validate_list_of(file_paths, "file_paths", str, "string")
+    if len(sessions) != len(file_paths):
+        raise MemorValidationError(INVALID_FILE_PATHS_LEN_MESSAGE)
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        raise MemorValidationError(INVALID_POSINT_VALUE_MESSAGE.format(parameter_name="max_concurrency"))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def save(session: Session, file_path: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await session.async_save(file_path)
+    return list(await asyncio.gather(*[save(session, file_path) for session, file_path in zip(sessions, file_paths)]))
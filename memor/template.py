@@ -1,17 +1,123 @@
 # -*- coding: utf-8 -*-
 """Template class."""
-from typing import Dict, Any, Union
-import json
+from typing import Dict, Set, Tuple, Any, Union, Optional
+import re
+import string
 import datetime
+import weakref
 from enum import Enum
-from .params import DATE_TIME_FORMAT
 from .params import DATA_SAVE_SUCCESS_MESSAGE
-from .params import INVALID_TEMPLATE_STRUCTURE_MESSAGE
+from .params import INVALID_TEMPLATE_STRUCTURE_MESSAGE, SHARED_TEMPLATE_UPDATE_MESSAGE
 from .params import MEMOR_VERSION
+from .params import PROMPT_FIELDS, RESPONSE_FIELDS
 from .errors import MemorValidationError
 from .functions import get_time_utc
+from .functions import _format_date, _parse_date
+from .functions import _json_dumps, _json_loads, _get_json_codec
 from .functions import _validate_path, _validate_custom_map
 from .functions import _validate_string
+from .functions import _run_in_executor, _save_json, _read_json, _open_file
+
+_FIELD_NAME_PATTERN = re.compile(r"([^.\[]*)((?:\.[^.\[]+|\[[^\]]+\])*)")
+_FIELD_ACCESSOR_PATTERN = re.compile(r"\.([^.\[]+)|\[([^\]]+)\]")
+
+
+def _parse_template_fields(content: str) -> Optional[Dict[str, Optional[Set[str]]]]:
+    """
+    Parse template content and extract the referenced fields.
+
+    The result maps each referenced root field to the set of its referenced keys
+    (for `responses`, the keys of the referenced list items), or to None if the whole object is referenced.
+
+    :param content: template content
+    :return: referenced fields or None if the content can not be parsed
+    """
+    fields = {}
+    try:
+        parsed_content = list(string.Formatter().parse(content))
+    except ValueError:
+        return None
+    for _, field_name, format_spec, _ in parsed_content:
+        if field_name is None:
+            continue
+        if format_spec and "{" in format_spec:
+            return None
+        match = _FIELD_NAME_PATTERN.fullmatch(field_name)
+        if match is None:
+            return None
+        root, accessors = match.groups()
+        accessors = _FIELD_ACCESSOR_PATTERN.findall(accessors)
+        key_index = 1 if root == "responses" else 0
+        key = None
+        if len(accessors) > key_index and not accessors[key_index][0]:
+            key = accessors[key_index][1]
+        if key is None:
+            fields[root] = None
+        elif fields.get(root, set()) is not None:
+            fields.setdefault(root, set()).add(key)
+    return fields
+
+
+def _parse_template_requirements(content: str,
+                                 custom_map: Optional[Dict[Any, Any]]) -> Optional[Tuple[bool, bool, int]]:
+    """
+    Check template content against the prompt and response schemas without rendering it.
+
+    The result is a (renderable, selected response required, minimum number of responses) tuple.
+
+    :param content: template content
+    :param custom_map: custom map
+    :return: requirements or None if the content can only be checked by rendering it
+    """
+    if custom_map is not None and not all(isinstance(key, str) for key in custom_map):
+        return None
+    try:
+        parsed_content = list(string.Formatter().parse(content))
+    except ValueError:
+        return False, False, 0
+    needs_response = False
+    responses_count = 0
+    for _, field_name, format_spec, conversion in parsed_content:
+        if field_name is None:
+            continue
+        if format_spec or conversion not in [None, "r", "s", "a"]:
+            return None
+        match = _FIELD_NAME_PATTERN.fullmatch(field_name)
+        if match is None:
+            return None
+        root, accessors = match.groups()
+        accessors = _FIELD_ACCESSOR_PATTERN.findall(accessors)
+        if any(attribute for attribute, _ in accessors):
+            return None
+        keys = [key for _, key in accessors]
+        if not root or root.isdigit():
+            return False, False, 0
+        if custom_map is not None and root in custom_map:
+            if keys:
+                return None
+            continue
+        if root == "prompt":
+            if not keys or keys[0] == "template":
+                return None
+            fields = PROMPT_FIELDS
+        elif root == "response":
+            needs_response = True
+            fields = RESPONSE_FIELDS
+        elif root == "responses":
+            if not keys:
+                continue
+            if not (keys[0].isascii() and keys[0].isdigit()):
+                return False, False, 0
+            responses_count = max(responses_count, int(keys[0]) + 1)
+            keys = keys[1:]
+            fields = RESPONSE_FIELDS
+        else:
+            return False, False, 0
+        if len(keys) > 1:
+            return None
+        if keys and keys[0] not in fields:
+            return False, False, 0
+    return True, needs_response, responses_count
 
 
 class PromptTemplate:
@@ -38,7 +144,13 @@ class PromptTemplate:
         :param custom_map: custom map
         """
         self._content = None
+        self._fields = None
+        self._render_requirements = None
+        self._message_only = None
+        self._size = None
+        self._shared = False
         self._title = None
+        self._revision = 0
         self._date_created = get_time_utc()
         self._mark_modified()
         self._memor_version = MEMOR_VERSION
@@ -56,6 +168,11 @@ class PromptTemplate:
     def _mark_modified(self) -> None:
         """Mark modification."""
         self._date_modified = get_time_utc()
+        self._revision += 1
+
+    def _render_key(self) -> Any:
+        """Return a key that changes whenever the template or its custom map (which can be edited in place) changes."""
+        return self._revision, None if self._custom_map is None else tuple(self._custom_map.items())
 
     def __eq__(self, other_template: "PromptTemplate") -> bool:
         """
@@ -80,18 +197,49 @@ class PromptTemplate:
         _class = self.__class__
         result = _class.__new__(_class)
         result.__dict__.update(self.__dict__)
+        if self._custom_map is not None:
+            result._custom_map = self._custom_map.copy()
+        result._shared = False
         return result
 
     def copy(self) -> "PromptTemplate":
         """Return a copy of the PromptTemplate object."""
         return self.__copy__()
 
+    def _get_render_requirements(self) -> Optional[Tuple[bool, bool, int]]:
+        """Get the render requirements of the template (cached until the template or its custom map keys change)."""
+        key = (self._revision, None if self._custom_map is None else tuple(self._custom_map))
+        if self._render_requirements is None or self._render_requirements[0] != key:
+            requirements = None
+            if self._content is not None:
+                requirements = _parse_template_requirements(self._content, self._custom_map)
+            self._render_requirements = (key, requirements)
+        return self._render_requirements[1]
+
+    def _is_message_only(self) -> bool:
+        """Check if the template only references the prompt message and custom map keys (cached like requirements)."""
+        key = (self._revision, None if self._custom_map is None else tuple(self._custom_map))
+        if self._message_only is None or self._message_only[0] != key:
+            custom_map = self._custom_map or {}
+            fields = self._fields
+            message_only = fields is not None and "prompt" not in custom_map and \
+                fields.get("prompt", {"message"}) == {"message"} and \
+                all(root == "prompt" or root in custom_map for root in fields)
+            self._message_only = (key, message_only)
+        return self._message_only[1]
+
+    def _check_shared(self) -> None:
+        """Raise an error if the template is shared (preset or loaded template) and must not be modified."""
+        if self._shared:
+            raise MemorValidationError(SHARED_TEMPLATE_UPDATE_MESSAGE)
+
     def update_title(self, title: str) -> None:
         """
         Update title.
 
         :param title: title
         """
+        self._check_shared()
         _validate_string(title, "title")
         self._title = title
         self._mark_modified()
@@ -102,8 +250,10 @@ class PromptTemplate:
 
         :param content: content
         """
+        self._check_shared()
         _validate_string(content, "content")
         self._content = content
+        self._fields = _parse_template_fields(content)
         self._mark_modified()
 
     def update_map(self, custom_map: Dict[str, str]) -> None:
@@ -112,20 +262,23 @@ class PromptTemplate:
 
         :param custom_map: custom map
         """
+        self._check_shared()
         _validate_custom_map(custom_map)
         self._custom_map = custom_map
         self._mark_modified()
 
-    def save(self, file_path: str) -> Dict[str, Any]:
+    def save(self, file_path: str, atomic: bool = False, fsync: bool = False) -> Dict[str, Any]:
         """
         Save method.
 
         :param file_path: template file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
         """
         result = {"status": True, "message": DATA_SAVE_SUCCESS_MESSAGE}
         try:
-            with open(file_path, "w") as file:
-                json.dump(self.to_json(), file)
+            with _open_file(file_path, atomic=atomic, fsync=fsync) as file:
+                file.write(_json_dumps(self.to_json()))
         except Exception as e:
             result["status"] = False
             result["message"] = str(e)
@@ -138,11 +291,33 @@ class PromptTemplate:
         :param file_path: template file path
         """
         _validate_path(file_path)
-        with open(file_path, "r") as file:
+        with open(file_path, "rb") as file:
             self.from_json(file.read())
 
+    async def async_save(self, file_path: str, atomic: bool = False, fsync: bool = False) -> Dict[str, Any]:
+        """
+        Save method that encodes and writes the file in a thread executor.
+
+        :param file_path: template file path
+        :param atomic: atomic write flag (write to a temporary file and rename it over the target)
+        :param fsync: flush to disk flag
+        """
+        try:
+            data = self.to_json()
+        except Exception as e:
+            return {"status": False, "message": str(e)}
+        return await _run_in_executor(_save_json, file_path, data, atomic, fsync)
+
+    async def async_load(self, file_path: str) -> None:
+        """
+        Load method that reads and decodes the file in a thread executor.
+
+        :param file_path: template file path
+        """
+        self.from_json(await _run_in_executor(_read_json, file_path))
+
     @staticmethod
-    def _validate_extract_json(json_object: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _validate_extract_json(json_object: Union[str, bytes, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Validate and extract JSON object.
 
@@ -150,16 +325,16 @@ class PromptTemplate:
         """
         try:
             result = dict()
-            if isinstance(json_object, str):
-                loaded_obj = json.loads(json_object)
+            if isinstance(json_object, (str, bytes)):
+                loaded_obj = _json_loads(json_object)
             else:
                 loaded_obj = json_object.copy()
             result["content"] = loaded_obj["content"]
             result["title"] = loaded_obj["title"]
             result["custom_map"] = loaded_obj["custom_map"]
             result["memor_version"] = loaded_obj["memor_version"]
-            result["date_created"] = datetime.datetime.strptime(loaded_obj["date_created"], DATE_TIME_FORMAT)
-            result["date_modified"] = datetime.datetime.strptime(loaded_obj["date_modified"], DATE_TIME_FORMAT)
+            result["date_created"] = _parse_date(loaded_obj["date_created"])
+            result["date_modified"] = _parse_date(loaded_obj["date_modified"])
         except Exception:
             raise MemorValidationError(INVALID_TEMPLATE_STRUCTURE_MESSAGE)
         if result["content"] is not None:
@@ -171,25 +346,30 @@ class PromptTemplate:
         _validate_string(result["memor_version"], "memor_version")
         return result
 
-    def from_json(self, json_object: Union[str, Dict[str, Any]]) -> None:
+    def from_json(self, json_object: Union[str, bytes, Dict[str, Any]]) -> None:
         """
         Load attributes from the JSON object.
 
         :param json_object: JSON object
         """
+        self._check_shared()
         data = self._validate_extract_json(json_object)
         self._content = data["content"]
+        self._fields = None
+        if self._content is not None:
+            self._fields = _parse_template_fields(self._content)
         self._title = data["title"]
         self._memor_version = data["memor_version"]
         self._custom_map = data["custom_map"]
         self._date_created = data["date_created"]
         self._date_modified = data["date_modified"]
+        self._revision += 1
 
     def to_json(self) -> Dict[str, Any]:
         """Convert PromptTemplate to json."""
         data = self.to_dict().copy()
-        data["date_created"] = datetime.datetime.strftime(data["date_created"], DATE_TIME_FORMAT)
-        data["date_modified"] = datetime.datetime.strftime(data["date_modified"], DATE_TIME_FORMAT)
+        data["date_created"] = _format_date(data["date_created"])
+        data["date_modified"] = _format_date(data["date_modified"])
         return data
 
     def to_dict(self) -> Dict[str, Any]:
@@ -204,9 +384,11 @@ class PromptTemplate:
         }
 
     def get_size(self) -> int:
-        """Get the size of the PromptTemplate in bytes."""
-        json_str = json.dumps(self.to_json())
-        return len(json_str.encode())
+        """Get the size of the PromptTemplate in bytes (cached until the template or the JSON codec changes)."""
+        key = (self._render_key(), _get_json_codec())
+        if self._size is None or self._size[0] != key:
+            self._size = (key, len(_json_dumps(self.to_json())))
+        return self._size[1]
 
     @property
     def content(self) -> str:
@@ -230,7 +412,9 @@ class PromptTemplate:
 
     @property
     def custom_map(self) -> Dict[str, str]:
-        """Get the PromptTemplate custom map."""
+        """Get the PromptTemplate custom map (a copy for a shared template, which is read-only)."""
+        if self._shared and self._custom_map is not None:
+            return self._custom_map.copy()
         return self._custom_map
 
     @property
@@ -577,3 +761,81 @@ class PresetPromptTemplate:
     INSTRUCTION2 = _Instruction2PresetPromptTemplate
     INSTRUCTION3 = _Instruction3PresetPromptTemplate
     DEFAULT = BASIC.PROMPT
+
+
+_PRESET_TEMPLATES = {
+    member.value.title: member.value for preset in [
+        _BasicPresetPromptTemplate,
+        _Instruction1PresetPromptTemplate,
+        _Instruction2PresetPromptTemplate,
+        _Instruction3PresetPromptTemplate] for member in preset}
+_PRESET_TEMPLATES_JSON = {title: template.to_json() for title, template in _PRESET_TEMPLATES.items()}
+for _template in _PRESET_TEMPLATES.values():
+    _template._shared = True
+_INTERNED_TEMPLATES = weakref.WeakValueDictionary()
+
+
+def _template_key(content: Any, title: Any, custom_map: Any) -> Tuple[Any, Any, Any]:
+    """
+    Return the interning key of a template.
+
+    :param content: template content
+    :param title: template title
+    :param custom_map: template custom map
+    """
+    if custom_map is not None:
+        custom_map = tuple(sorted((repr(key), repr(value)) for key, value in custom_map.items()))
+    return content, title, custom_map
+
+
+def _is_preset_template(template: PromptTemplate) -> bool:
+    """
+    Check if the template is a preset template, or a copy of it, that has not been modified.
+
+    :param template: template
+    """
+    preset_json = _PRESET_TEMPLATES_JSON.get(template._title)
+    if preset_json is None:
+        return False
+    return template._content == preset_json["content"] and template._custom_map == preset_json["custom_map"]
+
+
+def _template_to_json(template: PromptTemplate) -> Dict[str, Any]:
+    """
+    Convert a template to a JSON object (an unmodified preset template is converted to a short reference).
+
+    :param template: template
+    """
+    if _is_preset_template(template):
+        return {"preset": template._title}
+    return template.to_json()
+
+
+def _template_from_json(json_object: Dict[str, Any]) -> PromptTemplate:
+    """
+    Load a template from the JSON object, sharing one instance between identical templates.
+
+    Preset references and copies of preset templates resolve to the preset template,
+    other templates are interned by content, title and custom map. Shared instances are
+    read-only, so they are never modified.
+
+    :param json_object: template JSON object
+    """
+    try:
+        if "preset" in json_object:
+            json_object = _PRESET_TEMPLATES_JSON[json_object["preset"]]
+        key = _template_key(json_object["content"], json_object["title"], json_object["custom_map"])
+        hash(key)
+    except Exception:
+        raise MemorValidationError(INVALID_TEMPLATE_STRUCTURE_MESSAGE)
+    template = _PRESET_TEMPLATES.get(key[1])
+    if template is None or not _is_preset_template(template) or \
+            key != _template_key(template._content, template._title, template._custom_map):
+        template = _INTERNED_TEMPLATES.get(key)
+    if template is not None and key == _template_key(template._content, template._title, template._custom_map):
+        return template
+    template = PromptTemplate()
+    template.from_json(json_object)
+    template._shared = True
+    _INTERNED_TEMPLATES[key] = template
+    return template
@@ -3,9 +3,76 @@
 
 import re
 from enum import Enum
-from typing import Set, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Set, List, Dict, Any, Iterable, Callable, Pattern
 from .keywords import PROGRAMMING_LANGUAGES_KEYWORDS
 from .keywords import COMMON_PREFIXES, COMMON_SUFFIXES
+from .params import INVALID_POSINT_VALUE_MESSAGE
+from .errors import MemorValidationError
+
+
+_CODE_SYMBOL_PATTERN = re.compile(r"[=<>+\-*/{}();]")
+_CONTRACTION_PATTERN = re.compile(r"(?<=\w)'(?=\w)")
+_TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[+\-*/=<>(){}[\],.:;]|\"[^\"]*\"|'[^']*'|\d+|\S")
+_CODE_PUNCTUATION = frozenset("+-*/=<>(){}[],.:;")
+_UPPERCASE_PATTERN = re.compile(r"[A-Z]")
+_CAMEL_CASE_PATTERN = re.compile(r"[A-Z][a-z]*")
+_SUBWORD_PATTERN = re.compile(r"[aeiou]+|[^aeiou]+")
+_OPENAI_PUNCTUATION = ",.?!;:"
+_RARE_CHAR_PATTERN = re.compile("[\u2711-\U0010FFFF]")
+
+
+def _group_by_length(affixes: Set[str]) -> Dict[int, Set[str]]:
+    """
+    Group affixes by their length.
+
+    :param affixes: Set of affixes.
+    :return: Dictionary of affix length to the set of affixes with that length.
+    """
+    groups = {}
+    for affix in affixes:
+        groups.setdefault(len(affix), set()).add(affix)
+    return groups
+
+
+def _trie_to_regex(trie: Dict[str, Any]) -> str:
+    """
+    Convert a trie of characters to a regex that matches any of its words.
+
+    :param trie: Trie of characters (a word ends at an empty node).
+    :return: Regex pattern.
+    """
+    branches = [re.escape(char) + _trie_to_regex(child) for char, child in sorted(trie.items())]
+    if len(branches) <= 1:
+        return "".join(branches)
+    return "(?:" + "|".join(branches) + ")"
+
+
+def _compile_keywords_pattern(keywords: Set[str]) -> Pattern:
+    """
+    Compile a regex that finds any of the keywords.
+
+    A keyword that contains another keyword can not change whether a text has a keyword, so only the minimal
+    keywords are kept, and they are merged into a trie so each position is matched one character at a time.
+
+    :param keywords: Set of keywords.
+    :return: Compiled regex pattern.
+    """
+    trie = {}
+    minimal_keywords = []
+    for keyword in sorted(keywords, key=len):
+        if any(other in keyword for other in minimal_keywords):
+            continue
+        minimal_keywords.append(keyword)
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+    return re.compile(_trie_to_regex(trie))
+
+
+_PREFIXES_BY_LENGTH = _group_by_length(COMMON_PREFIXES)
+_SUFFIXES_BY_LENGTH = _group_by_length(COMMON_SUFFIXES)
+_KEYWORDS_PATTERN = _compile_keywords_pattern(PROGRAMMING_LANGUAGES_KEYWORDS)
 
 
 def _is_code_snippet(message: str) -> bool:
@@ -15,7 +82,7 @@ def _is_code_snippet(message: str) -> bool:
     :param message: The input message to check.
     :return: Boolean indicating if the message is a code snippet.
     """
-    return bool(re.search(r"[=<>+\-*/{}();]", message))
+    return bool(_CODE_SYMBOL_PATTERN.search(message))
 
 
 def _preprocess_message(message: str, is_code: bool) -> str:
@@ -27,7 +94,7 @@ def _preprocess_message(message: str, is_code: bool) -> str:
     :return: Preprocessed message.
     """
     if not is_code:
-        return re.sub(r"(?<=\w)'(?=\w)", " ", message)
+        return _CONTRACTION_PATTERN.sub(" ", message)
     return message
 
 
@@ -38,7 +105,7 @@ def _tokenize_message(message: str) -> List[str]:
     :param message: The input message to tokenize.
     :return: List of tokens.
     """
-    return re.findall(r"[A-Za-z_][A-Za-z0-9_]*|[+\-*/=<>(){}[\],.:;]|\"[^\"]*\"|'[^']*'|\d+|\S", message)
+    return _TOKEN_PATTERN.findall(message)
 
 
 def _count_code_tokens(token: str, common_keywords: Set[str]) -> int:
@@ -49,7 +116,7 @@ def _count_code_tokens(token: str, common_keywords: Set[str]) -> int:
     :param common_keywords: Set of common keywords in programming languages.
     :return: Count of tokens.
     """
-    if token in common_keywords or re.match(r"[+\-*/=<>(){}[\],.:;]", token):
+    if token in common_keywords or token[0] in _CODE_PUNCTUATION:
         return 1
     if token.isdigit():
         return max(1, len(token) // 4)
@@ -57,28 +124,28 @@ def _count_code_tokens(token: str, common_keywords: Set[str]) -> int:
         return max(1, len(token) // 6)
     if "_" in token:
         return len(token.split("_"))
-    if re.search(r"[A-Z]", token):
-        return len(re.findall(r"[A-Z][a-z]*", token))
+    if _UPPERCASE_PATTERN.search(token):
+        return len(_CAMEL_CASE_PATTERN.findall(token))
     return 1
 
 
-def _count_text_tokens(token: str, prefixes: Set[str], suffixes: Set[str]) -> int:
+def _count_text_tokens(token: str, prefixes: Dict[int, Set[str]], suffixes: Dict[int, Set[str]]) -> int:
     """
     Count tokens in text based on prefixes, suffixes, and subwords.
 
     :param token: The token to count.
-    :param prefixes: Set of common prefixes.
-    :param suffixes: Set of common suffixes.
+    :param prefixes: Common prefixes grouped by length.
+    :param suffixes: Common suffixes grouped by length.
     :return: Token count.
     """
-    if len(token) == 1 and not token.isalnum():
+    token_length = len(token)
+    if token_length == 1 and not token.isalnum():
         return 1
     if token.isdigit():
-        return max(1, len(token) // 4)
-    prefix_count = sum(token.startswith(p) for p in prefixes if len(token) > len(p) + 3)
-    suffix_count = sum(token.endswith(s) for s in suffixes if len(token) > len(s) + 3)
-    parts = re.findall(r"[aeiou]+|[^aeiou]+", token)
-    subword_count = max(1, len(parts) // 2)
+        return max(1, token_length // 4)
+    prefix_count = sum(token[:length] in group for length, group in prefixes.items() if token_length > length + 3)
+    suffix_count = sum(token[-length:] in group for length, group in suffixes.items() if token_length > length + 3)
+    subword_count = max(1, len(_SUBWORD_PATTERN.findall(token)) // 2)
 
     return prefix_count + suffix_count + subword_count
 
@@ -92,15 +159,37 @@ def universal_tokens_estimator(message: str) -> int:
     """
     is_code = _is_code_snippet(message)
     message = _preprocess_message(message, is_code)
-    tokens = _tokenize_message(message)
+    token_counts = {}
+    result = 0
+    for token in _tokenize_message(message):
+        count = token_counts.get(token)
+        if count is None:
+            if is_code:
+                count = _count_code_tokens(token, PROGRAMMING_LANGUAGES_KEYWORDS)
+            else:
+                count = _count_text_tokens(token, _PREFIXES_BY_LENGTH, _SUFFIXES_BY_LENGTH)
+            token_counts[token] = count
+        result += count
+    return result
+
+
+def _scan_text(text: str) -> Dict[str, Any]:
+    """
+    Collect the text statistics used by OpenAI's models token estimators.
 
-    return sum(
-        _count_code_tokens(
-            token,
-            PROGRAMMING_LANGUAGES_KEYWORDS) if is_code else _count_text_tokens(
-            token,
-            COMMON_PREFIXES,
-            COMMON_SUFFIXES) for token in tokens)
+    :param text: The input text to scan.
+    :return: Dictionary of text statistics.
+    """
+    return {
+        "char_count": len(text),
+        "space_count": text.count(" "),
+        "punctuation_count": sum(text.count(char) for char in _OPENAI_PUNCTUATION),
+        "has_keyword": _KEYWORDS_PATTERN.search(text) is not None,
+        "newline_count": text.count("\n"),
+        "long_word_penalty": sum(len(word) / 10 for word in text.split() if len(word) > 15),
+        "has_url": "http" in text,
+        "rare_char_count": 0 if text.isascii() else len(text) - len(_RARE_CHAR_PATTERN.sub("", text)),
+    }
 
 
 def _openai_tokens_estimator(text: str) -> int:
@@ -110,27 +199,20 @@ def _openai_tokens_estimator(text: str) -> int:
     :param text: The input text to estimate tokens for.
     :return: Estimated number of tokens.
     """
-    char_count = len(text)
-    token_estimate = char_count / 4
+    statistics = _scan_text(text)
+    token_estimate = statistics["char_count"] / 4
+    token_estimate += (statistics["space_count"] + statistics["punctuation_count"]) * 0.5
 
-    space_count = text.count(" ")
-    punctuation_count = sum(1 for char in text if char in ",.?!;:")
-    token_estimate += (space_count + punctuation_count) * 0.5
-
-    if any(keyword in text for keyword in PROGRAMMING_LANGUAGES_KEYWORDS):
+    if statistics["has_keyword"]:
         token_estimate *= 1.1
 
-    newline_count = text.count("\n")
-    token_estimate += newline_count * 0.8
-
-    long_word_penalty = sum(len(word) / 10 for word in text.split() if len(word) > 15)
-    token_estimate += long_word_penalty
+    token_estimate += statistics["newline_count"] * 0.8
+    token_estimate += statistics["long_word_penalty"]
 
-    if "http" in text:
+    if statistics["has_url"]:
         token_estimate *= 1.1
 
-    rare_char_count = sum(1 for char in text if ord(char) > 10000)
-    token_estimate += rare_char_count * 0.8
+    token_estimate += statistics["rare_char_count"] * 0.8
 
     return token_estimate
 
@@ -165,3 +247,43 @@ class TokensEstimator(Enum):
     OPENAI_GPT_3_5 = openai_tokens_estimator_gpt_3_5
     OPENAI_GPT_4 = openai_tokens_estimator_gpt_4
     DEFAULT = UNIVERSAL
+
+
+def _estimate_tokens_chunk(items: List[Any], method: Callable[[str], int]) -> List[int]:
+    """
+    Estimate the number of tokens for each item of a chunk.
+
+    :param items: The chunk of strings, messages or sessions.
+    :param method: Token estimator method.
+    :return: List of estimated number of tokens.
+    """
+    return [method(item) if isinstance(item, str) else item.estimate_tokens(method) for item in items]
+
+
+def batch_estimate_tokens(
+        items: Iterable[Any],
+        method: Callable[[str], int] = TokensEstimator.DEFAULT,
+        max_workers: int = None,
+        chunk_size: int = 1024) -> List[int]:
+    """
+    Estimate the number of tokens for many strings, messages or sessions.
+
+    :param items: The input strings, `Prompt`/`Response` messages or `Session` objects.
+    :param method: Token estimator method.
+    :param max_workers: Number of worker processes (items are estimated in the current process if None).
+    :param chunk_size: Number of items sent to a worker process at once.
+    :return: List of estimated number of tokens in the input order.
+    """
+    if max_workers is not None and (not isinstance(max_workers, int) or max_workers < 1):
+        raise MemorValidationError(INVALID_POSINT_VALUE_MESSAGE.format(parameter_name="max_workers"))
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        raise MemorValidationError(INVALID_POSINT_VALUE_MESSAGE.format(parameter_name="chunk_size"))
+    items = list(items)
+    if max_workers is None:
+        return _estimate_tokens_chunk(items, method)
+    chunks = [items[index:index + chunk_size] for index in range(0, len(items), chunk_size)]
+    result = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_result in executor.map(_estimate_tokens_chunk, chunks, [method] * len(chunks)):
+            result.extend(chunk_result)
+    return result
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""Benchmark script."""
+import os
+import re
+import sys
+import datetime
+import tempfile
+import timeit
+import tracemalloc
+import uuid
+from memor import Session, Prompt, Response, save_archive, load_archive
+from memor import Role, LLMModel, PresetPromptTemplate, MEMOR_VERSION
+from memor import set_json_codec, MemorValidationError
+from memor.keywords import PROGRAMMING_LANGUAGES_KEYWORDS, COMMON_PREFIXES, COMMON_SUFFIXES
+from memor.tokens_estimator import universal_tokens_estimator, openai_tokens_estimator_gpt_4
+
+REPEAT = 3
+TEXT_SAMPLE = ("Understanding natural language processing isn't that hard, "
+               "but tokenization involves splitting text into meaningful units. ")
+CODE_SAMPLE = "def update_messages(self, messages): return [ProcessMessage(message_id=42) for message in messages]\n"
+DIGITS_SAMPLE = "3.14159 2.71828 1.41421 0.57721 1.61803 "
+PLAIN_SAMPLE = "Yes, we feel well. We see green hedges, seven sleek hens, cozy fences, Zen glowy lens. "
+SIZES = [2 ** 10, 2 ** 20]
+ARCHIVE_MESSAGES = 100000
+MEMORY_MESSAGES = 100000
+CODEC_MESSAGES = 20000
+JSON_CODECS = ["json", "ujson", "msgspec", "orjson"]
+
+
+def reference_universal_tokens_estimator(message: str) -> int:
+    """
+    Estimate the number of tokens with the original per-token implementation of the universal estimator.
+
+    :param message: the input text or code snippet
+    """
+    is_code = bool(re.search(r"[=<>+\-*/{}();]", message))
+    if not is_code:
+        message = re.sub(r"(?<=\w)'(?=\w)", " ", message)
+    tokens = re.findall(r"[A-Za-z_][A-Za-z0-9_]*|[+\-*/=<>(){}[\],.:;]|\"[^\"]*\"|'[^']*'|\d+|\S", message)
+    result = 0
+    for token in tokens:
+        if is_code:
+            if token in PROGRAMMING_LANGUAGES_KEYWORDS or re.match(r"[+\-*/=<>(){}[\],.:;]", token):
+                result += 1
+            elif token.isdigit():
+                result += max(1, len(token) // 4)
+            elif token.startswith(("'", '"')) and token.endswith(("'", '"')):
+                result += max(1, len(token) // 6)
+            elif "_" in token:
+                result += len(token.split("_"))
+            elif re.search(r"[A-Z]", token):
+                result += len(re.findall(r"[A-Z][a-z]*", token))
+            else:
+                result += 1
+        elif len(token) == 1 and not token.isalnum():
+            result += 1
+        elif token.isdigit():
+            result += max(1, len(token) // 4)
+        else:
+            result += sum(token.startswith(p) for p in COMMON_PREFIXES if len(token) > len(p) + 3)
+            result += sum(token.endswith(s) for s in COMMON_SUFFIXES if len(token) > len(s) + 3)
+            result += max(1, len(re.findall(r"[aeiou]+|[^aeiou]+", token)) // 2)
+    return result
+
+
+def reference_openai_tokens_estimator_gpt_4(text: str) -> int:
+    """
+    Estimate the number of tokens with the original multi-scan implementation of the GPT-4 estimator.
+
+    :param text: the input text
+    """
+    token_estimate = len(text) / 4
+    token_estimate += (text.count(" ") + sum(1 for char in text if char in ",.?!;:")) * 0.5
+    if any(keyword in text for keyword in PROGRAMMING_LANGUAGES_KEYWORDS):
+        token_estimate *= 1.1
+    token_estimate += text.count("\n") * 0.8
+    token_estimate += sum(len(word) / 10 for word in text.split() if len(word) > 15)
+    if "http" in text:
+        token_estimate *= 1.1
+    token_estimate += sum(1 for char in text if ord(char) > 10000) * 0.8
+    token_estimate *= 1.05
+    return int(max(1, token_estimate))
+
+
+class ReferenceMessage:
+    """Message with the original `__dict__` layout and `datetime` dates, used as the memory baseline."""
+
+    def __init__(self, message: str, role: Role, **fields: object) -> None:
+        """
+        Initialize the reference message.
+
+        :param message: message
+        :param role: role
+        :param fields: message type specific fields
+        """
+        self._message = message
+        self._tokens = None
+        self._role = role
+        self._date_created = datetime.datetime.now(datetime.timezone.utc)
+        self._date_modified = datetime.datetime.now(datetime.timezone.utc)
+        self._memor_version = MEMOR_VERSION
+        self._id = str(uuid.uuid4())
+        self.__dict__.update(fields)
+
+
+def reference_response(message: str) -> ReferenceMessage:
+    """
+    Create a reference message with the original `Response` fields.
+
+    :param message: message
+    """
+    return ReferenceMessage(message, Role.ASSISTANT, _score=None, _temperature=None, _top_k=None, _top_p=None,
+                            _inference_time=None, _model=LLMModel.DEFAULT.value, _gpu=None)
+
+
+def reference_prompt(message: str) -> ReferenceMessage:
+    """
+    Create a reference message with the original `Prompt` fields.
+
+    :param message: message
+    """
+    return ReferenceMessage(message, Role.USER, _template=PresetPromptTemplate.DEFAULT.value, _responses=[],
+                            _selected_response_index=0)
+
+
+def measure_memory(factory: callable) -> int:
+    """
+    Return the memory allocated per object by a factory in bytes.
+
+    :param factory: object factory, called with the object index
+    """
+    tracemalloc.start()
+    objects = [factory(index) for index in range(MEMORY_MESSAGES)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size // len(objects)
+
+
+def measure(function: callable, *args: object) -> float:
+    """
+    Return the best run time of a function in seconds.
+
+    :param function: function
+    :param args: function arguments
+    """
+    return min(timeit.repeat(lambda: function(*args), number=1, repeat=REPEAT))
+
+
+def print_comparison(title: str, baseline: float, current: float) -> None:
+    """
+    Print a baseline/current timing comparison.
+
+    :param title: benchmark title
+    :param baseline: baseline time in seconds
+    :param current: current time in seconds
+    """
+    print("{title}: {baseline:.4f}s -> {current:.4f}s ({speedup:.1f}x)".format(
+        title=title, baseline=baseline, current=current, speedup=baseline / current))
+
+
+def benchmark_tokens_estimator(title: str, estimator: callable, reference_estimator: callable) -> None:
+    """
+    Benchmark a tokens estimator against its reference implementation.
+
+    :param title: benchmark title
+    :param estimator: tokens estimator
+    :param reference_estimator: reference tokens estimator
+    """
+    print(title)
+    for sample_name, sample in [("text", TEXT_SAMPLE), ("code", CODE_SAMPLE), ("digits", DIGITS_SAMPLE),
+                                ("keyword-free text", PLAIN_SAMPLE)]:
+        for size in SIZES:
+            message = (sample * (size // len(sample) + 1))[:size]
+            if estimator(message) != reference_estimator(message):
+                print("Estimation mismatch on {0} KB of {1}".format(size // 1024, sample_name))
+                sys.exit(1)
+            print_comparison(
+                "  {0} KB of {1}".format(size // 1024, sample_name),
+                measure(reference_estimator, message),
+                measure(estimator, message))
+
+
+def benchmark_archive() -> None:
+    """Benchmark the binary columnar archive against the JSON session file."""
+    print("Session archive ({0} messages)".format(ARCHIVE_MESSAGES))
+    messages = [Prompt(message="Hello number {0}".format(index)) if index % 2 == 0 else
+                Response(message="Reply number {0}".format(index)) for index in range(ARCHIVE_MESSAGES)]
+    session = Session(messages=messages, init_check=False)
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "session.json")
+        archive_path = os.path.join(directory, "session.mem")
+        print_comparison("  save", measure(session.save, json_path), measure(save_archive, [session], archive_path))
+        print_comparison(
+            "  load",
+            measure(lambda: Session(file_path=json_path, init_check=False)),
+            measure(load_archive, archive_path))
+        print("  size: {0} bytes -> {1} bytes".format(os.path.getsize(json_path), os.path.getsize(archive_path)))
+
+
+def benchmark_json_codecs() -> None:
+    """Benchmark the session save and load throughput of each installed JSON codec."""
+    print("JSON codecs ({0} messages)".format(CODEC_MESSAGES))
+    messages = [Prompt(message="Hello number {0}".format(index)) if index % 2 == 0 else
+                Response(message="Reply number {0}".format(index)) for index in range(CODEC_MESSAGES)]
+    session = Session(messages=messages, init_check=False)
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "session.json")
+        for codec in JSON_CODECS:
+            try:
+                set_json_codec(codec)
+            except MemorValidationError:
+                print("  {0}: not installed".format(codec))
+                continue
+            save_time = measure(session.save, file_path)
+            load_time = measure(lambda: Session(file_path=file_path, init_check=False))
+            size = os.path.getsize(file_path) / 2 ** 20
+            print("  {0}: save {1:.4f}s ({2:.1f} MB/s), load {3:.4f}s ({4:.1f} MB/s)".format(
+                codec, save_time, size / save_time, load_time, size / load_time))
+    set_json_codec()
+
+
+def benchmark_memory() -> None:
+    """Benchmark the memory used per message."""
+    print("Memory per message ({0} messages)".format(MEMORY_MESSAGES))
+    factories = [
+        ("Response",
+         lambda index: reference_response("Reply number {0}".format(index)),
+         lambda index: Response(message="Reply number {0}".format(index))),
+        ("Prompt",
+         lambda index: reference_prompt("Hello number {0}".format(index)),
+         lambda index: Prompt(message="Hello number {0}".format(index), init_check=False)),
+    ]
+    for title, reference_factory, factory in factories:
+        baseline = measure_memory(reference_factory)
+        current = measure_memory(factory)
+        print("  {title}: {baseline} bytes -> {current} bytes ({reduction:.1f}x)".format(
+            title=title, baseline=baseline, current=current, reduction=baseline / current))
+
+
+if __name__ == "__main__":
+    benchmark_tokens_estimator(
+        "Universal tokens estimator",
+        universal_tokens_estimator,
+        reference_universal_tokens_estimator)
+    benchmark_tokens_estimator(
+        "OpenAI GPT-4 tokens estimator",
+        openai_tokens_estimator_gpt_4,
+        reference_openai_tokens_estimator_gpt_4)
+    benchmark_archive()
+    benchmark_json_codecs()
+    benchmark_memory()
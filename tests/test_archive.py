@@ -0,0 +1,156 @@
+import datetime
+import json
+import struct
+import sys
+from array import array
+import pytest
+from memor import Session, Prompt, Response, Role, LLMModel
+from memor import PresetPromptTemplate, PromptTemplate
+from memor import RenderFormat, SessionView
+from memor import save_archive, load_archive, MemorValidationError, MemorRenderError
+
+TEST_CASE_NAME = "Archive tests"
+
+
+def test_save_load1():
+    response1 = Response(message="I am fine. ☃", score=0.8, temperature=0.5, top_k=10, top_p=0.9,
+                         inference_time=0.2, model=LLMModel.GPT_4, gpu="A100", tokens=4)
+    response2 = Response(message="Thanks!", role=Role.USER)
+    prompt = Prompt(message="Hello, how are you?", responses=[response1, response2], role=Role.SYSTEM, tokens=5,
+                    template=PresetPromptTemplate.INSTRUCTION1.PROMPT_RESPONSE_STANDARD)
+    prompt.select_response(1)
+    session1 = Session(messages=[prompt, response1], title="session1")
+    session1.disable_message(1)
+    _ = session1.render()
+    session2 = Session()
+    result = save_archive([session1, session2], "archive_test1.mem")
+    assert result["status"]
+    sessions = load_archive("archive_test1.mem")
+    assert sessions == [session1, session2]
+    assert sessions[0].to_json() == session1.to_json() and sessions[1].to_json() == session2.to_json()
+    assert sessions[0].messages_status == [True, False] and sessions[0].render_counter == 1
+    assert sessions[0][0].selected_response == response2 and sessions[0][1].gpu == "A100"
+
+
+def test_save_load2():
+    date = datetime.datetime(2025, 5, 7, 21, 54, 48, 123456, tzinfo=datetime.timezone(datetime.timedelta(hours=3, minutes=30)))
+    response = Response(message="I am fine.", date=date)
+    template = PromptTemplate(content="{instruction} {prompt[message]}", custom_map={"instruction": "Hi"})
+    prompt = Prompt(message="How are you?", template=template)
+    session1 = Session(messages=[prompt, response])
+    _ = save_archive([session1], "archive_test1.mem")
+    session2 = load_archive("archive_test1.mem", use_mmap=False)[0]
+    assert session2[1].date_created == date and session2[1].date_created.utcoffset() == date.utcoffset()
+    assert session2[1].gpu is None and session2[0].template == template
+    assert session2.render() == session1.render()
+
+
+def test_save_load3():
+    result = save_archive([Session()], "f:/")
+    assert result["status"] == False
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `sessions` must be a list of `Session`."):
+        _ = save_archive(Session(), "archive_test1.mem")
+
+
+def test_save_load4():
+    date = datetime.datetime(9999, 12, 31, 23, 59, 59, 999999, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+    response = Response(message="I am fine.", date=date)
+    _ = save_archive([Session(messages=[response])], "archive_test1.mem")
+    session = load_archive("archive_test1.mem")[0]
+    assert session[0].date_created == date and session[0].date_created.utcoffset() == date.utcoffset()
+
+
+def test_save_load5():
+    response = Response(message="I am fine.", score=0.8, tokens=4, model=LLMModel.GPT_4)
+    prompt = Prompt(message="Hello, how are you?", responses=[response], role=Role.SYSTEM)
+    session1 = Session(messages=[prompt, response], title="session1")
+    _ = save_archive([session1], "archive_test1.mem")
+    with open("archive_test1.mem", "rb") as file:
+        data = file.read()
+    magic_length = data.index(b"{") - 8
+    header_length = struct.unpack("<Q", data[magic_length:magic_length + 8])[0]
+    header = json.loads(data[magic_length + 8:magic_length + 8 + header_length])
+    body = bytearray(data[magic_length + 8 + header_length:])
+    for table in header["tables"].values():
+        for typecode, offset, size in table["columns"].values():
+            if typecode != "B":
+                column = array(typecode)
+                column.frombytes(body[offset:offset + size])
+                column.byteswap()
+                body[offset:offset + size] = column.tobytes()
+    header["byteorder"] = "big" if sys.byteorder == "little" else "little"
+    header_data = json.dumps(header).encode("utf-8")
+    with open("archive_test1.mem", "wb") as file:
+        file.write(data[:magic_length] + struct.pack("<Q", len(header_data)) + header_data + bytes(body))
+    session2 = load_archive("archive_test1.mem", use_mmap=False)[0]
+    assert session2 == session1 and session2.to_json() == session1.to_json()
+    assert session2.render() == session1.render()
+
+
+def test_save_load6():
+    response = Response(message="I am fine. \ud800")
+    session1 = Session(messages=[Prompt(message="Hello \udfff", responses=[response]), response])
+    result = save_archive([session1], "archive_test1.mem")
+    assert result["status"]
+    session2 = load_archive("archive_test1.mem")[0]
+    assert session2 == session1 and session2.get_message_by_id(response.id) == response
+
+
+def test_load1():
+    with open("archive_test2.mem", "w") as file:
+        file.write("{}")
+    with pytest.raises(MemorValidationError, match=r"Invalid archive structure. It should be a Memor binary archive file."):
+        _ = load_archive("archive_test2.mem")
+    with pytest.raises(FileNotFoundError, match=r"Invalid path: must be a string and refer to an existing location. Given path: archive_test3.mem"):
+        _ = load_archive("archive_test3.mem")
+
+
+def test_session_view1():
+    response1 = Response(message="I am fine.", model=LLMModel.GPT_4)
+    response2 = Response(message="Good bye!", role=Role.USER)
+    prompt = Prompt(message="Hello, how are you?", responses=[response1], template=PresetPromptTemplate.INSTRUCTION1.PROMPT)
+    session1 = Session(messages=[prompt, response1], title="session1")
+    session2 = Session(messages=[response2, prompt, response1], title="session2")
+    session2.disable_message(1)
+    _ = save_archive([session1, session2], "archive_test1.mem")
+    with SessionView("archive_test1.mem", session_index=1) as view:
+        assert len(view) == 3 and view.title == "session2" and view.messages_status == [True, False, True]
+        assert repr(view) == "SessionView(title=session2)"
+        assert view[0] == response2 and view[-1] == response1 and view[0:2] == [response2, prompt]
+        assert view[prompt.id] == prompt and view[response1.id] == response1 and view[response2.id] == response2
+        assert view["a0b5b8ae-ba8a-4ecd-a6c1-66c9e6d36f8b"] is None
+        assert list(view) == session2.messages
+        assert view.render() == session2.render(enable_counter=False)
+        assert view.render(RenderFormat.OPENAI) == session2.render(RenderFormat.OPENAI)
+        assert view.render(RenderFormat.AI_STUDIO) == session2.render(RenderFormat.AI_STUDIO)
+        assert view.render(RenderFormat.DICTIONARY)["content"] == session2.render(RenderFormat.DICTIONARY)["content"]
+        assert view.search("fine") == session2.search("fine") == [2] and view.search("good") == [0]
+        assert view.search("^I am", use_regex=True, case_sensitive=True) == [2]
+        assert view.to_session() == session2 and view.date_created == session2.date_created
+        assert view.render_counter == 0 and view.date_modified <= session2.date_modified
+
+
+def test_session_view2():
+    _ = save_archive([Session(messages=[Response(message="I am fine.")])], "archive_test1.mem")
+    view = SessionView("archive_test1.mem")
+    with pytest.raises(IndexError, match=r"SessionView index out of range"):
+        _ = view[1]
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `identifier` must be an integer, string or a slice."):
+        _ = view[1.5]
+    with pytest.raises(MemorValidationError, match=r"Invalid render format. It must be an instance of RenderFormat enum."):
+        _ = view.render("STRING")
+    view.close()
+    with pytest.raises(MemorValidationError, match=r"Invalid archive structure. It should be a Memor binary archive file."):
+        _ = SessionView("archive_test1.mem", session_index=1)
+
+
+def test_session_view3():
+    template = PromptTemplate(content="{prompt[role]}: {prompt[message]} {name}", custom_map={"name": "Alice"})
+    prompt1 = Prompt(message="Hello, how are you?", template=template)
+    prompt2 = Prompt(message="Hello!", template=PromptTemplate(content="{prompt[message]} {name}", custom_map={"instruction": "Hi"}), init_check=False)
+    session = Session(messages=[prompt1, prompt2], init_check=False)
+    assert save_archive([session], "archive_test1.mem")["status"]
+    with SessionView("archive_test1.mem") as view:
+        assert view.search("user: hello") == [0] and view.search("hello") == [0]
+        with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+            _ = view.render()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import datetime
 import uuid
@@ -75,6 +76,18 @@ def test_estimated_tokens3():
     assert prompt.estimate_tokens(TokensEstimator.OPENAI_GPT_4) == 8
 
 
+def test_estimated_tokens4():
+    response = Response(message="I am fine.")
+    prompt = Prompt(message="Hello, how are you?", responses=[response], role=Role.USER)
+    assert prompt.estimate_tokens(TokensEstimator.UNIVERSAL) == 7
+    prompt.update_message("Hello!")
+    assert prompt.estimate_tokens(TokensEstimator.UNIVERSAL) == 3
+    prompt.update_template(PresetPromptTemplate.BASIC.RESPONSE)
+    assert prompt.estimate_tokens(TokensEstimator.UNIVERSAL) == 5
+    response.update_message("I am fine. Thank you for asking!")
+    assert prompt.estimate_tokens(TokensEstimator.UNIVERSAL) == 11
+
+
 def test_role1():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     assert prompt.role == Role.USER
@@ -404,6 +417,64 @@ def test_json4():
     assert prompt.tokens is None
 
 
+def test_json5():
+    prompt1 = Prompt(message="Hello, how are you?", template=PresetPromptTemplate.INSTRUCTION1.PROMPT)
+    prompt1_json = prompt1.to_json()
+    assert prompt1_json["template"] == {"preset": "Instruction1/Prompt"}
+    prompt2 = Prompt()
+    prompt2.from_json(prompt1_json)
+    assert prompt2.template is PresetPromptTemplate.INSTRUCTION1.PROMPT.value
+    assert prompt2.to_json()["template"] == {"preset": "Instruction1/Prompt"}
+    prompt3 = Prompt()
+    prompt3.from_json(prompt1.to_json(save_template=False))
+    prompt3.update_template(PresetPromptTemplate.INSTRUCTION1.PROMPT.value.copy())
+    assert prompt3.to_json()["template"] == {"preset": "Instruction1/Prompt"}
+    prompt4 = Prompt()
+    prompt4.from_json(prompt3.to_json())
+    assert prompt4.template is PresetPromptTemplate.INSTRUCTION1.PROMPT.value
+
+
+def test_json7():
+    prompt = Prompt(message="Hello, how are you?", template=PresetPromptTemplate.BASIC.PROMPT)
+    content = PresetPromptTemplate.BASIC.PROMPT.value.content
+    prompt1 = Prompt()
+    prompt1.from_json(prompt.to_json())
+    prompt2 = Prompt()
+    prompt2.from_json(prompt.to_json())
+    with pytest.raises(MemorValidationError, match=r"Shared templates \(presets and loaded templates\) are read-only."):
+        prompt1.template.update_content("HACKED {prompt[message]}")
+    with pytest.raises(MemorValidationError, match=r"Shared templates \(presets and loaded templates\) are read-only."):
+        prompt2.to_dict()["template"].from_json(PromptTemplate(content="HACKED {prompt[message]}", custom_map={}).to_json())
+    template = prompt1.template.copy()
+    template.update_content("HACKED {prompt[message]}")
+    prompt1.update_template(template)
+    assert prompt1.render() == "HACKED Hello, how are you?"
+    assert prompt2.render() == prompt.render() and "HACKED" not in Prompt(message="fresh").render()
+    assert PresetPromptTemplate.BASIC.PROMPT.value.content == content
+
+
+def test_json6():
+    template = PromptTemplate(content="{instruction}, {prompt[message]}", custom_map={"instruction": "Hi"})
+    prompt = Prompt(message="Hello, how are you?", template=template)
+    prompt1 = Prompt()
+    prompt1.from_json(prompt.to_json())
+    prompt2 = Prompt()
+    prompt2.from_json(prompt.to_json())
+    assert prompt1.template is prompt2.template and prompt1.template == template
+    prompt1.template.custom_map["instruction"] = "Hello"
+    with pytest.raises(MemorValidationError, match=r"Shared templates \(presets and loaded templates\) are read-only."):
+        prompt1.template.update_map({"instruction": "Hello"})
+    prompt1.update_template(prompt1.template.copy())
+    prompt1.template.update_map({"instruction": "Hello"})
+    prompt3 = Prompt()
+    prompt3.from_json(prompt.to_json())
+    assert prompt3.template is prompt2.template and prompt3.template == template
+    assert prompt1.render() == "Hello, Hello, how are you?" and prompt2.render() == "Hi, Hello, how are you?"
+    prompt4 = Prompt()
+    with pytest.raises(MemorValidationError, match=r"Invalid prompt structure. It should be a JSON object with proper fields."):
+        prompt4.from_json(dict(prompt.to_json(), template={"preset": "Basic/Unknown"}))
+
+
 def test_save1():
     message = "Hello, how are you?"
     response1 = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
@@ -608,6 +679,76 @@ def test_render10():
     assert prompt.render(RenderFormat.AI_STUDIO) == {'role': 'model', 'parts': [{'text': 'Hi, How are you?'}]}
 
 
+def test_render11():
+    message = "How are you?"
+    response1 = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
+    response2 = Response(message="Thanks!", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
+    template = PromptTemplate(content="{prompt[role]}: {prompt[message]} | {responses[1][message]} ({response[score]})")
+    prompt = Prompt(message=message, responses=[response1, response2], role=Role.USER, template=template)
+    assert prompt.render() == "user: How are you? | Thanks! (0.8)"
+    template.update_content("{prompt[date_created]}")
+    assert prompt.render() == datetime.datetime.strftime(prompt.date_created, "%Y-%m-%d %H:%M:%S %z")
+
+
+def test_render12():
+    message = "How are you?"
+    response = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
+    template = PromptTemplate(content="{prompt}")
+    prompt = Prompt(message=message, responses=[response], role=Role.USER, template=template)
+    assert "'role': 'user'" in prompt.render()
+    template.update_content("{prompt[message]} {")
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = prompt.render()
+    template.update_content("{prompt[message]:>{width}}")
+    template.update_map({"width": "14"})
+    assert prompt.render() == "  How are you?"
+
+
+def test_render13():
+    message = "How are you?"
+    template = PromptTemplate(content="{prompt[message]} {response[message]}", custom_map={})
+    prompt = Prompt(message=message, responses=[], role=Role.USER, template=template, init_check=False)
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = prompt.render()
+    prompt.add_response(Response(message="I am fine."))
+    assert prompt.render() == "How are you? I am fine."
+    assert prompt.render(RenderFormat.DICTIONARY)["content"] == "How are you? I am fine."
+
+
+def test_render14():
+    response = Response(message="I am fine.", model=LLMModel.GPT_4, score=0.8)
+    prompt = Prompt(message="How are you?", responses=[response], role=Role.SYSTEM, tokens=3)
+    prompt_json = prompt.to_json(save_template=False)
+    response_json = response.to_json()
+    prompt.update_template(PromptTemplate(content="{prompt[message]}", custom_map={}))
+    assert prompt.render() == "How are you?"
+    content = "{prompt[type]} {prompt[role]} {prompt[date_created]} {prompt[responses][0][message]} {prompt[tokens]}"
+    content += " {response[type]} {response[model]} {response[date_modified]} {responses[0][score]} {x}"
+    prompt.update_template(PromptTemplate(content=content, custom_map={"x": "!"}))
+    assert prompt.render() == "Prompt system {0} I am fine. 3 Response {1} {2} 0.8 !".format(
+        prompt_json["date_created"], response_json["model"], response_json["date_modified"])
+    prompt.update_template(PromptTemplate(content="{prompt[template]}", custom_map={}))
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = prompt.render()
+
+
+def test_render15():
+    prompt = Prompt(message="How are you?", responses=[Response(message="I am fine.")],
+                    template=PresetPromptTemplate.BASIC.PROMPT)
+    assert PresetPromptTemplate.BASIC.PROMPT.value._is_message_only()
+    assert PresetPromptTemplate.INSTRUCTION1.PROMPT.value._is_message_only()
+    assert not PresetPromptTemplate.BASIC.PROMPT_RESPONSE_STANDARD.value._is_message_only()
+    assert prompt.render() == "How are you?"
+    template = PromptTemplate(content="{instruction}{prompt[message]}", custom_map={"instruction": "Hi! "})
+    prompt.update_template(template)
+    assert template._is_message_only() and prompt.render() == "Hi! How are you?"
+    template.custom_map["prompt"] = {"message": "Overridden"}
+    assert not template._is_message_only() and prompt.render() == "Hi! Overridden"
+    del template.custom_map["instruction"]
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = prompt.render()
+
+
 def test_init_check():
     message = "Hello, how are you?"
     response = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
@@ -756,6 +897,28 @@ def test_date_created():
     assert isinstance(prompt.date_created, datetime.datetime)
 
 
+def test_slots():
+    prompt = Prompt(message="Hello, how are you?", responses=[Response(message="I am fine.")])
+    assert not hasattr(prompt, "__dict__")
+    prompt_copy = copy.copy(prompt)
+    assert prompt_copy == prompt and prompt_copy.date_created == prompt.date_created and prompt_copy.id != prompt.id
+
+
+def test_size_cache():
+    response = Response(message="I am fine.")
+    template = PromptTemplate(content="{prompt[message]} {response[message]}", custom_map={})
+    prompt = Prompt(message="Hello, how are you?", responses=[response], template=template)
+    size, length = prompt.size, len(prompt)
+    assert size == prompt.get_size() and length == len(prompt)
+    response.update_message("I am fine, thank you.")
+    assert prompt.size == size + 11 and len(prompt) == length + 11
+    template.update_content("{prompt[message]}")
+    prompt.save("prompt_test4.json")
+    assert len(prompt) == len("Hello, how are you?") and prompt.size == os.path.getsize("prompt_test4.json")
+    prompt_copy = copy.copy(prompt)
+    assert prompt_copy.size == prompt.size and len(prompt_copy) == len(prompt)
+
+
 def test_size():
     message = "Hello, how are you?"
     response1 = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
@@ -770,3 +933,70 @@ def test_size():
     prompt.save("prompt_test4.json")
     assert os.path.getsize("prompt_test4.json") == prompt.size
     assert prompt.size == prompt.get_size()
+
+
+def test_async_save_load1():
+    response = Response(message="I am fine.")
+    prompt1 = Prompt(message="Hello, how are you?", responses=[response],
+                     template=PresetPromptTemplate.INSTRUCTION1.PROMPT_RESPONSE_STANDARD)
+    result = asyncio.run(prompt1.async_save("prompt_test1.json"))
+    prompt2 = Prompt()
+    asyncio.run(prompt2.async_load("prompt_test1.json"))
+    assert result["status"] and prompt1 == prompt2
+    result = asyncio.run(prompt1.async_save("prompt_test1.json", save_template=False))
+    asyncio.run(prompt2.async_load("prompt_test1.json"))
+    assert result["status"] and prompt2.template == PresetPromptTemplate.DEFAULT.value
+
+
+def test_atomic_save1():
+    prompt1 = Prompt(message="Hello, how are you?")
+    result = prompt1.save("prompt_test1.json", atomic=True, fsync=True)
+    prompt2 = Prompt(file_path="prompt_test1.json")
+    assert result["status"] and prompt1 == prompt2
+    assert prompt1.save("f:/", atomic=True)["status"] == False
+    result = asyncio.run(prompt1.async_save("prompt_test1.json", atomic=True))
+    assert result["status"] and Prompt(file_path="prompt_test1.json") == prompt1
+
+
+def test_trusted_load1():
+    response = Response(message="I am fine.")
+    prompt1 = Prompt(message="Hello, how are you?", responses=[response],
+                     template=PresetPromptTemplate.INSTRUCTION1.PROMPT_RESPONSE_STANDARD)
+    assert prompt1.save("prompt_test1.json", checksum=True)["status"]
+    prompt2 = Prompt()
+    prompt2.load("prompt_test1.json", trusted=True)
+    assert prompt1 == prompt2 and prompt2.responses == [response]
+    assert asyncio.run(prompt1.async_save("prompt_test1.json", save_template=False, checksum=True))["status"]
+    prompt2.load("prompt_test1.json", trusted=True)
+    assert prompt2.template == PresetPromptTemplate.DEFAULT.value
+
+
+def test_init_check1():
+    response = Response(message="I am fine.")
+    template1 = PromptTemplate(content="{prompt[message]} {responses[1][message]}")
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = Prompt(message="Hello, how are you?", responses=[response], template=template1)
+    prompt = Prompt(message="Hello, how are you?", responses=[response, response], template=template1)
+    assert prompt.render() == "Hello, how are you? I am fine."
+    template2 = PromptTemplate(content="{prompt[message]} {response[score]}")
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = Prompt(message="Hello, how are you?", template=template2)
+    template3 = PromptTemplate(content="{prompt[messages]}")
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = Prompt(message="Hello, how are you?", template=template3)
+    template4 = PromptTemplate(content="{prompt[message]} {name}", custom_map={"name": "Alice"})
+    prompt = Prompt(message="Hello, how are you?", template=template4)
+    template4.update_map({"instruction": "Hi"})
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = Prompt(message="Hello, how are you?", template=template4)
+
+
+def test_init_check2():
+    template = PromptTemplate(content="{prompt[tokens]:d}")
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = Prompt(message="Hello, how are you?", template=template)
+    prompt = Prompt(message="Hello, how are you?", template=template, tokens=5)
+    assert prompt.render() == "5"
+    template.update_content("{prompt[role]}: {prompt[message]!r}")
+    prompt = Prompt(message="Hello", template=template)
+    assert prompt.render() == "user: 'Hello'"
@@ -1,9 +1,10 @@
+import asyncio
 import os
 import datetime
 import json
 import copy
 import pytest
-from memor import PromptTemplate, MemorValidationError
+from memor import PromptTemplate, PresetPromptTemplate, MemorValidationError
 
 TEST_CASE_NAME = "PromptTemplate tests"
 
@@ -355,3 +356,41 @@ def test_size():
     template.save("template_test3.json")
     assert os.path.getsize("template_test3.json") == template.size
     assert template.size == template.get_size()
+    template.update_title("Python")
+    template.save("template_test3.json")
+    assert os.path.getsize("template_test3.json") == template.size
+
+
+def test_async_save_load1():
+    template1 = PromptTemplate(content="Act as a {language} developer and respond to this question:\n{prompt[message]}",
+                               custom_map={"language": "Python"})
+    result = asyncio.run(template1.async_save("template_test1.json"))
+    template2 = PromptTemplate()
+    asyncio.run(template2.async_load("template_test1.json"))
+    assert result["status"] and template1 == template2
+    assert asyncio.run(template1.async_save("f:/"))["status"] == False
+
+
+def test_atomic_save1():
+    template1 = PromptTemplate(content="{prompt[message]}", custom_map={"language": "Python"})
+    result = template1.save("template_test1.json", atomic=True, fsync=True)
+    template2 = PromptTemplate(file_path="template_test1.json")
+    assert result["status"] and template1 == template2
+    assert template1.save("f:/", atomic=True)["status"] == False
+    result = asyncio.run(template1.async_save("template_test1.json", atomic=True))
+    assert result["status"] and PromptTemplate(file_path="template_test1.json") == template1
+
+
+def test_render_requirements1():
+    template = PromptTemplate(content="{prompt[message]} {response[message]} {responses[2][score]} {name}",
+                              custom_map={"name": "Alice"})
+    assert template._get_render_requirements() == (True, True, 3)
+    template.update_content("{prompt[message]:>20}")
+    assert template._get_render_requirements() is None
+    template.update_content("{prompt[nothing]}")
+    assert template._get_render_requirements() == (False, False, 0)
+    template.update_content("{name[0]}")
+    assert template._get_render_requirements() is None
+    template.update_content("{prompt[message]} {}")
+    assert template._get_render_requirements() == (False, False, 0)
+    assert PresetPromptTemplate.DEFAULT.value._get_render_requirements() == (True, False, 0)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import datetime
 import uuid
@@ -64,6 +65,17 @@ def test_estimated_tokens3():
     assert response.estimate_tokens(TokensEstimator.OPENAI_GPT_4) == 4
 
 
+def test_estimated_tokens4():
+    response = Response(message="I am fine.")
+    assert response.estimate_tokens(TokensEstimator.UNIVERSAL) == 5
+    response.update_message("I am fine. Thank you for asking!")
+    assert response.estimate_tokens(TokensEstimator.UNIVERSAL) == 11
+    assert response.estimate_tokens(TokensEstimator.OPENAI_GPT_4) == 13
+    response_copy = response.copy()
+    response_copy.update_message("I am fine.")
+    assert response.estimate_tokens(TokensEstimator.UNIVERSAL) == 11 and response_copy.estimate_tokens(TokensEstimator.UNIVERSAL) == 5
+
+
 def test_tokens4():
     response = Response(message="I am fine.", tokens=4)
     with pytest.raises(MemorValidationError, match=r"Invalid value. `tokens` must be a positive integer."):
@@ -654,9 +666,99 @@ def test_date_created():
     assert isinstance(response.date_created, datetime.datetime)
 
 
+def test_date_created2():
+    date = datetime.datetime(2025, 5, 7, 21, 54, 48, 123456, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+    response = Response(message="I am fine.", date=date)
+    assert response.date_created == date and response.date_created.utcoffset() == date.utcoffset()
+    assert response.date_created.microsecond == 123456
+
+
+def test_slots():
+    response = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
+    assert not hasattr(response, "__dict__")
+    with pytest.raises(AttributeError):
+        response.attribute = 1
+
+
 def test_size():
     response = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
     response.save("response_test3.json")
 
     assert os.path.getsize("response_test3.json") == response.size
     assert response.size == response.get_size()
+
+
+def test_async_save_load1():
+    response1 = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
+    result = asyncio.run(response1.async_save("response_test1.json"))
+    response2 = Response()
+    asyncio.run(response2.async_load("response_test1.json"))
+    assert result["status"] and response1 == response2
+    assert asyncio.run(response1.async_save("f:/"))["status"] == False
+    with pytest.raises(FileNotFoundError, match=r"Invalid path: must be a string and refer to an existing location. Given path: 2"):
+        asyncio.run(response2.async_load(2))
+
+
+def test_atomic_save1():
+    response1 = Response(message="I am fine.")
+    result = response1.save("response_test1.json", atomic=True, fsync=True)
+    response2 = Response(file_path="response_test1.json")
+    assert result["status"] and response1 == response2
+    assert response1.save("f:/", atomic=True)["status"] == False
+    result = asyncio.run(response1.async_save("response_test1.json", atomic=True))
+    assert result["status"] and Response(file_path="response_test1.json") == response1
+
+
+def test_date_format1():
+    date = datetime.datetime(2025, 5, 7, 21, 54, 48, tzinfo=datetime.timezone(datetime.timedelta(hours=-3, minutes=-30)))
+    response1 = Response(message="I am fine.", date=date)
+    json_object = response1.to_json()
+    assert json_object["date_created"] == "2025-05-07 21:54:48 -0330"
+    response2 = Response()
+    response2.from_json(json_object)
+    assert response2.date_created == date and response2.date_created.utcoffset() == date.utcoffset()
+    json_object["date_created"] = "2025-05-07T21:54:48-03:30"
+    json_object["date_modified"] = 1746667488
+    response2.from_json(json_object)
+    assert response2.date_created == date and response2.date_modified == date
+    json_object["date_created"] = "2025-05-07 21:54:48 -03:30"
+    response2.from_json(json_object)
+    assert response2.date_created == date
+
+
+def test_date_format2():
+    response = Response(message="I am fine.")
+    json_object = response.to_json()
+    json_object["date_created"] = "2025-05-07 21:54:48"
+    with pytest.raises(MemorValidationError, match=r"Invalid response structure. It should be a JSON object with proper fields."):
+        response.from_json(json_object)
+
+
+def test_date_range1():
+    date1 = datetime.datetime(9999, 12, 31, 23, 59, 59, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+    date2 = datetime.datetime(1, 1, 1, 3, 0, 0, 123457, tzinfo=datetime.timezone(datetime.timedelta(hours=5)))
+    date3 = datetime.datetime(2500, 5, 7, 21, 54, 48, 999999, tzinfo=datetime.timezone.utc)
+    for date in [date1, date2, date3]:
+        response1 = Response(message="I am fine.", date=date)
+        assert response1.date_created == date and response1.date_created.utcoffset() == date.utcoffset()
+        assert response1.render(RenderFormat.DICTIONARY)["date_created"] == date
+    for date in [date1, date3]:
+        response1 = Response(message="I am fine.", date=date)
+        assert response1.save("response_test1.json")["status"]
+        response2 = Response(file_path="response_test1.json")
+        assert response2.date_created == date.replace(microsecond=0) and response2 == response1
+
+
+def test_trusted_load1():
+    response1 = Response(message="I am fine.", model=LLMModel.GPT_4, temperature=0.5, role=Role.USER, score=0.8)
+    assert response1.save("response_test1.json", checksum=True)["status"]
+    response2 = Response()
+    response2.load("response_test1.json", trusted=True)
+    assert response1 == response2 and Response(file_path="response_test1.json") == response1
+    asyncio.run(response2.async_load("response_test1.json", trusted=True))
+    assert response1 == response2
+    _ = response1.save("response_test1.json")
+    with pytest.raises(MemorValidationError, match=r"Invalid checksum. The file is corrupted or it was not saved with a checksum."):
+        response2.load("response_test1.json", trusted=True)
+    with pytest.raises(MemorValidationError, match=r"Invalid checksum. The file is corrupted or it was not saved with a checksum."):
+        asyncio.run(response2.async_load("response_test1.json", trusted=True))
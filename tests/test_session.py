@@ -1,13 +1,15 @@
+import asyncio
 import os
 import re
 import datetime
 import copy
 import pytest
 from memor import Session, Prompt, Response, Role
-from memor import PromptTemplate
+from memor import PromptTemplate, PresetPromptTemplate
 from memor import RenderFormat
 from memor import MemorRenderError, MemorValidationError
-from memor import TokensEstimator
+from memor import TokensEstimator, BudgetStrategy
+from memor import async_save_sessions, set_json_codec
 
 TEST_CASE_NAME = "Session tests"
 
@@ -224,6 +226,23 @@ def test_remove_message5():
         session.remove_message(3.5)
 
 
+def test_remove_message6():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response1 = Response(message="I am fine.")
+    response2 = Response(message="Good!")
+    session = Session(messages=[prompt, response1])
+    assert session.get_message_by_id(response1.id) == response1
+    session.add_message(response2, index=0)
+    assert session.get_message_by_id(response1.id) == response1 and session.get_message_by_id(response2.id) == response2
+    session.remove_message_by_index(0)
+    session.remove_message_by_index(-1)
+    assert session.get_message_by_id(response1.id) is None and session.get_message_by_id(prompt.id) == prompt
+    session.add_message(response1)
+    assert session[response1.id] == response1
+    session.clear_messages()
+    assert session.get_message_by_id(prompt.id) is None
+
+
 def test_clear_messages():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
@@ -401,6 +420,136 @@ def test_load4():
     assert session.messages_status == []
 
 
+def test_lazy_load1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt, response], title="session1")
+    session1.disable_message(1)
+    _ = session1.save("session_test3.json")
+    session2 = Session()
+    session2.load("session_test3.json", lazy=True)
+    assert session2.title == "session1" and len(session2) == 2 and session2.messages_status == [True, False]
+    assert all(isinstance(message, dict) for message in session2._messages)
+    assert session2.render(RenderFormat.STRING) == "Hello, how are you?\n"
+    assert isinstance(session2._messages[0], Prompt) and isinstance(session2._messages[1], dict)
+    assert session2[1] == response and response.id in session2
+    assert session1 == session2
+
+
+def test_lazy_load2():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt, response, prompt], title="session1")
+    session2 = Session()
+    session2.from_json(session1.to_json(), lazy=True)
+    assert session2.get_message_by_id(response.id) == response
+    assert isinstance(session2._messages[0], dict) and isinstance(session2._messages[2], dict)
+    assert session2[0:3:2] == [prompt, prompt]
+    assert list(session2) == [prompt, response, prompt]
+    session2.update_messages_status([False, True, True])
+    assert session2.messages_status == [False, True, True]
+    assert session2.to_json()["messages"] == session1.to_json()["messages"]
+
+
+def test_lazy_load3():
+    session = Session()
+    with pytest.raises(MemorValidationError, match=r"Invalid session structure. It should be a JSON object with proper fields."):
+        session.from_json({"type": "Session", "title": None, "messages_status": [True], "messages": [{"type": "Message"}],
+                           "memor_version": "0.8", "date_created": "2025-05-07 21:54:48 +0000",
+                           "date_modified": "2025-05-07 21:54:48 +0000"}, lazy=True)
+    session.from_json({"type": "Session", "title": None, "messages_status": [True], "messages": [{"type": "Prompt"}],
+                       "memor_version": "0.8", "date_created": "2025-05-07 21:54:48 +0000",
+                       "date_modified": "2025-05-07 21:54:48 +0000"}, lazy=True)
+    assert len(session) == 1
+    with pytest.raises(MemorValidationError, match=r"Invalid prompt structure. It should be a JSON object with proper fields."):
+        _ = session[0]
+
+
+def test_append_save1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt], title="session1")
+    result = session1.append_save("session_test4.json")
+    assert result["status"]
+    session1.add_message(response)
+    session1.disable_message(0)
+    session1.update_title("session2")
+    _ = session1.append_save("session_test4.json")
+    with open("session_test4.json", "r") as file:
+        lines = file.readlines()
+    assert len(lines) == 5
+    session2 = Session(file_path="session_test4.json")
+    assert session1 == session2 and session2.messages_status == [False, True] and session2.title == "session2"
+
+
+def test_append_save2():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt, response, prompt], title="session1")
+    _ = session1.append_save("session_test4.json")
+    session1.remove_message(1)
+    response.update_message("I am not fine.")
+    prompt.update_message("How are you?")
+    session1.add_message(response, index=0)
+    session1.update_title("session2")
+    _ = session1.append_save("session_test4.json")
+    session2 = Session()
+    session2.load("session_test4.json", lazy=True)
+    assert session2.to_json()["messages"] == session1.to_json()["messages"]
+    session2.add_message(Response(message="Bye!"))
+    session2.update_title("session3")
+    _ = session2.append_save("session_test4.json")
+    with open("session_test4.json", "r") as file:
+        lines = file.readlines()
+    assert len(lines) == 11
+    _ = session2.append_save("session_test4.json", compact=True)
+    with open("session_test4.json", "r") as file:
+        lines = file.readlines()
+    assert len(lines) == 5
+    session3 = Session(file_path="session_test4.json")
+    assert session3 == session2
+
+
+def test_append_save3():
+    session1 = Session(messages=[Prompt(message="Hello, how are you?")], title="session1")
+    _ = session1.append_save("session_test4.json")
+    with open("session_test4.json", "a") as file:
+        file.write('{"op": "add", "index": 1, "mess')
+    session2 = Session(file_path="session_test4.json")
+    assert session2 == session1
+    session2.add_message(Response(message="I am fine."))
+    _ = session2.append_save("session_test4.json")
+    assert Session(file_path="session_test4.json") == session2
+    with open("session_test4.json", "a") as file:
+        file.write('{"op": "move", "index": 0}\n')
+    with pytest.raises(MemorValidationError, match=r"Invalid session log structure. It should be a JSON Lines file with proper records."):
+        _ = Session(file_path="session_test4.json")
+
+
+def test_append_save4():
+    session = Session(messages=[Prompt(message="Hello, how are you?")], title="session1")
+    result = session.append_save("f:/")
+    assert result["status"] == False
+
+
+def test_append_save5():
+    response1 = Response(message="r0")
+    response2 = Response(message="r1")
+    template = PromptTemplate(content="{instruction} {prompt[message]}", custom_map={"instruction": "Hi"})
+    prompt = Prompt(message="Hello, how are you?", responses=[response1, response2], template=template)
+    session1 = Session(messages=[prompt], title="session1")
+    _ = session1.append_save("session_test4.json")
+    response1.update_message("EDITED")
+    _ = session1.append_save("session_test4.json")
+    session2 = Session(file_path="session_test4.json")
+    assert session2[0].responses[0].message == "EDITED"
+    template.update_content("{instruction}: {prompt[message]}")
+    _ = session1.append_save("session_test4.json")
+    session3 = Session(file_path="session_test4.json")
+    assert session3[0].template.content == "{instruction}: {prompt[message]}"
+    assert session3.render() == session1.render()
+
+
 def test_render1():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
@@ -461,6 +610,111 @@ def test_render7():
     assert session.render(RenderFormat.AI_STUDIO) == [{'role': 'user', 'parts': [{'text': 'Hello, how are you?'}]}]
 
 
+def test_render_cache1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session1")
+    assert session.render() == "Hello, how are you?\nI am fine.\n"
+    prompt.update_message("Hi!")
+    response.update_message("Good.")
+    assert session.render() == "Hi!\nGood.\n"
+    assert session.render(RenderFormat.OPENAI) == [{"role": "user", "content": "Hi!"}, {
+        "role": "assistant", "content": "Good."}]
+
+
+def test_render_cache2():
+    response1 = Response(message="I am fine.")
+    response2 = Response(message="I am not fine.")
+    prompt = Prompt(message="Hello, how are you?", responses=[response1, response2],
+                    template=PresetPromptTemplate.BASIC.RESPONSE)
+    session = Session(messages=[prompt], title="session1")
+    assert session.render() == "I am fine.\n"
+    prompt.select_response(1)
+    assert session.render() == "I am not fine.\n"
+    response2.update_message("I am great.")
+    assert session.render() == "I am great.\n"
+    prompt.update_template(PresetPromptTemplate.BASIC.PROMPT)
+    assert session.render() == "Hello, how are you?\n"
+
+
+def test_render_cache3():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session1")
+    result = session.render(RenderFormat.AI_STUDIO)
+    result[0]["parts"][0]["text"] = "Changed!"
+    assert session.render(RenderFormat.AI_STUDIO)[0] == {'role': 'user', 'parts': [{'text': 'Hello, how are you?'}]}
+    session.add_message(Response("Good!"), index=0)
+    session.remove_message(2)
+    assert session.render() == "Good!\nHello, how are you?\n"
+
+
+def test_render_cache4():
+    template = PromptTemplate(content="{x}:{prompt[message]}", custom_map={"x": "B"})
+    prompt = Prompt(message="m", template=template)
+    session = Session(messages=[prompt], title="session1")
+    assert session.render() == "B:m\n"
+    template.custom_map["x"] = "C"
+    assert session.render() == "C:m\n"
+    assert session.render(RenderFormat.OPENAI) == [{"role": "user", "content": "C:m"}]
+
+
+def test_render_cache5():
+    prompt = Prompt(message="Hello, how are you?", role=Role.SYSTEM)
+    response = Response(message="I am fine.", role=Role.SYSTEM)
+    session = Session(messages=[prompt, response], title="session1")
+    for _ in range(2):
+        with pytest.warns(UserWarning, match="Google AI Studio models may not support content with a system role.") as records:
+            _ = session.render(RenderFormat.AI_STUDIO)
+        assert len(records) == 2
+
+
+def test_render_segments1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session1")
+    assert list(session.render_segments()) == ["Hello, how are you?", "\n", "I am fine.", "\n"]
+    assert "".join(session.render_segments()) == session.render()
+    assert session.render_counter == 1
+
+
+def test_render_segments2():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session1")
+    session.disable_message(0)
+    assert list(session.render_segments()) == ["I am fine.", "\n"]
+
+
+def test_iter_render1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session1")
+    session.disable_message(0)
+    assert list(session.iter_render(RenderFormat.OPENAI)) == [{"role": "assistant", "content": "I am fine."}]
+    assert list(session.iter_render()) == ["I am fine."]
+    assert session.render_counter == 0
+
+
+def test_iter_render2():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session1")
+    assert list(session.iter_render(RenderFormat.OPENAI, max_tokens=0)) == []
+    assert list(session.iter_render(RenderFormat.OPENAI, max_tokens=7)) == [{"role": "user", "content": "Hello, how are you?"}]
+    assert len(list(session.iter_render(RenderFormat.OPENAI, max_tokens=12))) == 2
+    assert len(list(session.iter_render(RenderFormat.OPENAI, max_tokens=11, method=TokensEstimator.OPENAI_GPT_4))) == 1
+
+
+def test_iter_render3():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    session = Session(messages=[prompt], title="session1")
+    with pytest.raises(MemorValidationError, match=r"Invalid render format. It must be an instance of RenderFormat enum."):
+        _ = session.iter_render("OPENAI")
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `max_tokens` must be a positive integer."):
+        _ = session.iter_render(RenderFormat.OPENAI, max_tokens=-1)
+
+
 def test_check_render1():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
@@ -644,6 +898,62 @@ def test_addition8():
         _ = 2 + session1
 
 
+def test_addition9():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt, response], title="session1")
+    session1.disable_message(1)
+    session2 = Session(messages=[response, prompt], title="session2")
+    session2.disable_message(0)
+    session3 = session1 + session2
+    assert session3.messages_status == [True, False, False, True]
+    session4 = session1 + prompt
+    session6 = Session(messages=[prompt, response, prompt], title="session1")
+    session6.disable_message(1)
+    assert session4.messages_status == [True, False, True] and session4.render() == session6.render()
+    session5 = response + session1
+    assert session5.messages_status == [True, True, False] and session5[response.id] == response
+    assert len(session1) == 2 and len(Session()) == 0
+    template = PromptTemplate(content="{prompt[message]} {name}", custom_map={"instruction": "Hi"})
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        _ = session1 + Prompt(message="Hello!", template=template, init_check=False)
+
+
+def test_addition10():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt, response], title="session1")
+    _ = session1.save("session_test1.json")
+    session2 = Session()
+    session2.load("session_test1.json", lazy=True)
+    session3 = session2 + session1
+    assert session3.messages == session2.messages + session1.messages
+
+
+def test_inplace_addition1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt], title="session1")
+    session2 = session1
+    session1 += response
+    assert session1 is session2 and session1.messages == [prompt, response] and session1[response.id] == response
+    session1.disable_message(1)
+    session1 += session1
+    assert session1.messages == [prompt, response, prompt, response]
+    assert session1.messages_status == [True, False, True, False] and session1.get_message(3) == response
+    with pytest.raises(TypeError, match=re.escape(r"Unsupported operand type(s) for +=: `Session` and `int`")):
+        session1 += 2
+
+
+def test_inplace_addition2():
+    template = PromptTemplate(content="{response[2][message]}")
+    prompt = Prompt(message="Hello, how are you?", template=template, init_check=False)
+    session = Session(messages=[Response(message="I am fine.")], title="session")
+    with pytest.raises(MemorRenderError, match=r"Prompt template and properties are incompatible."):
+        session += prompt
+    assert len(session) == 1
+
+
 def test_contains1():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
@@ -666,6 +976,75 @@ def test_contains3():
     assert "I am fine." not in session
 
 
+def test_contains4():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session")
+    assert prompt.id in session and response.id in session
+    session.remove_message(prompt.id)
+    assert prompt.id not in session and response.id in session
+
+
+def test_contains5():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session")
+    old_id = response.id
+    assert session.get_message_by_id(old_id) == response
+    response.regenerate_id()
+    assert session.get_message_by_id(response.id) is response and response.id in session
+    assert session.get_message_by_id(old_id) is None and old_id not in session
+
+
+def test_contains6():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session")
+    assert prompt.id in session
+    assert "missing" not in session and session.get_message_by_id("missing") is None
+    session.messages.append(response.copy())
+    assert session.messages[2].id in session
+
+
+def test_contains7():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response1 = Response(message="I am fine.")
+    response2 = Response(message="Good!")
+    session = Session(messages=[prompt, response1], title="session")
+    assert response1.id in session
+    session.messages[1] = response2
+    assert session.get_message_by_id(response2.id) is response2
+    assert response1.id not in session
+
+
+def test_contains8():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER, responses=[Response(message="I am fine.")])
+    session = Session(messages=[prompt], title="session")
+    assert prompt.id in session
+    messages_index = session._messages_index
+    Prompt().from_json(prompt.to_json())
+    assert prompt.id in session and session._messages_index is messages_index
+
+
+def test_contains9():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response, prompt], title="session")
+    assert "missing" not in session
+    messages_index = session._messages_index
+    response2 = Response(message="Good!")
+    session.add_message(response2, index=1)
+    assert session.get_message_by_id(response2.id) is response2 and session.get_message_by_id(response.id) is response
+    session.remove_message(0)
+    assert session.get_message_by_id(prompt.id) is prompt and session.get_message_by_id(response.id) is response
+    old_id = response2.id
+    response2.regenerate_id()
+    assert old_id not in session and session.get_message_by_id(response2.id) is response2
+    session.remove_message(prompt.id)
+    assert prompt.id not in session and session.get_message_by_id(response.id) is response
+    assert session._messages_index is messages_index and "missing" not in session
+
+
 def test_getitem1():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
@@ -735,14 +1114,77 @@ def test_estimated_tokens2():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
     session = Session(messages=[prompt, response], title="session")
-    assert session.estimate_tokens(TokensEstimator.OPENAI_GPT_3_5) == 14
+    assert session.estimate_tokens(TokensEstimator.OPENAI_GPT_3_5) == 13
 
 
 def test_estimated_tokens3():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
     session = Session(messages=[prompt, response], title="session")
-    assert session.estimate_tokens(TokensEstimator.OPENAI_GPT_4) == 15
+    assert session.estimate_tokens(TokensEstimator.OPENAI_GPT_4) == 14
+
+
+def test_estimated_tokens4():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response], title="session")
+    assert session.estimate_tokens(TokensEstimator.UNIVERSAL) == 12
+    session.disable_message(0)
+    assert session.estimate_tokens(TokensEstimator.UNIVERSAL) == 5
+    response.update_message("I am fine. Thank you for asking!")
+    assert session.estimate_tokens(TokensEstimator.UNIVERSAL) == 11
+
+
+def test_fit_to_budget1():
+    messages = [Prompt(message="Hello, how are you?"), Response(message="I am fine."), Prompt(message="Good!")]
+    session = Session(messages=messages, title="session")
+    assert session.fit_to_budget(max_tokens=8, method=TokensEstimator.UNIVERSAL) == [1, 2]
+    assert session.messages_status == [False, True, True]
+    assert session.fit_to_budget(max_tokens=100) == [1, 2]
+
+
+def test_fit_to_budget2():
+    messages = [Prompt(message="You are a helpful assistant.", role=Role.SYSTEM), Prompt(message="Hello, how are you?"),
+                Response(message="I am fine."), Prompt(message="Good!")]
+    session = Session(messages=messages, title="session")
+    selected = session.fit_to_budget(max_tokens=20, strategy=BudgetStrategy.KEEP_SYSTEM_AND_NEWEST)
+    assert selected == [0, 2, 3] and session.messages_status == [True, False, True, True]
+
+
+def test_fit_to_budget3():
+    messages = [Prompt(message="Hello, how are you?"), Response(message="I am fine."), Prompt(message="Good!")]
+    session = Session(messages=messages, title="session")
+    assert session.fit_to_budget(max_tokens=10, strategy=BudgetStrategy.PIN_FIRST_N, pinned_count=1) == [0, 2]
+    assert session.fit_to_budget(max_tokens=0) == []
+    assert session.messages_status == [False, False, False]
+
+
+def test_fit_to_budget4():
+    session = Session(messages=[Prompt(message="Hello, how are you?")], title="session")
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `max_tokens` must be a positive integer."):
+        session.fit_to_budget(max_tokens=-1)
+    with pytest.raises(MemorValidationError, match=r"Invalid budget strategy. It must be an instance of BudgetStrategy enum."):
+        session.fit_to_budget(max_tokens=10, strategy="KEEP NEWEST")
+
+
+def test_fit_to_budget5():
+    for method in [TokensEstimator.UNIVERSAL, TokensEstimator.OPENAI_GPT_3_5, TokensEstimator.OPENAI_GPT_4]:
+        for strategy in BudgetStrategy:
+            messages = [Prompt(message="Hello there, friend.", role=Role.SYSTEM if index == 0 else Role.USER)
+                        for index in range(10)]
+            session = Session(messages=messages, title="session")
+            selected = session.fit_to_budget(max_tokens=40, method=method, strategy=strategy, pinned_count=2)
+            assert selected and session.estimate_tokens(method) <= 40
+            tokens = sum(message.estimate_tokens(method) for message in session.messages[:len(selected) + 1])
+            assert tokens + method("\n" * (len(selected) + 1)) > 40
+
+
+def test_iter_render4():
+    session = Session(messages=[Prompt(message="Hello there, friend.") for _ in range(10)], title="session")
+    method = TokensEstimator.OPENAI_GPT_4
+    rendered = list(session.iter_render(max_tokens=40, method=method))
+    session.update_messages_status(len(rendered) * [True] + (10 - len(rendered)) * [False])
+    assert rendered and session.estimate_tokens(method) <= 40
 
 
 def test_search1():
@@ -781,6 +1223,100 @@ def test_search5():
     assert session.search(query="a") == [1]
 
 
+def test_search_index1():
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response, prompt], title="session")
+    session.enable_search_index()
+    assert session.search(query="hello") == [0, 2] and session.search(query="HELLO", case_sensitive=True) == []
+    assert session.search(query="a") == [0, 1, 2] and session.search(query="fine.") == [1]
+    response.update_message("Hello! I am fine.")
+    session.add_message(Response(message="Hello again."), index=0)
+    assert session.search(query="hello") == [0, 1, 2, 3]
+    session.remove_message(1)
+    assert session.search(query="how are") == [2] and session.search(query="hello") == [0, 1, 2]
+    session.disable_search_index()
+    assert session.search(query="hello") == [0, 1, 2]
+
+
+def test_search_index2():
+    response1 = Response(message="Straße, naïve café")
+    response2 = Response(message="Kelvin scale")
+    session = Session(messages=[response1, response2])
+    session.enable_search_index()
+    assert session.search(query="café") == [0] and session.search(query="strasse") == []
+    assert session.search(query="KELVIN") == [1] and session.search(query="\u212aelvin") == [1]
+    assert session.search(query="\u212aelvin", case_sensitive=True) == []
+    assert session.search(query="\u212a\\w+", use_regex=True) == [1]
+    assert session.search(query="STRAßE") == [0]
+
+
+def test_search_index3():
+    template = PromptTemplate(content="{response[2][message]}")
+    prompt = Prompt(message="Hello, how are you?", role=Role.USER, template=template, init_check=False)
+    response = Response(message="I am fine, thank you.")
+    session = Session(messages=[prompt, response], title="session", init_check=False)
+    session.enable_search_index()
+    assert session.search(query="^I am", use_regex=True) == [1] and session.search(query="fine|hello", use_regex=True) == [1]
+    assert session.search(query="th(a|e)nk", use_regex=True) == [1] and session.search(query="am fine?", use_regex=True) == [1]
+    assert session.search(query="hello, how") == []
+    prompt.update_template(PresetPromptTemplate.BASIC.PROMPT)
+    assert session.search(query="hello, how") == [0] and session.search(query="hel+o", use_regex=True) == [0]
+
+
+def test_search_index4():
+    response1 = Response(message="Hello there.")
+    response2 = Response(message="I am fine.")
+    session = Session(messages=[response1, response2], title="session")
+    session.enable_search_index()
+    session.add_message(Response(message="Hello again."))
+    session.add_message(Response(message="Hello first."), index=0)
+    session += Session(messages=[Response(message="Hello last.")])
+    session.remove_message(1)
+    assert session._search_index["version"] == session._messages._version
+    assert session.search(query="hello") == [0, 2, 3] and session.search(query="he") == [0, 2, 3]
+    Response().from_json(response2.to_json())
+    assert not session._search_index["dirty"] and session.search(query="fine") == [1]
+    response2.update_message("Hello, I am fine.")
+    assert session._search_index["dirty"] == {id(response2)}
+    assert session.search(query="hello") == [0, 1, 2, 3]
+    session.messages.append(Response(message="Hello from the list."))
+    session.messages_status.append(True)
+    assert session.search(query="hello") == [0, 1, 2, 3, 4]
+
+
+def test_search_index5():
+    session = Session(messages=[Response(message="alpha"), Response(message="beta")], title="session")
+    session.enable_search_index()
+    assert session.search(query="beta") == [1]
+    session_copy = session.copy()
+    session_copy.clear_messages()
+    for message in ["gamma", "delta", "beta"]:
+        session_copy.add_message(Response(message=message))
+    assert session.search(query="beta") == [1] and session_copy.search(query="beta") == [2]
+    session_copy = copy.deepcopy(session)
+    session_copy.messages[0].update_message("beta")
+    assert session.search(query="beta") == [1] and session_copy.search(query="beta") == [0, 1]
+
+
+def test_search_index6():
+    template = PromptTemplate(content="{prompt[message]} {name}", custom_map={"name": "Alice"})
+    prompt = Prompt(message="Hello", template=template)
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response, Response(message="Bye.")], title="session")
+    session.enable_search_index()
+    assert session.search(query="alice") == [0] and session.search(query="fine") == [1]
+    template.custom_map["name"] = "Bob"
+    assert session.search(query="alice") == [] and session.search(query="bob") == [0]
+    session.messages[1] = Response(message="I am great.")
+    assert session.search(query="fine") == [] and session.search(query="great") == [1]
+    session.messages[2] = Response(message="See you.")
+    session.remove_message_by_index(2)
+    assert session.search(query="see you") == [] and session.search(query="great") == [1]
+    response.update_message("Hello there.")
+    assert session.search(query="hello") == [0]
+
+
 def test_size():
     prompt = Prompt(message="Hello, how are you?", role=Role.USER)
     response = Response(message="I am fine.")
@@ -788,3 +1324,171 @@ def test_size():
     session.save("session_test2.json")
     assert os.path.getsize("session_test2.json") == session.size
     assert session.size == session.get_size()
+
+
+def test_size_cache1():
+    template = PromptTemplate(content="{prompt[message]} ☃ {response[message]}", custom_map={"name": "Alice"})
+    response = Response(message="I am fine.", temperature=1e-05, score=0.123456789)
+    prompt = Prompt(message="Hello, how are you?", responses=[response], template=template)
+    session = Session(messages=[prompt, response, Response(message="Bye.")], title="session")
+    session.disable_message(1)
+    session.save("session_test2.json")
+    assert session.size == os.path.getsize("session_test2.json")
+    response.update_message("I am fine, thank you.")
+    template.update_content("{prompt[message]} {response[message]} ☃☃")
+    session.disable_message(2)
+    session.save("session_test2.json")
+    assert session.size == os.path.getsize("session_test2.json")
+
+
+def test_size_cache2():
+    session = Session(messages=[Prompt(message="Hello!"), Response(message="Hi!")])
+    for codec in ["json", None]:
+        set_json_codec(codec)
+        session.save("session_test2.json")
+        assert session.size == os.path.getsize("session_test2.json")
+    session.clear_messages()
+    session.save("session_test2.json")
+    assert session.size == os.path.getsize("session_test2.json")
+
+
+def test_async_save_load1():
+    prompt = Prompt(message="Hello, how are you?")
+    response = Response(message="I am fine.")
+    session1 = Session(messages=[prompt, response], title="session1")
+    session1.disable_message(1)
+    result = asyncio.run(session1.async_save("session_test1.json"))
+    session2 = Session()
+    asyncio.run(session2.async_load("session_test1.json", lazy=True))
+    assert result["status"] and session1 == session2 and session2.messages_status == [True, False]
+    assert asyncio.run(session1.async_save("f:/"))["status"] == False
+
+
+def test_async_save_load2():
+    session1 = Session(messages=[Prompt(message="Hello, how are you?")], title="session1")
+    _ = session1.append_save("session_test3.json")
+    session2 = Session()
+    asyncio.run(session2.async_load("session_test3.json"))
+    assert session1 == session2
+    session2.add_message(Response(message="I am fine."))
+    _ = session2.append_save("session_test3.json")
+    with open("session_test3.json", "r") as file:
+        assert len(file.readlines()) == 3
+
+
+def test_async_save_sessions1():
+    sessions = [Session(messages=[Response(message="Reply {0}".format(index))], title=str(index)) for index in range(4)]
+    file_paths = ["session_test1.json", "session_test2.json", "session_test4.json", "f:/"]
+    results = asyncio.run(async_save_sessions(sessions, file_paths, max_concurrency=2))
+    assert [result["status"] for result in results] == [True, True, True, False]
+    assert Session(file_path="session_test4.json") == sessions[2]
+
+
+def test_async_save_sessions2():
+    with pytest.raises(MemorValidationError, match=r"Invalid file paths length. It must be equal to the number of sessions."):
+        asyncio.run(async_save_sessions([Session()], []))
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `max_concurrency` must be a positive integer."):
+        asyncio.run(async_save_sessions([Session()], ["session_test1.json"], max_concurrency=0))
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `sessions` must be a list of `Session`."):
+        asyncio.run(async_save_sessions(Session(), ["session_test1.json"]))
+
+
+def test_atomic_save1():
+    session1 = Session(messages=[Prompt(message="Hello, how are you?")], title="session1")
+    _ = session1.save("session_test1.json")
+    os.chmod("session_test1.json", 0o600)
+    result = session1.save("session_test1.json", atomic=True, fsync=True)
+    assert result["status"] and Session(file_path="session_test1.json") == session1
+    if os.name == "posix":
+        assert os.stat("session_test1.json").st_mode & 0o777 == 0o600
+    assert not [file_name for file_name in os.listdir(".") if file_name.endswith(".tmp")]
+
+
+def test_atomic_save2():
+    session1 = Session(messages=[Prompt(message="Hello, how are you?")], title="session1")
+    _ = session1.save("session_test1.json", atomic=True)
+    response = Response(message="I am fine.")
+    response._role = None
+    session2 = Session(messages=[response], title="session2", init_check=False)
+    result = session2.save("session_test1.json", atomic=True)
+    assert result["status"] == False and Session(file_path="session_test1.json") == session1
+    assert not [file_name for file_name in os.listdir(".") if file_name.endswith(".tmp")]
+    result = asyncio.run(session1.async_save("f:/", atomic=True, fsync=True))
+    assert result["status"] == False
+
+
+def test_json_codec1():
+    session1 = Session(messages=[Prompt(message="Hello, how are you? ☃"), Response(message="I am fine.")], title="session1")
+    for codec in ["json", None]:
+        set_json_codec(codec)
+        result = session1.save("session_test1.json")
+        assert result["status"] and os.path.getsize("session_test1.json") == session1.get_size()
+        assert Session(file_path="session_test1.json") == session1
+        assert session1.append_save("session_test3.json", compact=True)["status"]
+        assert Session(file_path="session_test3.json") == session1
+    assert set_json_codec("json") == "json"
+    set_json_codec()
+
+
+def test_json_codec2():
+    with pytest.raises(MemorValidationError, match=r"Invalid JSON codec. It must be one of the installed codecs: "):
+        set_json_codec("pickle")
+
+
+def test_json_codec3():
+    session1 = Session(messages=[Response(message="I am fine.", tokens=2 ** 70)], title="session1")
+    set_json_codec()
+    result = session1.save("session_test1.json")
+    assert result["status"] and os.path.getsize("session_test1.json") == session1.get_size()
+    set_json_codec("json")
+    assert Session(file_path="session_test1.json").messages[0].tokens == 2 ** 70
+    set_json_codec()
+
+
+def test_json_codec4():
+    response = Response(message="I am fine. \ud800")
+    session1 = Session(messages=[Prompt(message="Hello \udfff", responses=[response]), response], title="session1")
+    for codec in ["json", None]:
+        set_json_codec(codec)
+        result = session1.save("session_test1.json")
+        assert result["status"] and os.path.getsize("session_test1.json") == session1.get_size()
+        assert Session(file_path="session_test1.json") == session1
+        assert session1.append_save("session_test3.json", compact=True)["status"]
+        assert Session(file_path="session_test3.json") == session1
+
+
+def test_trusted_load1():
+    response = Response(message="I am fine. ☃")
+    prompt = Prompt(message="Hello, how are you?", responses=[response])
+    session1 = Session(messages=[prompt, response], title="session1")
+    session1.disable_message(1)
+    assert session1.save("session_test1.json", checksum=True)["status"]
+    for lazy in [False, True]:
+        session2 = Session()
+        session2.load("session_test1.json", lazy=lazy, trusted=True)
+        assert session2 == session1 and session2.messages_status == [True, False]
+    assert Session(file_path="session_test1.json") == session1
+    session2 = Session()
+    asyncio.run(session2.async_load("session_test1.json", trusted=True))
+    assert session2 == session1
+    assert asyncio.run(session1.async_save("session_test2.json", checksum=True))["status"]
+    with open("session_test2.json", "r", encoding="utf-8") as file:
+        session2.from_json(file.read(), trusted=True)
+    assert session2 == session1
+
+
+def test_trusted_load2():
+    session = Session(messages=[Response(message="I am fine.")], title="session1")
+    _ = session.save("session_test1.json", checksum=True)
+    with open("session_test1.json", "rb") as file:
+        content = file.read()
+    with open("session_test1.json", "wb") as file:
+        file.write(content.replace(b"I am fine.", b"I am fine!"))
+    with pytest.raises(MemorValidationError, match=r"Invalid checksum. The file is corrupted or it was not saved with a checksum."):
+        _ = Session(file_path="session_test1.json")
+    _ = session.save("session_test1.json")
+    with pytest.raises(MemorValidationError, match=r"Invalid checksum. The file is corrupted or it was not saved with a checksum."):
+        session.load("session_test1.json", trusted=True)
+    _ = session.append_save("session_test3.json", compact=True)
+    with pytest.raises(MemorValidationError, match=r"Invalid checksum. The file is corrupted or it was not saved with a checksum."):
+        session.load("session_test3.json", trusted=True)
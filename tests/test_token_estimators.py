@@ -1,4 +1,7 @@
+import pytest
 from memor.tokens_estimator import openai_tokens_estimator_gpt_3_5, openai_tokens_estimator_gpt_4, universal_tokens_estimator
+from memor import Prompt, Response, Session, TokensEstimator, MemorValidationError
+from memor import batch_estimate_tokens
 
 TEST_CASE_NAME = "Token Estimators tests"
 
@@ -82,3 +85,43 @@ def test_openai_tokens_estimator_with_newlines():
 def test_openai_tokens_estimator_with_gpt4_model():
     message = "This is a test sentence that should be counted properly even with GPT-4. I am making it longer to test the model."
     assert openai_tokens_estimator_gpt_4(message) == 45
+
+
+def test_openai_tokens_estimator_with_rare_chars():
+    message = "这是一个测试句子，包含罕见字符。"
+    assert openai_tokens_estimator_gpt_3_5(message) == 18
+    assert openai_tokens_estimator_gpt_4(message) == 19
+    message = "日本語 😀 https://example.com"
+    assert openai_tokens_estimator_gpt_3_5(message) == 15
+    assert openai_tokens_estimator_gpt_4(message) == 16
+
+
+def test_openai_tokens_estimator_without_keywords():
+    message = "1234 5678 90"
+    assert openai_tokens_estimator_gpt_3_5(message) == 4
+    assert openai_tokens_estimator_gpt_4(message) == 4
+
+
+def test_batch_estimate_tokens1():
+    prompt = Prompt(message="Hello, how are you?")
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response])
+    items = ["I'm going to the park.", prompt, response, session]
+    assert batch_estimate_tokens(items) == [7, 7, 5, 12]
+    assert batch_estimate_tokens(items, method=TokensEstimator.OPENAI_GPT_4) == [
+        openai_tokens_estimator_gpt_4("I'm going to the park."), 8, 4, 14]
+
+
+def test_batch_estimate_tokens2():
+    prompt = Prompt(message="Hello, how are you?")
+    response = Response(message="I am fine.")
+    session = Session(messages=[prompt, response])
+    items = ["I'm going to the park.", prompt, response, session] * 5
+    assert batch_estimate_tokens(iter(items), max_workers=2, chunk_size=3) == batch_estimate_tokens(items)
+
+
+def test_batch_estimate_tokens3():
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `max_workers` must be a positive integer."):
+        _ = batch_estimate_tokens(["Hello"], max_workers=0)
+    with pytest.raises(MemorValidationError, match=r"Invalid value. `chunk_size` must be a positive integer."):
+        _ = batch_estimate_tokens(["Hello"], chunk_size=0)